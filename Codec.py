@@ -0,0 +1,436 @@
+"""
+Codec module provides the registry of named and versioned serializers used to
+dump and pull repository files. Unlike dump and pull code strings, a codec is
+a real python object with dump and load callables. Repository files dumped
+with a registered codec only store the codec name and version in their
+information, and pulling them does not require executing any code string.
+
+Codecs must be registered explicitly using register_codec before they can be
+used by name in Repository dump and pull methods.
+
+.. code-block:: python
+
+    from pyrep.Codec import Codec, register_codec
+
+    def dump(fd, value):
+        fd.write(value.to_bytes())
+
+    def load(fd):
+        return MyType.from_bytes(fd.read())
+
+    register_codec( Codec(name='mytype', version=1, dump=dump, load=load) )
+
+    REP.dump_file(value, relativePath='data.mytype', dump='mytype')
+
+Repository 'auto' dump keyword selects a codec given the dumped value type
+using get_auto_codec.
+"""
+# standard distribution imports
+import sys, re, zlib, threading
+try:
+    import cPickle as pickle
+except:
+    import pickle
+
+# python version dependant imports
+if sys.version_info >= (3, 0):
+    basestring = str
+    unicode    = str
+    long       = int
+    _BYTES     = (bytes, bytearray, memoryview)
+else:
+    _BYTES     = (str, bytearray, memoryview)
+
+
+class Codec(object):
+    """
+    Named and versioned serializer.
+
+    :Parameters:
+        #. name (string): The codec unique name.
+        #. dump (callable): The dump function called as dump(fd, value, **options)
+           where fd is a file opened in binary write mode.
+        #. load (callable): The load function called as load(fd, **options)
+           where fd is a file opened in binary read mode.
+        #. version (int): The codec version. Files store the version of the
+           codec used to dump them and are pulled with the same version.
+        #. description (string): Codec description.
+    """
+    def __init__(self, name, dump, load, version=1, description=''):
+        assert isinstance(name, basestring), "name must be a string"
+        assert len(name), "name must not be empty"
+        assert callable(dump), "dump must be callable"
+        assert callable(load), "load must be callable"
+        assert isinstance(version, int), "version must be an integer"
+        assert isinstance(description, basestring), "description must be a string"
+        self.__name        = name
+        self.__version     = version
+        self.__dump        = dump
+        self.__load        = load
+        self.__description = description
+
+    def __repr__(self):
+        return "<Codec '%s' version %i>"%(self.__name, self.__version)
+
+    @property
+    def name(self):
+        """Codec name."""
+        return self.__name
+
+    @property
+    def version(self):
+        """Codec version."""
+        return self.__version
+
+    @property
+    def description(self):
+        """Codec description."""
+        return self.__description
+
+    def dump(self, fd, value, **options):
+        """Dump value to file object opened in binary write mode."""
+        return self.__dump(fd, value, **options)
+
+    def load(self, fd, **options):
+        """Load value from file object opened in binary read mode."""
+        return self.__load(fd, **options)
+
+
+class ChecksumWriter(object):
+    """
+    Binary write mode file object proxy computing the size and the crc32
+    checksum of the data written through it. Codecs dump to it as they
+    would to the file, therefore the checksum costs no additional read.
+
+    :Parameters:
+        #. fd (file): The file object opened in binary write mode.
+    """
+    def __init__(self, fd):
+        self.__fd    = fd
+        self.__size  = 0
+        self.__crc32 = 0
+
+    def __getattr__(self, name):
+        return getattr(self.__fd, name)
+
+    def write(self, data):
+        self.__crc32 = zlib.crc32(data, self.__crc32)
+        self.__size += data.nbytes if isinstance(data, memoryview) else len(data)
+        return self.__fd.write(data)
+
+    @property
+    def size(self):
+        """Number of written bytes."""
+        return self.__size
+
+    @property
+    def checksum(self):
+        """Written data checksum as 'crc32:%08x'."""
+        return 'crc32:%08x'%(self.__crc32 & 0xffffffff)
+
+
+def get_file_checksum(fd, chunkSize=1048576):
+    """
+    Get the checksum of an opened file data as computed by ChecksumWriter.
+    File is read from its current position to its end.
+
+    :Parameters:
+        #. fd (file): The file object opened in binary read mode.
+        #. chunkSize (int): Number of bytes read at once.
+
+    :Returns:
+        #. checksum (string): The data checksum as 'crc32:%08x'.
+    """
+    crc32 = 0
+    while True:
+        data = fd.read(chunkSize)
+        if not len(data):
+            break
+        crc32 = zlib.crc32(data, crc32)
+    return 'crc32:%08x'%(crc32 & 0xffffffff)
+
+
+# codecs registry. keys are codec names and values are dictionaries of
+# codecs by version
+_CODECS      = {}
+_CODECS_LOCK = threading.Lock()
+
+def register_codec(codec, replace=False):
+    """
+    Register a codec.
+
+    :Parameters:
+        #. codec (Codec): The codec to register.
+        #. replace (boolean): Whether to replace an already registered codec
+           of the same name and version.
+    """
+    assert isinstance(codec, Codec), "codec must be a Codec instance"
+    assert isinstance(replace, bool), "replace must be boolean"
+    with _CODECS_LOCK:
+        versions = _CODECS.setdefault(codec.name, {})
+        assert replace or codec.version not in versions, "codec '%s' version %i is already registered. Set replace to True"%(codec.name, codec.version)
+        versions[codec.version] = codec
+
+def unregister_codec(name, version=None):
+    """
+    Unregister a codec.
+
+    :Parameters:
+        #. name (string): The codec name.
+        #. version (None, int): The codec version. If None, all registered
+           versions are unregistered.
+    """
+    with _CODECS_LOCK:
+        if version is None:
+            _CODECS.pop(name, None)
+        elif name in _CODECS:
+            _CODECS[name].pop(version, None)
+            if not len(_CODECS[name]):
+                _CODECS.pop(name)
+
+def get_codec(name, version=None):
+    """
+    Get a registered codec.
+
+    :Parameters:
+        #. name (string): The codec name.
+        #. version (None, int): The codec version. If None, the latest
+           registered version is returned.
+
+    :Returns:
+        #. codec (None, Codec): The registered codec or None if not found.
+    """
+    with _CODECS_LOCK:
+        versions = _CODECS.get(name, None)
+        if not versions:
+            return None
+        if version is None:
+            version = max(versions)
+        return versions.get(version, None)
+
+def get_codecs():
+    """
+    Get all registered codecs.
+
+    :Returns:
+        #. codecs (list): List of (name, version) tuples.
+    """
+    with _CODECS_LOCK:
+        return sorted([(n, v) for n in _CODECS for v in _CODECS[n]])
+
+def get_keyword_codec(keyword, protocol=-1):
+    """
+    Get the codec and its dump options given a dump or pull keyword.
+    Keywords are registered codec names. 'pickle' and 'dill' keywords can be
+    suffixed with a protocol number such as 'pickle2'.
+
+    :Parameters:
+        #. keyword (object): The dump or pull method.
+        #. protocol (int): The pickle protocol to use with 'pickle' keyword
+           when no protocol suffix is given.
+
+    :Returns:
+        #. codec (None, Codec): The codec or None if keyword is not a
+           registered codec name.
+        #. options (None, dict): The codec dump options.
+    """
+    if not isinstance(keyword, basestring):
+        return None, None
+    codec = get_codec(keyword)
+    if codec is not None:
+        if keyword == 'pickle':
+            return codec, {'protocol':protocol}
+        return codec, {}
+    match = re.match(r'^(pickle|dill)(-?[0-9]+)$', keyword)
+    if match is None:
+        return None, None
+    codec = get_codec(match.group(1))
+    if codec is None:
+        return None, None
+    proto = int(match.group(2))
+    assert proto>=-1, "protocol must be an integer >=-1"
+    return codec, {'protocol':proto}
+
+
+def _is_json_safe(value, maxItems):
+    # whether value is made of json types only, which are pulled back as
+    # the same types, with at most maxItems containers items
+    count = [0]
+    def _check(value):
+        t = type(value)
+        if t in (unicode, bool, int, long, float) or value is None:
+            return True
+        if t is list:
+            count[0] += len(value)
+            return count[0] <= maxItems and all([_check(v) for v in value])
+        if t is dict:
+            count[0] += len(value)
+            return count[0] <= maxItems and all([type(k) is unicode and _check(v) for k, v in value.items()])
+        return False
+    return type(value) in (list, dict) and _check(value)
+
+def get_auto_codec(value, jsonMaxItems=1000):
+    """
+    Get the codec and its dump options selected for a value by the 'auto'
+    dump keyword.
+
+    :Parameters:
+        #. value (object): The value to dump.
+        #. jsonMaxItems (int): The maximum number of list and dict items
+           of a value dumped with 'json'. Bigger values are pickled.
+
+    :Returns:
+        #. codec (Codec): 'bytes' for bytes, bytearray and memoryview,
+           'text' for strings, 'numpy' for numpy arrays of no python objects,
+           'json' for lists and dictionaries of json types only and 'pickle'
+           with the highest protocol otherwise. Types are matched exactly,
+           subclasses e.g. str enums or numpy.str_ are pickled.
+        #. options (dict): The codec dump options.
+    """
+    # subclasses are pickled to be pulled with their type
+    if type(value) in _BYTES:
+        return get_codec('bytes'), {}
+    if type(value) is unicode:
+        return get_codec('text'), {}
+    # numpy is never imported to check a value
+    numpy = sys.modules.get('numpy', None)
+    if numpy is not None and type(value) is numpy.ndarray and not value.dtype.hasobject:
+        return get_codec('numpy'), {}
+    if _is_json_safe(value, maxItems=jsonMaxItems):
+        return get_codec('json'), {}
+    return get_codec('pickle'), {'protocol':pickle.HIGHEST_PROTOCOL}
+
+
+## built-in codecs
+def _bytes_dump(fd, value):
+    if isinstance(value, memoryview) and not getattr(value, 'contiguous', False):
+        value = value.tobytes()
+    fd.write( value )
+
+def _bytes_load(fd):
+    return fd.read()
+
+def _text_dump(fd, value):
+    fd.write( value.encode('utf-8') )
+
+def _text_load(fd):
+    return fd.read().decode('utf-8')
+
+def _pickle_dump(fd, value, protocol=-1):
+    pickle.dump( value, fd, protocol=protocol )
+
+def _pickle_load(fd):
+    return pickle.load( fd )
+
+def _dill_dump(fd, value, protocol=2):
+    import dill
+    dill.dump( value, fd, protocol=protocol )
+
+def _dill_load(fd):
+    import dill
+    return dill.load( fd )
+
+def _json_dump(fd, value):
+    import json
+    fd.write( json.dumps(value, ensure_ascii=True, indent=4).encode('utf-8') )
+
+def _json_load(fd):
+    import json
+    return json.loads( fd.read().decode('utf-8') )
+
+def _numpy_dump(fd, value):
+    import numpy
+    numpy.save(file=fd, arr=value)
+
+def _numpy_load(fd):
+    import numpy
+    return numpy.load(file=fd)
+
+def _numpy_mmap_load(fd):
+    import numpy
+    return numpy.load(fd.name, mmap_mode='r')
+
+def _numpy_text_dump(fd, value):
+    import numpy
+    numpy.savetxt(fd, value, fmt='%.6e')
+
+def _numpy_text_load(fd):
+    import numpy
+    return numpy.loadtxt(fd)
+
+def load_npy_slice(fd, index):
+    """
+    Load a slice of a numpy .npy array file by reading from disk only the
+    bytes spanning the first axis rows that the index requires.
+
+    :Parameters:
+        #. fd (file): The .npy file object opened in binary read mode.
+        #. index (int, slice, tuple): Basic numpy index. The first axis item
+           defines which rows are read, remaining items are applied on the
+           read rows.
+
+    :Returns:
+        #. data (numpy.ndarray): The sliced array.
+    """
+    import numpy
+    from numpy.lib import format as npformat
+    if not isinstance(index, tuple):
+        index = (index,)
+    # read header
+    version = npformat.read_magic(fd)
+    if version == (1,0):
+        shape, fortran, dtype = npformat.read_array_header_1_0(fd)
+    else:
+        shape, fortran, dtype = npformat.read_array_header_2_0(fd)
+    assert not dtype.hasobject, "slicing arrays of python objects is not supported"
+    assert len(shape), "slicing 0-dimensional arrays is not allowed"
+    # fortran ordered rows are not contiguous, let memory map do the work
+    if fortran:
+        return numpy.array( numpy.load(fd.name, mmap_mode='r')[index] )
+    # get rows range
+    nrows = shape[0]
+    first = index[0] if len(index) else Ellipsis
+    rest  = index[1:]
+    if first is Ellipsis:
+        lo, hi, local = 0, nrows, Ellipsis
+    elif isinstance(first, slice):
+        start, stop, step = first.indices(nrows)
+        rows = range(start, stop, step)
+        if not len(rows):
+            lo = hi = 0
+            local = slice(0,0)
+        elif step > 0:
+            lo, hi = rows[0], rows[-1]+1
+            local  = slice(0, hi-lo, step)
+        else:
+            lo, hi = rows[-1], rows[0]+1
+            local  = slice(hi-lo-1, None, step)
+    elif isinstance(first, (int, numpy.integer)) and not isinstance(first, bool):
+        first = int(first)
+        if first < 0:
+            first += nrows
+        if first < 0 or first >= nrows:
+            raise IndexError("index %s is out of bounds for axis 0 with size %i"%(index[0], nrows))
+        lo, hi, local = first, first+1, 0
+    else:
+        raise TypeError("first axis index must be an integer, a slice or Ellipsis")
+    # read rows
+    rowItems = int(numpy.prod(shape[1:]))
+    fd.seek( fd.tell() + lo*rowItems*dtype.itemsize )
+    buffer = bytearray( (hi-lo)*rowItems*dtype.itemsize )
+    nbytes = fd.readinto(buffer)
+    assert nbytes == len(buffer), "file is truncated, %i bytes read out of %i"%(nbytes, len(buffer))
+    data = numpy.frombuffer(buffer, dtype=dtype).reshape((hi-lo,)+tuple(shape[1:]))
+    if local is Ellipsis:
+        return data[index]
+    return data[(local,)+tuple(rest)]
+
+
+register_codec( Codec(name='pickle', dump=_pickle_dump, load=_pickle_load, description='python pickle') )
+register_codec( Codec(name='bytes', dump=_bytes_dump, load=_bytes_load, description='raw bytes pulled as bytes') )
+register_codec( Codec(name='text', dump=_text_dump, load=_text_load, description='utf-8 encoded string') )
+register_codec( Codec(name='dill', dump=_dill_dump, load=_dill_load, description='dill extended pickle') )
+register_codec( Codec(name='json', dump=_json_dump, load=_json_load, description='utf-8 encoded json') )
+register_codec( Codec(name='numpy', dump=_numpy_dump, load=_numpy_load, description='numpy .npy binary format') )
+register_codec( Codec(name='numpy_mmap', dump=_numpy_dump, load=_numpy_mmap_load, description='numpy .npy binary format pulled as a read-only memory map') )
+register_codec( Codec(name='numpy_text', dump=_numpy_text_dump, load=_numpy_text_load, description='numpy text format') )
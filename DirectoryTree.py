@@ -0,0 +1,387 @@
+"""
+DirectoryTree module provides a hash indexed in-memory representation of the
+repository tracked directories and files. Every directory is a DirectoryNode
+that stores its sub-directories and files in dictionaries keyed by name, while
+the tree keeps a flat relative path to node dictionary. Therefore looking up
+a directory or checking whether a file is tracked costs O(1) regardless of the
+repository size.
+
+DirectoryTree is serialized to and from the historical '.pyreprepo'
+'walk_repo' nested list layout where files are strings and directories are
+single key dictionaries. Every mutation is also recorded as a journal
+operation that can be popped and replayed on another tree, which is how
+repository changes are appended to '.pyreprepojournal' without rewriting
+the whole '.pyreprepo'. The tree also maintains the number of tracked
+directories and files, which are therefore counted in O(1).
+"""
+# standard distribution imports
+import os, sys
+
+# python version dependant imports
+if sys.version_info >= (3, 0):
+    basestring = str
+
+
+class DirectoryNode(object):
+    """
+    Repository tracked directory node.
+
+    :Parameters:
+        #. name (string): The directory name. Repository main directory
+           name is an empty string.
+        #. parent (None, DirectoryNode): The parent directory node.
+    """
+    __slots__ = ('name', 'parent', 'relativePath', 'directories', 'files')
+
+    def __init__(self, name, parent=None):
+        self.name         = name
+        self.parent       = parent
+        self.directories  = {}
+        self.files        = {}
+        if parent is None:
+            self.relativePath = name
+        else:
+            self.relativePath = os.path.join(parent.relativePath, name)
+
+    def __repr__(self):
+        return "<DirectoryNode '%s' [%i directories] [%i files]>"%(self.relativePath, len(self.directories), len(self.files))
+
+
+class DirectoryTree(object):
+    """
+    Hash indexed repository directory tree.
+
+    :Parameters:
+        #. walkRepo (None, list): The '.pyreprepo' 'walk_repo' nested list
+           to build the tree from. If None, an empty tree is created.
+    """
+    JOURNAL_OPERATIONS = ('add_directory', 'remove_directory', 'rename_directory',
+                          'copy_directory', 'add_file', 'remove_file')
+
+    def __init__(self, walkRepo=None):
+        self.__root    = DirectoryNode('')
+        self.__index   = {'':self.__root}
+        self.__journal = []
+        self.__ndirs   = 0
+        self.__nfiles  = 0
+        if walkRepo is not None:
+            assert isinstance(walkRepo, list), "walkRepo must be None or a list"
+            self.__load_list(node=self.__root, dirList=walkRepo)
+            self.__nfiles = sum([len(n.files) for n in self.__index.values()])
+            self.__ndirs  = len(self.__index)-1
+
+    def __getstate__(self):
+        return {'walk_repo':self.to_list()}
+
+    def __setstate__(self, state):
+        self.__init__(walkRepo=state['walk_repo'])
+
+    def __load_list(self, node, dirList):
+        for item in dirList:
+            if isinstance(item, basestring):
+                node.files[item] = None
+            elif isinstance(item, dict):
+                for name in item:
+                    if not isinstance(name, basestring) or not len(name):
+                        continue
+                    child = self.__attach(parent=node, name=name)
+                    self.__load_list(node=child, dirList=item[name])
+
+    def __attach(self, parent, name):
+        child = parent.directories.get(name, None)
+        if child is None:
+            child = DirectoryNode(name=name, parent=parent)
+            parent.directories[name] = child
+            self.__index[child.relativePath] = child
+        return child
+
+    def __unindex(self, node):
+        self.__index.pop(node.relativePath, None)
+        for child in node.directories.values():
+            self.__unindex(child)
+
+    def __reindex(self, node):
+        node.relativePath = os.path.join(node.parent.relativePath, node.name)
+        self.__index[node.relativePath] = node
+        for child in node.directories.values():
+            self.__reindex(child)
+
+    def __count(self, node):
+        # count directory itself, its sub-directories and files recursively
+        ndirs, nfiles = 1, len(node.files)
+        for child in node.directories.values():
+            nd, nf  = self.__count(child)
+            ndirs  += nd
+            nfiles += nf
+        return ndirs, nfiles
+
+    @property
+    def root(self):
+        """The repository main directory node."""
+        return self.__root
+
+    @property
+    def numberOfDirectories(self):
+        """Number of tracked directories excluding the main directory."""
+        return self.__ndirs
+
+    @property
+    def numberOfFiles(self):
+        """Number of tracked files."""
+        return self.__nfiles
+
+    @property
+    def journalLength(self):
+        """Number of journal operations recorded and not popped yet."""
+        return len(self.__journal)
+
+    def pop_journal(self):
+        """
+        Pop all journal operations recorded since last pop.
+
+        :Returns:
+            #. operations (list): List of (operation, arguments) tuples.
+        """
+        journal, self.__journal = self.__journal, []
+        return journal
+
+    def apply_journal(self, operations):
+        """
+        Replay journal operations on the tree. Replayed operations are not
+        recorded in the tree journal.
+
+        :Parameters:
+            #. operations (list): List of (operation, arguments) tuples as
+               returned by pop_journal.
+
+        :Returns:
+            #. errors (list): List of operations replay error messages.
+        """
+        errors  = []
+        journal, self.__journal = self.__journal, []
+        try:
+            for op, args in operations:
+                if op not in self.JOURNAL_OPERATIONS:
+                    errors.append("Unknown journal operation '%s'"%(op,))
+                    continue
+                try:
+                    getattr(self, op)(*args)
+                except Exception as err:
+                    errors.append("Unable to replay journal operation '%s' %s (%s)"%(op, str(args), str(err)))
+        finally:
+            self.__journal = journal
+        return errors
+
+    def to_list(self, relativePath=''):
+        """
+        Get the '.pyreprepo' 'walk_repo' nested list representation of a
+        tracked directory.
+
+        :Parameters:
+            #. relativePath (string): The directory relative path.
+
+        :Returns:
+            #. dirList (None, list): The nested list where files are strings
+               and directories are single key dictionaries. None is returned
+               if directory is not tracked.
+        """
+        node = self.__index.get(relativePath, None)
+        if node is None:
+            return None
+        def _to_list(node):
+            dirList = list(node.files)
+            dirList.extend([{n:_to_list(d)} for n, d in node.directories.items()])
+            return dirList
+        return _to_list(node)
+
+    def get_directory(self, relativePath):
+        """Get directory node given its relative path or None if not tracked."""
+        return self.__index.get(relativePath, None)
+
+    def is_directory(self, relativePath):
+        """Get whether directory relative path is tracked."""
+        return relativePath in self.__index
+
+    def is_file(self, relativePath):
+        """Get whether file relative path is tracked."""
+        dirPath, name = os.path.split(relativePath)
+        node = self.__index.get(dirPath, None)
+        if node is None:
+            return False
+        return name in node.files
+
+    def add_directory(self, relativePath):
+        """
+        Add a directory to the tree. Parent directory must be tracked.
+
+        :Parameters:
+            #. relativePath (string): The directory relative path.
+
+        :Returns:
+            #. node (DirectoryNode): The added or already existing node.
+        """
+        dirPath, name = os.path.split(relativePath)
+        parent = self.__index.get(dirPath, None)
+        assert parent is not None, "parent directory '%s' is not tracked"%(dirPath,)
+        assert len(name), "directory name must not be empty"
+        if name not in parent.directories:
+            self.__journal.append( ('add_directory', (relativePath,)) )
+            self.__ndirs += 1
+        return self.__attach(parent=parent, name=name)
+
+    def remove_directory(self, relativePath, journal=True):
+        """
+        Remove directory and all its contents from the tree.
+
+        :Parameters:
+            #. relativePath (string): The directory relative path.
+            #. journal (boolean): Whether to journal the removal. Removals
+               that only repair the in memory tree must not be journaled.
+
+        :Returns:
+            #. removed (boolean): Whether directory was tracked and removed.
+        """
+        node = self.__index.get(relativePath, None)
+        if node is None or node.parent is None:
+            return False
+        node.parent.directories.pop(node.name)
+        self.__unindex(node)
+        ndirs, nfiles = self.__count(node)
+        self.__ndirs  -= ndirs
+        self.__nfiles -= nfiles
+        if journal:
+            self.__journal.append( ('remove_directory', (relativePath,)) )
+        return True
+
+    def rename_directory(self, relativePath, newName):
+        """
+        Rename a tracked directory.
+
+        :Parameters:
+            #. relativePath (string): The directory relative path.
+            #. newName (string): The directory new name.
+
+        :Returns:
+            #. node (DirectoryNode): The renamed directory node.
+        """
+        node = self.__index.get(relativePath, None)
+        assert node is not None, "directory '%s' is not tracked"%(relativePath,)
+        assert node.parent is not None, "renaming main directory is not allowed"
+        assert newName not in node.parent.directories, "directory '%s' already exists"%(newName,)
+        node.parent.directories.pop(node.name)
+        self.__unindex(node)
+        node.name = newName
+        node.parent.directories[newName] = node
+        self.__reindex(node)
+        self.__journal.append( ('rename_directory', (relativePath, newName)) )
+        return node
+
+    def copy_directory(self, relativePath, newRelativePath):
+        """
+        Copy a tracked directory and all its contents. New directory parent
+        must be tracked.
+
+        :Parameters:
+            #. relativePath (string): The directory relative path.
+            #. newRelativePath (string): The copied directory relative path.
+
+        :Returns:
+            #. node (DirectoryNode): The new directory node.
+        """
+        node = self.__index.get(relativePath, None)
+        assert node is not None, "directory '%s' is not tracked"%(relativePath,)
+        newDirPath, newName = os.path.split(newRelativePath)
+        parent = self.__index.get(newDirPath, None)
+        assert parent is not None, "parent directory '%s' is not tracked"%(newDirPath,)
+        assert newName not in parent.directories, "directory '%s' already exists"%(newRelativePath,)
+        # snapshot source before attaching anything because new directory
+        # can be a sub-directory of the copied one
+        dirList = self.to_list(relativePath)
+        newNode = self.__attach(parent=parent, name=newName)
+        self.__load_list(node=newNode, dirList=dirList)
+        ndirs, nfiles = self.__count(newNode)
+        self.__ndirs  += ndirs
+        self.__nfiles += nfiles
+        self.__journal.append( ('copy_directory', (relativePath, newRelativePath)) )
+        return newNode
+
+    def add_file(self, relativePath):
+        """
+        Add a file to the tree. Parent directory must be tracked.
+
+        :Parameters:
+            #. relativePath (string): The file relative path.
+
+        :Returns:
+            #. added (boolean): Whether file was not already tracked and added.
+        """
+        dirPath, name = os.path.split(relativePath)
+        node = self.__index.get(dirPath, None)
+        assert node is not None, "parent directory '%s' is not tracked"%(dirPath,)
+        if name in node.files:
+            return False
+        node.files[name] = None
+        self.__nfiles += 1
+        self.__journal.append( ('add_file', (relativePath,)) )
+        return True
+
+    def remove_file(self, relativePath, journal=True):
+        """
+        Remove a file from the tree.
+
+        :Parameters:
+            #. relativePath (string): The file relative path.
+            #. journal (boolean): Whether to journal the removal. Removals
+               that only repair the in memory tree must not be journaled.
+
+        :Returns:
+            #. removed (boolean): Whether file was tracked and removed.
+        """
+        dirPath, name = os.path.split(relativePath)
+        node = self.__index.get(dirPath, None)
+        if node is None or name not in node.files:
+            return False
+        node.files.pop(name)
+        self.__nfiles -= 1
+        if journal:
+            self.__journal.append( ('remove_file', (relativePath,)) )
+        return True
+
+    def walk_files(self, relativePath='', recursive=False):
+        """
+        Walk a tracked directory and yield files relative path.
+
+        :parameters:
+            #. relativePath (string): The relative path from which start the walk.
+            #. recursive (boolean): Whether walk all directories files recursively
+        """
+        node = self.__index.get(relativePath, None)
+        assert node is not None, "given relative path '%s' is not a repository directory"%relativePath
+        def _walk(node):
+            for fname in list(node.files):
+                yield os.path.join(node.relativePath, fname)
+            if recursive:
+                for dnode in list(node.directories.values()):
+                    for p in _walk(dnode):
+                        yield p
+        return _walk(node)
+
+    def walk_directories(self, relativePath='', recursive=False):
+        """
+        Walk a tracked directory and yield directories relative path.
+
+        :parameters:
+            #. relativePath (string): The relative path from which start the walk.
+            #. recursive (boolean): Whether walk all directories recursively
+        """
+        node = self.__index.get(relativePath, None)
+        assert node is not None, "given relative path '%s' is not a repository directory"%relativePath
+        def _walk(node):
+            children = list(node.directories.values())
+            for dnode in children:
+                yield dnode.relativePath
+            if recursive:
+                for dnode in children:
+                    for p in _walk(dnode):
+                        yield p
+        return _walk(node)
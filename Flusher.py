@@ -0,0 +1,174 @@
+"""
+Flusher module provides group commit of repository written files. Instead of
+calling fsync every time a file is written, written files paths are
+registered in a Flusher and a background thread syncs them all to disk
+together every interval or as soon as enough files are pending. Their parent
+directories are synced afterwards so files replaced by renaming are durable
+too. flush is a barrier that returns when every file registered before
+calling it is synced to disk.
+"""
+# standard distribution imports
+import os, threading
+
+
+def fsync_path(path):
+    """
+    Sync a file to disk given its path.
+
+    :Parameters:
+        #. path (string): The file path.
+
+    :Returns:
+        #. synced (boolean): Whether file was found and synced.
+    """
+    flags = os.O_RDWR if os.name == 'nt' else os.O_RDONLY
+    try:
+        fd = os.open(path, flags)
+    except OSError:
+        # file was removed or replaced since it was written
+        return False
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+    return True
+
+
+def fsync_directory(path):
+    """
+    Sync a directory entries to disk given its path. Renaming a file into a
+    directory is durable only once the directory is synced. Directories
+    can't be synced on Windows where nothing is done.
+
+    :Parameters:
+        #. path (string): The directory path.
+
+    :Returns:
+        #. synced (boolean): Whether directory was found and synced.
+    """
+    if os.name == 'nt':
+        return False
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return False
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+    return True
+
+
+class Flusher(object):
+    """
+    Background group commit of written files.
+
+    :Parameters:
+        #. interval (number): Maximum time in seconds a registered file waits
+           before being synced to disk.
+        #. maxOperations (int): Number of pending files that triggers syncing
+           without waiting for interval to elapse.
+    """
+    def __init__(self, interval=0.05, maxOperations=100):
+        assert isinstance(interval, (int, float)), "interval must be a number"
+        assert interval>0, "interval must be >0"
+        assert isinstance(maxOperations, int), "maxOperations must be an integer"
+        assert maxOperations>0, "maxOperations must be >0"
+        self.__interval      = interval
+        self.__maxOperations = maxOperations
+        self.__pending       = set()
+        self.__pendingLock   = threading.Lock()
+        self.__flushLock     = threading.Lock()
+        self.__event         = threading.Event()
+        self.__thread        = None
+        self.__stop          = False
+        self.__stats         = {'flushes':0, 'files':0, 'directories':0, 'errors':0}
+
+    @property
+    def interval(self):
+        """Maximum time in seconds a registered file waits before syncing."""
+        return self.__interval
+
+    @property
+    def maxOperations(self):
+        """Number of pending files that triggers syncing."""
+        return self.__maxOperations
+
+    @property
+    def pendingLength(self):
+        """Number of files waiting to be synced."""
+        return len(self.__pending)
+
+    def __run(self):
+        while not self.__stop:
+            self.__event.wait(self.__interval)
+            self.__event.clear()
+            self.flush()
+
+    def add(self, path):
+        """
+        Register a written file to be synced to disk.
+
+        :Parameters:
+            #. path (string): The written file path.
+        """
+        with self.__pendingLock:
+            self.__pending.add(path)
+            npending = len(self.__pending)
+            if self.__thread is None or not self.__thread.is_alive():
+                self.__stop   = False
+                self.__thread = threading.Thread(target=self.__run, name='pyrep-flusher')
+                self.__thread.daemon = True
+                self.__thread.start()
+        if npending >= self.__maxOperations:
+            self.__event.set()
+
+    def flush(self):
+        """
+        Sync all pending files to disk. Returns when every file registered
+        before calling flush is synced.
+
+        :Returns:
+            #. nfiles (int): Number of synced files.
+        """
+        with self.__flushLock:
+            with self.__pendingLock:
+                pending, self.__pending = self.__pending, set()
+            nfiles = 0
+            for path in pending:
+                try:
+                    nfiles += fsync_path(path)
+                except OSError:
+                    self.__stats['errors'] += 1
+            ndirs = 0
+            for path in set([os.path.dirname(p) for p in pending]):
+                try:
+                    ndirs += fsync_directory(path)
+                except OSError:
+                    self.__stats['errors'] += 1
+            if len(pending):
+                self.__stats['flushes']     += 1
+                self.__stats['files']       += nfiles
+                self.__stats['directories'] += ndirs
+        return nfiles
+
+    def stop(self):
+        """Sync all pending files and stop background thread."""
+        self.__stop = True
+        self.__event.set()
+        if self.__thread is not None and self.__thread is not threading.current_thread():
+            self.__thread.join()
+        self.__thread = None
+        self.flush()
+
+    def get_stats(self):
+        """
+        Get flusher statistics.
+
+        :Returns:
+            #. stats (dict): Dictionary of 'flushes', 'files', 'directories',
+               'errors' and 'pending'.
+        """
+        stats = dict(self.__stats)
+        stats['pending'] = len(self.__pending)
+        return stats
@@ -0,0 +1,428 @@
+"""
+Lockers module provides the locker backends used by a Repository to manage
+concurrent access to its directories and files. A locker acquires and
+releases locks on arbitrary string paths, and acquiring a list of paths is
+atomic: either all paths are locked or none of them is.
+
+Available backends are:
+
+    #. 'server': pylocker ServerLocker. The first process to open the
+       repository serves locks over a socket to all other processes. This is
+       the default and the only backend supporting processes on different
+       machines sharing the same repository.
+    #. 'thread': in process locks. Lock round trips are as cheap as
+       acquiring a threading lock, but only threads of a single process
+       are synchronized. Suitable for repositories that are only used by
+       one process at a time.
+    #. 'file': POSIX fcntl.flock locks. Lock paths are hashed onto a fixed
+       number of files under the repository .pyreplocks directory. Processes
+       of the same machine are synchronized without any server.
+
+'thread' and 'file' lockers support shared locks natively. Every locker
+implements start, stop, acquire_lock and release_lock. New backends can be
+registered with register_locker.
+
+.. code-block:: python
+
+    from pyrep import Repository
+
+    REP = Repository(locker='thread')
+    REP.create_repository(PATH)
+"""
+# standard distribution imports
+import os, sys, time, uuid, hashlib, threading
+
+# python version dependant imports
+if sys.version_info >= (3, 0):
+    basestring = str
+
+# pylocker imports
+from pylocker import FACTORY
+
+
+class RepositoryLocker(object):
+    """
+    Locker backend interface. Locks are acquired on string paths which
+    don't need to exist on disk. Locks are not reentrant, acquiring a path
+    already locked by the same thread blocks until timeout.
+
+    :Parameters:
+        #. serverFile (string): The repository lock file path. It's the key
+           lockers of the same repository share.
+        #. password (string): The repository locker password.
+    """
+    # whether acquire_lock supports shared locks
+    sharedLocks = False
+
+    def __init__(self, serverFile, password):
+        assert isinstance(serverFile, basestring), "serverFile must be a string"
+        self.__serverFile = serverFile
+
+    @property
+    def serverFile(self):
+        """The repository lock file path."""
+        return self.__serverFile
+
+    def start(self):
+        """Start locker. Called every time a repository is loaded."""
+        pass
+
+    def stop(self):
+        """Stop locker. Called when repository is closed."""
+        pass
+
+    def acquire_lock(self, path, timeout=10, shared=False):
+        """
+        Acquire lock on a path or a list of paths.
+
+        :Parameters:
+            #. path (string, list): The path or list of paths to lock.
+            #. timeout (number): The maximum time in seconds to wait for
+               the lock.
+            #. shared (boolean): Whether to acquire a shared lock. Shared
+               locks on a path are held by many owners at the same time
+               while an exclusive lock is held by a single owner.
+
+        :Returns:
+            #. acquired (boolean): Whether lock is acquired.
+            #. lockId (string, int): The lock unique id to release the lock.
+               If acquired is False, this is the failure code where 0 means
+               the lock was not acquired before timeout.
+        """
+        raise NotImplementedError("acquire_lock must be implemented")
+
+    def release_lock(self, lockId):
+        """
+        Release lock.
+
+        :Parameters:
+            #. lockId (string): The lock unique id as returned by acquire_lock.
+
+        :Returns:
+            #. released (boolean): Whether lock is released.
+            #. code (int, string): 1 when released and the failure reason
+               otherwise.
+        """
+        raise NotImplementedError("release_lock must be implemented")
+
+    def _get_paths(self, path, timeout):
+        if isinstance(path, basestring):
+            path = [path]
+        assert len(path), "path must be given"
+        assert all([isinstance(p, basestring) for p in path]), "path must be a string or a list of string"
+        assert isinstance(timeout, (int,float)), "timeout must be a number"
+        assert timeout>0, "timeout must be >0"
+        return list(set(path))
+
+
+class ThreadLocker(RepositoryLocker):
+    """
+    In process locker. Lock requests are granted in order of arrival among
+    requests sharing a path, therefore a waiting exclusive request blocks
+    later shared requests and writers are not starved by readers.
+    """
+    sharedLocks = True
+
+    def __init__(self, serverFile, password):
+        super(ThreadLocker, self).__init__(serverFile=serverFile, password=password)
+        self.__condition = threading.Condition(threading.Lock())
+        # path: [number of shared owners, whether exclusively owned]
+        self.__owners    = {}
+        # waiting requests (lockId, paths, shared) in order of arrival
+        self.__waiting   = []
+        # acquired requests paths and shared flag by lockId
+        self.__acquired  = {}
+
+    def __can_acquire(self, lockId, paths, shared):
+        for p in paths:
+            owner = self.__owners.get(p, None)
+            if owner is not None and (owner[1] or not shared):
+                return False
+        for wid, wpaths, _ in self.__waiting:
+            if wid == lockId:
+                return True
+            if not wpaths.isdisjoint(paths):
+                return False
+        return True
+
+    def acquire_lock(self, path, timeout=10, shared=False):
+        paths    = frozenset(self._get_paths(path, timeout))
+        lockId   = str(uuid.uuid1())
+        deadline = time.time()+timeout
+        with self.__condition:
+            request = (lockId, paths, shared)
+            self.__waiting.append(request)
+            while not self.__can_acquire(lockId, paths, shared):
+                remaining = deadline-time.time()
+                if remaining <= 0:
+                    self.__waiting.remove(request)
+                    self.__condition.notify_all()
+                    return False, 0
+                self.__condition.wait(remaining)
+            self.__waiting.remove(request)
+            for p in paths:
+                owner = self.__owners.setdefault(p, [0, False])
+                if shared:
+                    owner[0] += 1
+                else:
+                    owner[1] = True
+            self.__acquired[lockId] = (paths, shared)
+            # later shared requests may be granted too
+            self.__condition.notify_all()
+        return True, lockId
+
+    def release_lock(self, lockId):
+        with self.__condition:
+            request = self.__acquired.pop(lockId, None)
+            if request is None:
+                return False, "lock '%s' is not acquired"%(lockId,)
+            paths, shared = request
+            for p in paths:
+                owner = self.__owners[p]
+                if shared:
+                    owner[0] -= 1
+                else:
+                    owner[1] = False
+                if not owner[0] and not owner[1]:
+                    self.__owners.pop(p)
+            self.__condition.notify_all()
+        return True, 1
+
+
+class FileLocker(RepositoryLocker):
+    """
+    POSIX fcntl.flock locker. Lock paths are hashed onto STRIPES lock files,
+    each with a gate file, in the .pyreplocks directory next to serverFile.
+    Lock directory size is therefore bounded whatever the number of locked
+    paths. Lock and gate files are never removed because removing a file
+    another process is about to lock would break mutual exclusion.
+
+    Threads of the same process are synchronized on exact paths by an in
+    process ThreadLocker and the process holds every stripe file lock once
+    for all its threads. Paths sharing a stripe only wait on each other
+    across processes, or within the process when a stripe locked shared is
+    requested exclusively. Shared and exclusive requests go through the
+    stripe gate, which exclusive requests hold until they own the lock, so
+    waiting writers block new readers. flock doesn't support timeouts,
+    waiting is done by polling.
+    """
+    sharedLocks = True
+    # maximum sleep in seconds between two locking attempts
+    POLL_INTERVAL = 0.01
+    # number of lock files paths are hashed onto. Must be the same for all
+    # processes sharing a repository
+    STRIPES = 4096
+
+    def __init__(self, serverFile, password):
+        super(FileLocker, self).__init__(serverFile=serverFile, password=password)
+        import fcntl
+        self.__fcntl     = fcntl
+        self.__lockDir   = os.path.join(os.path.dirname(serverFile), '.pyreplocks')
+        self.__paths     = ThreadLocker(serverFile=serverFile, password=password)
+        self.__condition = threading.Condition(threading.Lock())
+        # stripe: {'fd', 'shared', 'exclusive', 'busy', 'waiting'} where
+        # shared and exclusive are the numbers of process holders
+        self.__stripes   = {}
+        # acquired requests in process paths lockId and stripes by lockId
+        self.__acquired  = {}
+
+    @property
+    def lockDirectory(self):
+        """The directory where lock files are created."""
+        return self.__lockDir
+
+    def start(self):
+        if not os.path.isdir(self.__lockDir):
+            try:
+                os.makedirs(self.__lockDir)
+            except OSError:
+                if not os.path.isdir(self.__lockDir):
+                    raise
+
+    def __open(self, name):
+        return os.open(os.path.join(self.__lockDir, name), os.O_RDWR|os.O_CREAT, 420)
+
+    def __flock(self, fd, operation, deadline):
+        # try locking until deadline. Returns whether locked
+        wait = 0.0005
+        while True:
+            try:
+                self.__fcntl.flock(fd, operation|self.__fcntl.LOCK_NB)
+                return True
+            except (IOError, OSError):
+                if time.time() >= deadline:
+                    return False
+            time.sleep(min(wait, max(0, deadline-time.time())))
+            wait = min(2*wait, self.POLL_INTERVAL)
+
+    def __unlock(self, fds):
+        for fd in fds:
+            try:
+                self.__fcntl.flock(fd, self.__fcntl.LOCK_UN)
+            finally:
+                os.close(fd)
+
+    def __lock_file(self, name, shared, deadline):
+        # lock stripe file through its gate. Returns locked file descriptor
+        # or None
+        gate = self.__open(name+'.gate')
+        try:
+            if not self.__flock(gate, self.__fcntl.LOCK_EX, deadline):
+                return None
+            fd = self.__open(name)
+            if not self.__flock(fd, self.__fcntl.LOCK_SH if shared else self.__fcntl.LOCK_EX, deadline):
+                os.close(fd)
+                return None
+            return fd
+        finally:
+            self.__unlock([gate])
+
+    def __acquire_stripe(self, stripe, shared, deadline):
+        with self.__condition:
+            while True:
+                state = self.__stripes.setdefault(stripe, {'fd':None, 'shared':0, 'exclusive':0, 'busy':False, 'waiting':0})
+                if not state['busy']:
+                    # process already holds stripe in a sufficient mode.
+                    # Waiting exclusive requests block new shared ones
+                    if state['fd'] is not None and (state['exclusive'] or (shared and not state['waiting'])):
+                        state['shared' if shared else 'exclusive'] += 1
+                        return True
+                    if state['fd'] is None:
+                        state['busy'] = True
+                        break
+                remaining = deadline-time.time()
+                if remaining <= 0:
+                    if not state['busy'] and state['fd'] is None and not state['waiting']:
+                        self.__stripes.pop(stripe)
+                    return False
+                if not shared:
+                    state['waiting'] += 1
+                self.__condition.wait(min(remaining, self.POLL_INTERVAL))
+                if not shared:
+                    state['waiting'] -= 1
+        fd = None
+        try:
+            fd = self.__lock_file('%04x'%stripe, shared, deadline)
+        finally:
+            with self.__condition:
+                state = self.__stripes[stripe]
+                state['busy'] = False
+                if fd is not None:
+                    state['fd'] = fd
+                    state['shared' if shared else 'exclusive'] += 1
+                elif not state['waiting']:
+                    self.__stripes.pop(stripe)
+                self.__condition.notify_all()
+        return fd is not None
+
+    def __release_stripes(self, stripes):
+        fds = []
+        with self.__condition:
+            for stripe, shared in stripes:
+                state = self.__stripes[stripe]
+                state['shared' if shared else 'exclusive'] -= 1
+                if not state['shared'] and not state['exclusive']:
+                    fds.append(state['fd'])
+                    state['fd'] = None
+                    if not state['waiting']:
+                        self.__stripes.pop(stripe)
+            self.__condition.notify_all()
+        self.__unlock(fds)
+
+    def acquire_lock(self, path, timeout=10, shared=False):
+        # stripes are locked in sorted order so concurrent requests of
+        # overlapping paths can't deadlock
+        paths    = self._get_paths(path, timeout)
+        deadline = time.time()+timeout
+        acquired, pathsLockId = self.__paths.acquire_lock(paths, timeout=timeout, shared=shared)
+        if not acquired:
+            return False, 0
+        stripes = sorted(set([int(hashlib.sha1(p.encode('utf-8')).hexdigest(), 16)%self.STRIPES for p in paths]))
+        held    = []
+        try:
+            for stripe in stripes:
+                if not self.__acquire_stripe(stripe, shared, deadline):
+                    break
+                held.append( (stripe, shared) )
+        finally:
+            if len(held) != len(stripes):
+                self.__release_stripes(held)
+                self.__paths.release_lock(pathsLockId)
+        if len(held) != len(stripes):
+            return False, 0
+        lockId = str(uuid.uuid1())
+        with self.__condition:
+            self.__acquired[lockId] = (pathsLockId, held)
+        return True, lockId
+
+    def release_lock(self, lockId):
+        with self.__condition:
+            request = self.__acquired.pop(lockId, None)
+        if request is None:
+            return False, "lock '%s' is not acquired"%(lockId,)
+        pathsLockId, held = request
+        self.__release_stripes(held)
+        self.__paths.release_lock(pathsLockId)
+        return True, 1
+
+
+## lockers registry
+def _get_server_locker(serverFile, password):
+    return FACTORY(key=serverFile, password=password, serverFile=serverFile, autoconnect=False, reconnect=False)
+
+# in process lockers must be shared by all repository instances of the same
+# process, they are kept by serverFile like pylocker FACTORY does
+_LOCKERS      = {}
+_LOCKERS_LOCK = threading.Lock()
+
+def _get_shared_locker(klass):
+    def get(serverFile, password):
+        key = (klass.__name__, os.path.realpath(serverFile))
+        with _LOCKERS_LOCK:
+            locker = _LOCKERS.get(key, None)
+            if locker is None:
+                locker = _LOCKERS[key] = klass(serverFile=serverFile, password=password)
+        return locker
+    return get
+
+_FACTORIES = {'server': _get_server_locker,
+              'thread': _get_shared_locker(ThreadLocker),
+              'file'  : _get_shared_locker(FileLocker)}
+
+def register_locker(name, factory, replace=False):
+    """
+    Register a locker backend.
+
+    :Parameters:
+        #. name (string): The backend name as given to Repository locker
+           argument.
+        #. factory (callable): Called as factory(serverFile, password) every
+           time a repository is loaded and returns the repository locker.
+           Repository instances of the same process sharing the same
+           serverFile must get lockers that synchronize with each other.
+        #. replace (boolean): Whether to replace an already registered
+           backend of the same name.
+    """
+    assert isinstance(name, basestring), "name must be a string"
+    assert callable(factory), "factory must be callable"
+    assert replace or name not in _FACTORIES, "locker '%s' is already registered. Set replace to True"%(name,)
+    _FACTORIES[name] = factory
+
+def get_lockers():
+    """Get registered locker backends names list."""
+    return sorted(_FACTORIES)
+
+def get_locker(name, serverFile, password):
+    """
+    Get repository locker.
+
+    :Parameters:
+        #. name (string): The locker backend name.
+        #. serverFile (string): The repository lock file path.
+        #. password (string): The repository locker password.
+
+    :Returns:
+        #. locker (object): The locker. It's not started.
+    """
+    assert name in _FACTORIES, "unknown locker '%s'. Registered lockers are %s"%(name, get_lockers())
+    return _FACTORIES[name](serverFile, password)
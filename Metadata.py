@@ -0,0 +1,541 @@
+"""
+Metadata module provides the sqlite3 metadata backend of a Repository.
+By default, every repository file information is pickled next to the file in
+a .%s_pyrepfileinfo file and every directory information in a .pyrepdirinfo
+file. With the 'sqlite' metadata backend, files and directories information
+are stored in a single indexed .pyrepmetadata sqlite3 database instead.
+Listing and querying information doesn't walk nor open one file per
+repository file anymore.
+
+The repository directory tree is not stored in the database. It stays in
+.pyreprepo and .pyreprepojournal for both backends, where it's loaded,
+reloaded when another process changed it and compacted the same way. The
+database holds information of the files and directories of that tree, and
+get_stats keeps counting them from the in memory tree.
+
+The database is opened in write ahead logging (WAL) mode, therefore readers
+never block writers nor other readers. Writes are serialized by sqlite and
+are done while holding the repository locks as with pickle metadata.
+
+Repository.find queries are answered by the database indexes or, with
+pickle metadata, by a FileIndex built in memory upon first query and
+maintained by every repository change.
+
+.. code-block:: python
+
+    from pyrep import Repository
+
+    REP = Repository(metadata='sqlite')
+    REP.create_repository(PATH)
+
+    # convert an existing repository back to pickle metadata
+    REP.convert_metadata('pickle')
+"""
+# standard distribution imports
+import os, sys, re, sqlite3, threading, fnmatch, bisect, weakref
+try:
+    import cPickle as pickle
+except:
+    import pickle
+
+# python version dependant imports
+if sys.version_info >= (3, 0):
+    basestring = str
+
+
+# sqlite synchronous level by durability
+_SYNCHRONOUS = {'strict':'FULL', 'batch':'NORMAL', 'none':'OFF'}
+
+_SCHEMA = ["CREATE TABLE IF NOT EXISTS directories (path TEXT PRIMARY KEY, parent TEXT, info BLOB)",
+           "CREATE INDEX IF NOT EXISTS directories_parent ON directories (parent)",
+           "CREATE TABLE IF NOT EXISTS files (path TEXT PRIMARY KEY, directory TEXT, info BLOB, "
+           "class TEXT, codec TEXT, size INTEGER, checksum TEXT, "
+           "create_utctime REAL, last_update_utctime REAL, description TEXT)",
+           "CREATE INDEX IF NOT EXISTS files_directory ON files (directory)",
+           "CREATE INDEX IF NOT EXISTS files_last_update_utctime ON files (last_update_utctime)",
+           "CREATE INDEX IF NOT EXISTS files_class ON files (class)",
+           "CREATE INDEX IF NOT EXISTS files_codec ON files (codec)"]
+
+
+def _compile_filters(pattern=None, regex=None):
+    # get (literal prefix, compiled pattern, compiled regex) of find path
+    # filters. Files outside of prefix never match pattern
+    prefix = patternRe = regexRe = None
+    if pattern is not None:
+        prefix    = re.split(r'[\*\?\[]', pattern, 1)[0]
+        patternRe = re.compile(fnmatch.translate(pattern))
+    if regex is not None:
+        regexRe = re.compile(regex)
+    return prefix, patternRe, regexRe
+
+
+def _match_path(path, patternRe, regexRe):
+    if patternRe is not None and patternRe.match(path) is None:
+        return False
+    if regexRe is not None and regexRe.search(path) is None:
+        return False
+    return True
+
+
+def _get_range(relativePath):
+    # (low, high) bounds of all paths under relativePath directory. Paths
+    # under 'a/b' are all strings starting with 'a/b/', which are all
+    # strings >= 'a/b/' and < 'a/b0' since '0' follows '/'
+    if relativePath == '':
+        return '', None
+    prefix = relativePath+os.sep
+    return prefix, relativePath+chr(ord(os.sep)+1)
+
+
+class SQLiteMetadata(object):
+    """
+    Repository files and directories information stored in a sqlite3
+    database. All paths are repository relative paths, the repository main
+    directory being ''. Every thread uses its own connection.
+
+    :Parameters:
+        #. path (string): The database file path.
+        #. protocol (int): The pickle protocol used to store information.
+        #. timeout (number): The maximum time in seconds to wait for another
+           connection writing the database.
+    """
+    def __init__(self, path, protocol=2, timeout=60):
+        assert isinstance(path, basestring), "path must be a string"
+        self.__path     = path
+        self.__protocol = protocol
+        self.__timeout  = timeout
+        self.__local    = threading.local()
+        self.__lock     = threading.Lock()
+        self.__conns    = weakref.WeakSet()
+        # create schema
+        with self.__transaction('none') as conn:
+            for statement in _SCHEMA:
+                conn.execute(statement)
+
+    def __getstate__(self):
+        return {'path':self.__path, 'protocol':self.__protocol, 'timeout':self.__timeout}
+
+    def __setstate__(self, state):
+        self.__init__(**state)
+
+    @property
+    def path(self):
+        """The database file path."""
+        return self.__path
+
+    def __get_connection(self):
+        # thread connection is closed when thread ends and its local data
+        # is released
+        thConn = getattr(self.__local, 'connection', None)
+        if thConn is None or thConn.connection is None:
+            conn = sqlite3.connect(self.__path, timeout=self.__timeout, isolation_level=None, check_same_thread=False)
+            conn.text_factory = str
+            conn.execute("PRAGMA journal_mode=WAL")
+            thConn = _ThreadConnection(conn)
+            with self.__lock:
+                self.__conns.add(thConn)
+            self.__local.connection = thConn
+        return thConn
+
+    def __transaction(self, durability):
+        thConn = self.__get_connection()
+        synchronous = _SYNCHRONOUS[durability]
+        if synchronous != thConn.synchronous:
+            thConn.connection.execute("PRAGMA synchronous=%s"%synchronous)
+            thConn.synchronous = synchronous
+        return _Transaction(thConn.connection)
+
+    def __query(self, sql, args=()):
+        return self.__get_connection().connection.execute(sql, args)
+
+    def __dumps(self, info):
+        return sqlite3.Binary(pickle.dumps(info, protocol=self.__protocol))
+
+    def __loads(self, data):
+        return pickle.loads(bytes(data))
+
+    def close(self):
+        """Close all threads connections."""
+        with self.__lock:
+            conns, self.__conns = list(self.__conns), weakref.WeakSet()
+        for thConn in conns:
+            thConn.close()
+        self.__local = threading.local()
+
+    def checkpoint(self):
+        """Copy write ahead log into the database and sync it to disk."""
+        self.__query("PRAGMA wal_checkpoint(FULL)").fetchall()
+
+    def get_files(self):
+        """Get the set of relative paths of all files with information."""
+        return set([row[0] for row in self.__query("SELECT path FROM files")])
+
+    def get_directories(self):
+        """Get the set of relative paths of all directories with information."""
+        return set([row[0] for row in self.__query("SELECT path FROM directories")])
+
+    def list_directory(self, relativePath):
+        """
+        Get directory information status.
+
+        :Returns:
+            #. hasInfo (boolean): Whether directory has information.
+            #. files (set): The names of directory files with information.
+        """
+        hasInfo = self.__query("SELECT 1 FROM directories WHERE path=?", (relativePath,)).fetchone() is not None
+        files   = set([os.path.basename(row[0]) for row in self.__query("SELECT path FROM files WHERE directory=?", (relativePath,))])
+        return hasInfo, files
+
+    def count(self):
+        """Get (number of directories, number of files) with information."""
+        ndirs  = self.__query("SELECT COUNT(*) FROM directories WHERE path != ''").fetchone()[0]
+        nfiles = self.__query("SELECT COUNT(*) FROM files").fetchone()[0]
+        return ndirs, nfiles
+
+    ## files
+    def get_file_info(self, relativePath):
+        """Get file information dictionary or None if not found."""
+        row = self.__query("SELECT info FROM files WHERE path=?", (relativePath,)).fetchone()
+        if row is None:
+            return None
+        return self.__loads(row[0])
+
+    def has_file_info(self, relativePath):
+        """Get whether file has information."""
+        return self.__query("SELECT 1 FROM files WHERE path=?", (relativePath,)).fetchone() is not None
+
+    def set_file_info(self, relativePath, info, durability='strict'):
+        """Set file information dictionary. Existing information is replaced."""
+        args = (relativePath, os.path.dirname(relativePath), self.__dumps(info),
+                info.get('class', None), info.get('codec', None), info.get('size', None),
+                info.get('checksum', None), info.get('create_utctime', None),
+                info.get('last_update_utctime', None), info.get('description', None))
+        with self.__transaction(durability) as conn:
+            conn.execute("INSERT OR REPLACE INTO files VALUES (?,?,?,?,?,?,?,?,?,?)", args)
+
+    def remove_file_info(self, relativePath, durability='strict'):
+        """Remove file information."""
+        with self.__transaction(durability) as conn:
+            conn.execute("DELETE FROM files WHERE path=?", (relativePath,))
+
+    def move_file_info(self, relativePath, newRelativePath, durability='strict'):
+        """Move file information to a new path replacing existing one."""
+        with self.__transaction(durability) as conn:
+            conn.execute("DELETE FROM files WHERE path=?", (newRelativePath,))
+            conn.execute("UPDATE files SET path=?, directory=? WHERE path=?", (newRelativePath, os.path.dirname(newRelativePath), relativePath))
+
+    def copy_file_info(self, relativePath, newRelativePath, durability='strict'):
+        """Copy file information to a new path replacing existing one."""
+        with self.__transaction(durability) as conn:
+            conn.execute("INSERT OR REPLACE INTO files SELECT ?, ?, info, class, codec, size, checksum, "
+                         "create_utctime, last_update_utctime, description FROM files WHERE path=?",
+                         (newRelativePath, os.path.dirname(newRelativePath), relativePath))
+
+    def walk_files_info(self, relativePath='', recursive=False):
+        """
+        Walk directory files information.
+
+        :Parameters:
+            #. relativePath (string): The directory relative path.
+            #. recursive (boolean): Whether to walk sub-directories files.
+
+        :Returns:
+            #. walker (generator): Generator of (relativePath, info) tuples
+               ordered by path.
+        """
+        if not recursive:
+            cursor = self.__query("SELECT path, info FROM files WHERE directory=? ORDER BY path", (relativePath,))
+        else:
+            low, high = _get_range(relativePath)
+            if high is None:
+                cursor = self.__query("SELECT path, info FROM files ORDER BY path")
+            else:
+                cursor = self.__query("SELECT path, info FROM files WHERE directory=? OR (directory>=? AND directory<?) ORDER BY path", (relativePath, low, high))
+        for path, info in cursor:
+            yield path, self.__loads(info)
+
+    def find(self, pattern=None, regex=None, updated_after=None, updated_before=None,
+                   klass=None, codec=None, description_contains=None):
+        """
+        Find files information. Class, codec, time and pattern prefix
+        filters are indexed queries. See pyrep.Repository.find.
+
+        :Returns:
+            #. result (list): List of (relativePath, info) ordered by path.
+        """
+        prefix, patternRe, regexRe = _compile_filters(pattern=pattern, regex=regex)
+        where, args = [], []
+        if prefix:
+            where.append("path>=? AND path<?")
+            args.extend([prefix, prefix[:-1]+chr(ord(prefix[-1])+1)])
+        if klass is not None:
+            where.append("class=?")
+            args.append(klass)
+        if codec is not None:
+            where.append("codec=?")
+            args.append(codec)
+        if updated_after is not None:
+            where.append("last_update_utctime>=?")
+            args.append(updated_after)
+        if updated_before is not None:
+            where.append("last_update_utctime<?")
+            args.append(updated_before)
+        if description_contains is not None:
+            where.append("instr(description, ?)>0")
+            args.append(description_contains)
+        sql = "SELECT path, info FROM files"
+        if len(where):
+            sql += " WHERE "+" AND ".join(where)
+        # sorting by path in sql would let sqlite prefer the path index over
+        # more selective ones
+        result = [(path, info) for path, info in self.__query(sql, args) if _match_path(path, patternRe, regexRe)]
+        return [(path, self.__loads(info)) for path, info in sorted(result, key=lambda item:item[0])]
+
+    ## directories
+    def get_directory_info(self, relativePath):
+        """Get directory information dictionary or None if not found."""
+        row = self.__query("SELECT info FROM directories WHERE path=?", (relativePath,)).fetchone()
+        if row is None:
+            return None
+        return self.__loads(row[0])
+
+    def has_directory_info(self, relativePath):
+        """Get whether directory has information."""
+        return self.__query("SELECT 1 FROM directories WHERE path=?", (relativePath,)).fetchone() is not None
+
+    def set_directory_info(self, relativePath, info, durability='strict'):
+        """Set directory information dictionary. Existing information is replaced."""
+        parent = None if relativePath == '' else os.path.dirname(relativePath)
+        with self.__transaction(durability) as conn:
+            conn.execute("INSERT OR REPLACE INTO directories VALUES (?,?,?)", (relativePath, parent, self.__dumps(info)))
+
+    def walk_directories_info(self, relativePath='', recursive=False):
+        """
+        Walk directory sub-directories information.
+
+        :Parameters:
+            #. relativePath (string): The directory relative path.
+            #. recursive (boolean): Whether to walk sub-directories recursively.
+
+        :Returns:
+            #. walker (generator): Generator of (relativePath, info) tuples
+               ordered by path.
+        """
+        if not recursive:
+            cursor = self.__query("SELECT path, info FROM directories WHERE parent=? ORDER BY path", (relativePath,))
+        else:
+            low, high = _get_range(relativePath)
+            if high is None:
+                cursor = self.__query("SELECT path, info FROM directories WHERE path!='' ORDER BY path")
+            else:
+                cursor = self.__query("SELECT path, info FROM directories WHERE path>=? AND path<? ORDER BY path", (low, high))
+        for path, info in cursor:
+            yield path, self.__loads(info)
+
+    def remove_directory(self, relativePath, durability='strict'):
+        """Remove directory, sub-directories and files information."""
+        low, high = _get_range(relativePath)
+        assert high is not None, "removing main directory information is not allowed"
+        with self.__transaction(durability) as conn:
+            conn.execute("DELETE FROM directories WHERE path=? OR (path>=? AND path<?)", (relativePath, low, high))
+            conn.execute("DELETE FROM files WHERE directory=? OR (directory>=? AND directory<?)", (relativePath, low, high))
+
+    def __copy_directory(self, conn, relativePath, newRelativePath, move):
+        low, high = _get_range(relativePath)
+        assert high is not None, "moving or copying main directory information is not allowed"
+        start = len(relativePath)+1
+        args  = (newRelativePath, start, newRelativePath, start, relativePath, low, high)
+        if move:
+            conn.execute("UPDATE files SET path=?||substr(path,?), directory=?||substr(directory,?) "
+                         "WHERE directory=? OR (directory>=? AND directory<?)", args)
+            conn.execute("UPDATE directories SET path=?||substr(path,?), parent=?||substr(parent,?) "
+                         "WHERE path>=? AND path<?", args[:4]+args[5:])
+            conn.execute("UPDATE directories SET path=?, parent=? WHERE path=?",
+                         (newRelativePath, os.path.dirname(newRelativePath), relativePath))
+        else:
+            conn.execute("INSERT OR REPLACE INTO files SELECT ?||substr(path,?), ?||substr(directory,?), info, "
+                         "class, codec, size, checksum, create_utctime, last_update_utctime, description "
+                         "FROM files WHERE directory=? OR (directory>=? AND directory<?)", args)
+            conn.execute("INSERT OR REPLACE INTO directories SELECT ?||substr(path,?), ?||substr(parent,?), info "
+                         "FROM directories WHERE path>=? AND path<?", args[:4]+args[5:])
+            conn.execute("INSERT OR REPLACE INTO directories SELECT ?, ?, info FROM directories WHERE path=?",
+                         (newRelativePath, os.path.dirname(newRelativePath), relativePath))
+
+    def move_directory(self, relativePath, newRelativePath, durability='strict'):
+        """Move directory, sub-directories and files information."""
+        with self.__transaction(durability) as conn:
+            self.__copy_directory(conn, relativePath, newRelativePath, move=True)
+
+    def copy_directory(self, relativePath, newRelativePath, durability='strict'):
+        """Copy directory, sub-directories and files information."""
+        with self.__transaction(durability) as conn:
+            self.__copy_directory(conn, relativePath, newRelativePath, move=False)
+
+
+class _Transaction(object):
+    # immediate transaction committed on success and rolled back on error
+    def __init__(self, conn):
+        self.__conn = conn
+
+    def __enter__(self):
+        self.__conn.execute("BEGIN IMMEDIATE")
+        return self.__conn
+
+    def __exit__(self, excType, excValue, tb):
+        if excType is None:
+            self.__conn.execute("COMMIT")
+        else:
+            self.__conn.execute("ROLLBACK")
+        return False
+
+
+class _ThreadConnection(object):
+    """sqlite connection of a thread. Connection is closed when released"""
+    def __init__(self, connection):
+        self.connection  = connection
+        self.synchronous = None
+
+    def __del__(self):
+        self.close()
+
+    def close(self):
+        conn, self.connection = self.connection, None
+        if conn is not None:
+            try:
+                conn.close()
+            except Exception:
+                pass
+
+
+class FileIndex(object):
+    """
+    In memory index of files information answering find queries of pickle
+    metadata repositories. Files are indexed by class, codec and last update
+    time. Paths are relative paths as in SQLiteMetadata. Every file
+    information is kept with a stamp of its metadata file used to detect
+    changes made by other processes. A None stamp is never up to date.
+
+    :Parameters:
+        #. items (None, iterable): (relativePath, info, stamp) items to index.
+    """
+    def __init__(self, items=None):
+        self.__infos   = {}
+        self.__stamps  = {}
+        self.__classes = {}
+        self.__codecs  = {}
+        self.__times   = []
+        if items is not None:
+            for relativePath, info, stamp in items:
+                self.__infos[relativePath]  = info
+                self.__stamps[relativePath] = stamp
+                self.__classes.setdefault(info.get('class', None), set()).add(relativePath)
+                self.__codecs.setdefault(info.get('codec', None), set()).add(relativePath)
+                self.__times.append( (info.get('last_update_utctime', None) or 0, relativePath) )
+            self.__times.sort()
+
+    def __len__(self):
+        return len(self.__infos)
+
+    def __contains__(self, relativePath):
+        return relativePath in self.__infos
+
+    def get_stamps(self):
+        """Get list of indexed (relativePath, stamp) items."""
+        return list(self.__stamps.items())
+
+    def set(self, relativePath, info, stamp=None):
+        """Set file information and its stamp. Existing information is replaced."""
+        self.remove(relativePath)
+        self.__infos[relativePath]  = info
+        self.__stamps[relativePath] = stamp
+        self.__classes.setdefault(info.get('class', None), set()).add(relativePath)
+        self.__codecs.setdefault(info.get('codec', None), set()).add(relativePath)
+        bisect.insort(self.__times, (info.get('last_update_utctime', None) or 0, relativePath))
+
+    def remove(self, relativePath):
+        """Remove file information if indexed."""
+        info = self.__infos.pop(relativePath, None)
+        if info is None:
+            return
+        self.__stamps.pop(relativePath, None)
+        for lut, key in ((self.__classes, info.get('class', None)), (self.__codecs, info.get('codec', None))):
+            paths = lut[key]
+            paths.discard(relativePath)
+            if not len(paths):
+                lut.pop(key)
+        item = (info.get('last_update_utctime', None) or 0, relativePath)
+        idx  = bisect.bisect_left(self.__times, item)
+        if idx < len(self.__times) and self.__times[idx] == item:
+            self.__times.pop(idx)
+
+    def move(self, relativePath, newRelativePath):
+        """Move file information to a new path replacing existing one."""
+        info  = self.__infos.get(relativePath, None)
+        stamp = self.__stamps.get(relativePath, None)
+        self.remove(relativePath)
+        self.remove(newRelativePath)
+        if info is not None:
+            self.set(newRelativePath, info, stamp=stamp)
+
+    def copy(self, relativePath, newRelativePath):
+        """Copy file information to a new path replacing existing one."""
+        info = self.__infos.get(relativePath, None)
+        self.remove(newRelativePath)
+        if info is not None:
+            self.set(newRelativePath, info)
+
+    def __get_directory_files(self, relativePath):
+        prefix = relativePath+os.sep
+        return [p for p in self.__infos if p.startswith(prefix)]
+
+    def remove_directory(self, relativePath):
+        """Remove directory files information."""
+        for path in self.__get_directory_files(relativePath):
+            self.remove(path)
+
+    def move_directory(self, relativePath, newRelativePath):
+        """Move directory files information."""
+        for path in self.__get_directory_files(relativePath):
+            self.move(path, newRelativePath+path[len(relativePath):])
+
+    def copy_directory(self, relativePath, newRelativePath):
+        """Copy directory files information."""
+        for path in self.__get_directory_files(relativePath):
+            self.copy(path, newRelativePath+path[len(relativePath):])
+
+    def find(self, pattern=None, regex=None, updated_after=None, updated_before=None,
+                   klass=None, codec=None, description_contains=None):
+        """
+        Find files information. Class, codec and time filters are indexed.
+        See pyrep.Repository.find.
+
+        :Returns:
+            #. result (list): List of (relativePath, info) ordered by path.
+        """
+        prefix, patternRe, regexRe = _compile_filters(pattern=pattern, regex=regex)
+        # select candidates from indexes
+        candidates = None
+        if klass is not None:
+            candidates = self.__classes.get(klass, set())
+        if codec is not None:
+            paths = self.__codecs.get(codec, set())
+            candidates = paths if candidates is None else candidates & paths
+        if updated_after is not None or updated_before is not None:
+            lo = 0 if updated_after is None else bisect.bisect_left(self.__times, (updated_after,))
+            hi = len(self.__times) if updated_before is None else bisect.bisect_left(self.__times, (updated_before,))
+            paths = set([p for _, p in self.__times[lo:hi]])
+            candidates = paths if candidates is None else candidates & paths
+        if candidates is None:
+            candidates = self.__infos
+        # filter candidates
+        result = []
+        for path in candidates:
+            if prefix and not path.startswith(prefix):
+                continue
+            if not _match_path(path, patternRe, regexRe):
+                continue
+            info = self.__infos[path]
+            if description_contains is not None and description_contains not in (info.get('description', None) or ''):
+                continue
+            result.append( (path, info) )
+        return sorted(result, key=lambda item:item[0])
@@ -0,0 +1,153 @@
+"""
+ObjectCache module provides the in-process least recently used cache of
+pulled repository objects. Cached objects are stored by file relative path
+along with a stamp, the payload file (modification time, size, inode), and a
+cached object is returned only when the stamp still matches the file on disk.
+Replaced files get a new inode, therefore a file replaced within the same
+modification time tick with the same size is not mistaken for the cached one.
+The cache is bounded by a number of entries, a number of bytes or both.
+"""
+# standard distribution imports
+import os, threading
+from collections import OrderedDict
+
+
+class ObjectCache(object):
+    """
+    Thread safe, bounded and least recently used cache of pulled objects.
+
+    :Parameters:
+        #. maxEntries (None, int): Maximum number of cached objects.
+           If None, the number of entries is not bounded.
+        #. maxBytes (None, int): Maximum sum of cached objects size in bytes.
+           If None, cached objects size is not bounded.
+    """
+    def __init__(self, maxEntries=None, maxBytes=None):
+        assert maxEntries is not None or maxBytes is not None, "maxEntries and maxBytes can't be both None"
+        if maxEntries is not None:
+            assert isinstance(maxEntries, int), "maxEntries must be None or an integer"
+            assert maxEntries>0, "maxEntries must be >0"
+        if maxBytes is not None:
+            assert isinstance(maxBytes, int), "maxBytes must be None or an integer"
+            assert maxBytes>0, "maxBytes must be >0"
+        self.__maxEntries  = maxEntries
+        self.__maxBytes    = maxBytes
+        self.__entries     = OrderedDict()
+        self.__nbytes      = 0
+        self.__lock        = threading.Lock()
+        self.__stats       = {'hits':0, 'misses':0, 'evictions':0, 'invalidations':0}
+        self.fingerprint   = None
+
+    def __getstate__(self):
+        return {'maxEntries':self.__maxEntries, 'maxBytes':self.__maxBytes}
+
+    def __setstate__(self, state):
+        self.__init__(maxEntries=state['maxEntries'], maxBytes=state['maxBytes'])
+
+    def __len__(self):
+        return len(self.__entries)
+
+    @property
+    def maxEntries(self):
+        """Maximum number of cached objects."""
+        return self.__maxEntries
+
+    @property
+    def maxBytes(self):
+        """Maximum sum of cached objects size in bytes."""
+        return self.__maxBytes
+
+    def __evict(self):
+        while len(self.__entries):
+            if self.__maxEntries is not None and len(self.__entries)>self.__maxEntries:
+                pass
+            elif self.__maxBytes is not None and self.__nbytes>self.__maxBytes:
+                pass
+            else:
+                break
+            _, (_, _, nbytes) = self.__entries.popitem(last=False)
+            self.__nbytes -= nbytes
+            self.__stats['evictions'] += 1
+
+    def get(self, key, stamp):
+        """
+        Get cached object.
+
+        :Parameters:
+            #. key (string): The file relative path.
+            #. stamp (object): The file stamp that must match the cached one.
+
+        :Returns:
+            #. found (boolean): Whether object was found in cache.
+            #. value (object): The cached object or None.
+        """
+        with self.__lock:
+            entry = self.__entries.get(key, None)
+            if entry is None or entry[0] != stamp:
+                self.__stats['misses'] += 1
+                return False, None
+            # move to most recently used
+            self.__entries.pop(key)
+            self.__entries[key] = entry
+            self.__stats['hits'] += 1
+            return True, entry[1]
+
+    def set(self, key, stamp, value, nbytes):
+        """
+        Cache an object. Least recently used objects are evicted when
+        the cache is full. Objects bigger than maxBytes are not cached.
+
+        :Parameters:
+            #. key (string): The file relative path.
+            #. stamp (object): The file stamp.
+            #. value (object): The object to cache.
+            #. nbytes (int): The object size in bytes.
+        """
+        with self.__lock:
+            old = self.__entries.pop(key, None)
+            if old is not None:
+                self.__nbytes -= old[2]
+            if self.__maxBytes is not None and nbytes>self.__maxBytes:
+                return
+            self.__entries[key] = (stamp, value, nbytes)
+            self.__nbytes += nbytes
+            self.__evict()
+
+    def invalidate(self, key):
+        """Remove file relative path cached object."""
+        with self.__lock:
+            old = self.__entries.pop(key, None)
+            if old is not None:
+                self.__nbytes -= old[2]
+                self.__stats['invalidations'] += 1
+
+    def invalidate_directory(self, relativePath):
+        """Remove all cached objects of files under directory relative path."""
+        prefix = os.path.join(relativePath, '')
+        with self.__lock:
+            for key in [k for k in self.__entries if k.startswith(prefix)]:
+                self.__nbytes -= self.__entries.pop(key)[2]
+                self.__stats['invalidations'] += 1
+
+    def clear(self):
+        """Remove all cached objects."""
+        with self.__lock:
+            self.__stats['invalidations'] += len(self.__entries)
+            self.__entries.clear()
+            self.__nbytes = 0
+
+    def get_stats(self):
+        """
+        Get cache statistics.
+
+        :Returns:
+            #. stats (dict): Dictionary of 'hits', 'misses', 'evictions',
+               'invalidations', 'entries', 'bytes', 'maxEntries' and 'maxBytes'.
+        """
+        with self.__lock:
+            stats = dict(self.__stats)
+            stats['entries']    = len(self.__entries)
+            stats['bytes']      = self.__nbytes
+            stats['maxEntries'] = self.__maxEntries
+            stats['maxBytes']   = self.__maxBytes
+        return stats
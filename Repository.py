@@ -227,22 +227,33 @@ output
 
 # standard distribution imports
 from __future__ import print_function
-import os, sys, re, time, uuid, warnings, tarfile, shutil, traceback, inspect
+import os, sys, re, time, uuid, random, warnings, tarfile, shutil, traceback, inspect, hashlib, threading, pickletools, importlib
+from collections import OrderedDict
+from io import BytesIO
+from itertools import islice
+from multiprocessing import cpu_count
+from multiprocessing.pool import ThreadPool
 from datetime import datetime
 from functools import wraps
 from pprint import pprint
 from distutils.dir_util import copy_tree
-import copy
 try:
     import cPickle as pickle
 except:
     import pickle
 
 # import pylocker ServerLocker singleton implementation
-from pylocker import ServerLocker, FACTORY
+from pylocker import ServerLocker
 
 # pyrep imports
 from .__pkginfo__ import __version__
+from .DirectoryTree import DirectoryTree
+from .ObjectCache import ObjectCache
+from .Flusher import Flusher, fsync_path, fsync_directory
+from .Codec import ChecksumWriter, get_file_checksum, get_codec, get_keyword_codec, get_auto_codec, load_npy_slice
+from .Lockers import get_locker, get_lockers
+from .Stats import LockStats, OperationTracer
+from .Metadata import SQLiteMetadata, FileIndex
 
 # python version dependant imports
 if sys.version_info >= (3, 0):
@@ -254,6 +265,7 @@ if sys.version_info >= (3, 0):
     basestring = str
     def makedirs(name, mode=0o777):
         return os.makedirs(name=name, mode=mode, exist_ok=True)
+    replace_file = os.replace
 else:
     str        = str
     unicode    = unicode
@@ -262,11 +274,138 @@ else:
     basestring = basestring
     def makedirs(name, mode=0o777):
         return os.makedirs(name=name, mode=mode)
+    def replace_file(src, dst):
+        if os.name == 'nt' and os.path.isfile(dst):
+            os.remove(dst)
+        return os.rename(src, dst)
+
+def scan_directory(path):
+    """
+    List a directory entries in a single system call when os.scandir is
+    available (python >= 3.5).
+
+    :Parameters:
+        #. path (string): The directory path.
+
+    :Returns:
+        #. entries (None, dict): None if path is not an existing directory,
+           otherwise a dictionary of entries name as keys and whether it's a
+           directory (True) or a file (False) as values. Other entries such
+           as broken links are not included.
+    """
+    try:
+        if hasattr(os, 'scandir'):
+            entries = {}
+            for entry in os.scandir(path):
+                if entry.is_dir():
+                    entries[entry.name] = True
+                elif entry.is_file():
+                    entries[entry.name] = False
+            return entries
+        names = os.listdir(path)
+    except OSError:
+        return None
+    entries = {}
+    for name in names:
+        entryPath = os.path.join(path, name)
+        if os.path.isdir(entryPath):
+            entries[name] = True
+        elif os.path.isfile(entryPath):
+            entries[name] = False
+    return entries
 
 # set warnings filter to always
 warnings.simplefilter('always')
 
 
+def get_class_name(klass):
+    """
+    Get class qualified name.
+
+    :Parameters:
+        #. klass (None, type): The class.
+
+    :Returns:
+        #. name (None, string): The class 'module.qualname' or None if klass
+           is None.
+    """
+    if klass is None:
+        return None
+    return '%s.%s'%(klass.__module__, getattr(klass, '__qualname__', klass.__name__))
+
+def get_pickled_class_name(data):
+    """
+    Get the qualified name of a pickled class without importing its module.
+
+    :Parameters:
+        #. data (bytes): The pickled class.
+
+    :Returns:
+        #. name (None, string): The class 'module.qualname' or None if the
+           pickled object is None.
+    """
+    strings = []
+    for opcode, arg, _ in pickletools.genops(data):
+        if opcode.name == 'NONE':
+            return None
+        if opcode.name == 'GLOBAL':
+            module, name = arg.split(' ', 1)
+            break
+        if opcode.name == 'STACK_GLOBAL':
+            module, name = strings[-2:]
+            break
+        if isinstance(arg, basestring):
+            strings.append(arg)
+    else:
+        raise Exception("no class found in pickled data")
+    # python 2 names of protocol <3 pickles written by python 3
+    if sys.version_info >= (3, 0) and opcode.name == 'GLOBAL':
+        try:
+            from _compat_pickle import IMPORT_MAPPING, NAME_MAPPING
+        except ImportError:
+            pass
+        else:
+            if (module, name) in NAME_MAPPING:
+                module, name = NAME_MAPPING[(module, name)]
+            module = IMPORT_MAPPING.get(module, module)
+    return '%s.%s'%(module, name)
+
+def resolve_class_name(name):
+    """
+    Import a class module and get the class given its qualified name.
+
+    :Parameters:
+        #. name (None, string): The class 'module.qualname' as returned by
+           get_class_name.
+
+    :Returns:
+        #. klass (None, type): The class or None if name is None.
+    """
+    if name is None:
+        return None
+    parts = name.split('.')
+    # module and qualified name are both dotted, try longest module first
+    for idx in range(len(parts)-1, 0, -1):
+        moduleName = '.'.join(parts[:idx])
+        if sys.version_info >= (3, 0):
+            try:
+                from _compat_pickle import IMPORT_MAPPING
+            except ImportError:
+                pass
+            else:
+                moduleName = IMPORT_MAPPING.get(moduleName, moduleName)
+        try:
+            obj = importlib.import_module(moduleName)
+        except ImportError:
+            continue
+        try:
+            for attr in parts[idx:]:
+                obj = getattr(obj, attr)
+        except AttributeError:
+            continue
+        return obj
+    raise Exception("Unable to resolve class '%s'"%(name,))
+
 def get_pickling_errors(obj, seen=None):
     """Investigate pickling errors."""
     if seen == None:
@@ -342,12 +481,12 @@ def dump(path, value):
         code = """
 def dump(path, value):
     import json, os
-    with open(path, 'wb') as fd:
+    with open(path, 'w') as fd:
         json.dump( value,fd, ensure_ascii=True, indent=4 )
         fd.flush()
         os.fsync(fd.fileno())
 """
-    elif dump == 'numpy':
+    elif dump in ('numpy', 'numpy_mmap'):
         code = """
 def dump(path, value):
     import numpy, os
@@ -404,6 +543,12 @@ def pull(path):
     with open(path, 'rb') as fd:
         return numpy.load(file=fd)
 
+"""
+    elif pull == 'numpy_mmap':
+        code = """
+def pull(path):
+    import numpy
+    return numpy.load(path, mmap_mode='r')
 """
     elif pull == 'numpy_text':
         code = """
@@ -431,9 +576,84 @@ def path_required(func):
     return wrapper
 
 
+def observed(func):
+    """Decorate public operations reported to the repository observer."""
+    argNames  = func.__code__.co_varnames[1:func.__code__.co_argcount]
+    pathIndex = None
+    for name in ('relativePath', 'path'):
+        if name in argNames:
+            pathIndex = argNames.index(name)
+            break
+    @wraps(func)
+    def wrapper(self, *args, **kwargs):
+        tracer = self._tracer
+        if tracer.observer is None:
+            return func(self, *args, **kwargs)
+        path = None
+        if pathIndex is not None:
+            path = args[pathIndex] if len(args)>pathIndex else kwargs.get(argNames[pathIndex], None)
+        if not tracer.start(func.__name__, path=path):
+            return func(self, *args, **kwargs)
+        try:
+            result = func(self, *args, **kwargs)
+        except Exception as err:
+            tracer.stop(success=False, error=str(err))
+            raise
+        success, error = True, None
+        if isinstance(result, bool):
+            success = result
+        elif isinstance(result, tuple) and len(result)==2 and isinstance(result[0], bool):
+            success = result[0]
+            error   = None if success else result[1]
+        tracer.stop(success=success, error=error)
+        return result
+    return wrapper
+
+
 class InterpreterError(Exception): pass
 
+
+# process wide cache of compiled dump and pull functions. Keys are the code
+# string hash and the function name, values are the executed function.
+EXEC_CACHE_SIZE  = 256
+_EXEC_CACHE      = OrderedDict()
+_EXEC_CACHE_LOCK = threading.Lock()
+_EXEC_CACHE_STATS = {'hits':0, 'misses':0}
+
+def get_exec_cache_stats():
+    """
+    Get compiled dump and pull functions cache statistics.
+
+    :Returns:
+        #. stats (dict): Dictionary of 'size', 'maxsize', 'hits' and 'misses'.
+    """
+    with _EXEC_CACHE_LOCK:
+        stats = dict(_EXEC_CACHE_STATS)
+        stats['size']    = len(_EXEC_CACHE)
+        stats['maxsize'] = EXEC_CACHE_SIZE
+    return stats
+
+def clear_exec_cache():
+    """Clear compiled dump and pull functions cache and reset its statistics."""
+    with _EXEC_CACHE_LOCK:
+        _EXEC_CACHE.clear()
+        _EXEC_CACHE_STATS['hits']   = 0
+        _EXEC_CACHE_STATS['misses'] = 0
+
 def my_exec(cmd, name, description):
+    """
+    Execute dump or pull code string and return the defined function called
+    name. Functions are cached by code string hash, therefore code string
+    module level statements are only executed the first time the code is seen.
+    """
+    key = (hashlib.sha1(cmd.encode('utf-8') if isinstance(cmd, unicode) else cmd).hexdigest(), name)
+    with _EXEC_CACHE_LOCK:
+        func = _EXEC_CACHE.get(key, None)
+        if func is not None:
+            _EXEC_CACHE_STATS['hits'] += 1
+            _EXEC_CACHE[key] = _EXEC_CACHE.pop(key)
+            return func
+        _EXEC_CACHE_STATS['misses'] += 1
     try:
         l = {}
         exec(cmd, l)
@@ -448,15 +668,25 @@ def my_exec(cmd, name, description):
         cl, exc, tb = sys.exc_info()
         line_number = traceback.extract_tb(tb)[-1][1]
     else:
+        with _EXEC_CACHE_LOCK:
+            _EXEC_CACHE[key] = func
+            while len(_EXEC_CACHE) > EXEC_CACHE_SIZE:
+                _EXEC_CACHE.popitem(last=False)
         return func
     raise InterpreterError("%s at line %d of %s: %s" % (error_class, line_number, description, detail))
 
 
+# process wide set of held file read slots. Threads of the same process pick
+# different slots so they don't wait on each other when reading the same file
+_HELD_READ_SLOTS      = set()
+_HELD_READ_SLOTS_LOCK = threading.Lock()
+
+
 
 
 
 def copy_tree(src, dst, srcDirDict,
-              filAttr=['.%s_pyrepfileinfo','.%s_pyrepfileclass'],
+              filAttr=['.%s_pyrepfileinfo'],
               dirAttr=['.pyrepdirinfo','.pyreprepo']):
     """copy repository directory tree from source to destination
     Stopped using from distutils.dir_util.copy_tree for 2 reasons.
@@ -531,23 +761,104 @@ class Repository(object):
            set the lock upon reading or writing to the repository
         #. password (None, string): the locker password to manage the
            repository access. If None, default password is given
+        #. durability (string): How written files are synced to disk. It can
+           be overwritten per call in dump and update methods.\n
+           'strict': every written file is synced to disk before returning.\n
+           'batch': written files are synced to disk together by a background
+           flusher. See DURABILITY_BATCH_INTERVAL, DURABILITY_BATCH_SIZE and
+           flush.\n
+           'none': syncing to disk is left to the operating system. Suitable
+           for scratch repositories.
+        #. locker (string): The locker backend name. See pyrep.Lockers.\n
+           'server': pylocker ServerLocker synchronizing all processes and
+           machines accessing the repository.\n
+           'thread': in process locks for repositories used by a single
+           process at a time.\n
+           'file': fcntl.flock lock files synchronizing processes of the
+           same machine.
+        #. observer (None, callable): Called with an event dictionary after
+           every public operation. See set_observer.
+        #. verify (string): How tracked directories and files are checked
+           on disk upon loading the repository. It can be overwritten per
+           call in load_repository.\n
+           'full': every directory, file and information file is checked
+           one at a time.\n
+           'scandir': every directory is listed once and directories are
+           listed in parallel threads.\n
+           'lazy': .pyreprepo is trusted and nothing is checked. Files
+           found missing when pulled are removed from the repository tree.
+        #. metadata (string): Where files and directories information of
+           created repositories is stored. Loaded repositories use their
+           own metadata backend. See convert_metadata.\n
+           'pickle': pickled next to every file and in every directory.\n
+           'sqlite': stored in one indexed .pyrepmetadata sqlite3 database
+           in write ahead logging mode. See pyrep.Metadata. The directory
+           tree itself stays in .pyreprepo and its journal with both
+           backends, so loading, reloading by fingerprint and journal
+           compaction are the same for both.
     """
     DEBUG_PRINT_FAILED_TRIALS = False#True
-
-    def __init__(self, path=None, pickleProtocol=2, timeout=10, password=None):
+    # maximum number of operations appended to .pyreprepojournal before
+    # .pyreprepo is fully rewritten and the journal is compacted
+    JOURNAL_COMPACT_SIZE = 1000
+    # 'batch' durability group commit. Written files are synced to disk by a
+    # background flusher at most every DURABILITY_BATCH_INTERVAL milliseconds
+    # or as soon as DURABILITY_BATCH_SIZE files are pending
+    DURABILITY_BATCH_INTERVAL = 50
+    DURABILITY_BATCH_SIZE     = 100
+    # files shared read locks for lockers not supporting shared locks. A reader
+    # holds one of the LOCK_READ_SLOTS read slots of a file and a writer holds
+    # the file lock and all its read slots. Readers go through the file lock
+    # to get a slot, therefore a waiting writer blocks new readers and is not
+    # starved by a stream of readers
+    LOCK_READ_SLOTS = 16
+    # maximum number of lock paths with their own statistics. See get_lock_stats
+    LOCK_STATS_MAX_PATHS = 10000
+    # number of directories scanned per pool map by iter_repository_state
+    STATE_SCAN_BATCH = 64
+    # files information format. Version 1 repositories store every file class
+    # in a .%s_pyrepfileclass file and are migrated upon loading to version 2
+    # where the class is recorded in .%s_pyrepfileinfo with codec, times,
+    # description, size and checksum
+    FILE_INFO_VERSION = 2
+    # maximum number of threads listing directories upon loading with
+    # 'scandir' verify
+    VERIFY_SCAN_WORKERS = 16
+    # maximum number of list and dict items of values dumped as json by the
+    # 'auto' dump keyword. Bigger containers are pickled faster
+    AUTO_JSON_MAX_ITEMS = 1000
+
+    def __init__(self, path=None, pickleProtocol=2, timeout=10, password=None, durability='strict', locker='server', observer=None, verify='full', metadata='pickle'):
         self.__repoLock  = '.pyreplock'
         self.__repoFile  = '.pyreprepo'
+        self.__repoJournal = '.pyreprepojournal'
+        self.__repoLocks = '.pyreplocks'
         self.__dirInfo   = '.pyrepdirinfo'
         self.__dirLock   = '.pyrepdirlock'
         self.__fileInfo  = '.%s_pyrepfileinfo'  # %s replaces file name
         self.__fileClass = '.%s_pyrepfileclass'  # %s replaces file name
         self.__fileLock  = '.%s_pyrepfilelock'  # %s replaces file name
+        self.__fileTemp  = '.pyreptmp_%s'       # %s replaces file name
+        self.__metadataFile = '.pyrepmetadata'
         #self.__objectDir = '.%s_pyrepobjectdir' # %s replaces file name
         if password is None:
             password = "pyrep_repository_b@11a"
         assert isinstance(password, basestring), "password must be None or a string"
         self.__password = password
+        assert locker in get_lockers(), "locker must be one of %s"%(get_lockers(),)
+        self.__lockerName = locker
         self.__locker   = None
+        self.__objectCache = None
+        self.__flusher     = None
+        self.__lockStats   = LockStats(maxPaths=self.LOCK_STATS_MAX_PATHS)
+        self._tracer       = OperationTracer(observer=observer)
+        self.set_durability(durability)
+        assert verify in ('full','scandir','lazy'), "verify must be 'full', 'scandir' or 'lazy'"
+        self.__verify      = verify
+        assert metadata in ('pickle','sqlite'), "metadata must be 'pickle' or 'sqlite'"
+        self.__metadataName = metadata
+        self.__metadata     = None
+        self.__fileIndex    = None
         # set default protocols
         assert isinstance(pickleProtocol, int), "pickleProtocol must be integer"
         assert pickleProtocol>=-1, "pickleProtocol must be >=-1"
@@ -565,7 +876,7 @@ class Repository(object):
         if self.__path is None:
             return ""
         string = os.path.normpath(self.__path)
-        reprSt = self.get_repository_state()
+        reprSt = self.iter_repository_state()
         # walk files
         leftAdjust = "  "
         for fdict in reprSt:
@@ -589,7 +900,9 @@ class Repository(object):
     def __getstate__(self):
         state = {}
         state.update( self.__dict__ )
-        state['_Repository__locker'] = None
+        state['_Repository__locker']  = None
+        state['_Repository__flusher'] = None
+        state['_Repository__fileIndex'] = None
         return state
 
     def __setstate__(self, state):
@@ -599,9 +912,13 @@ class Repository(object):
             repoLock   = state['_Repository__repoLock']
             password   = state['_Repository__password']
             serverFile = os.path.join(path, repoLock)
-            locker = FACTORY(key=serverFile, password=password, serverFile=serverFile, autoconnect=False, reconnect=False)
+            locker = get_locker(state.get('_Repository__lockerName', 'server'), serverFile=serverFile, password=password)
             locker.start()
         state['_Repository__locker'] = locker
+        state.setdefault('_Repository__verify', 'full')
+        state.setdefault('_Repository__metadataName', 'pickle')
+        state.setdefault('_Repository__metadata', None)
+        state.setdefault('_Repository__fileIndex', None)
         # set state
         self.__dict__ = state
 
@@ -614,48 +931,138 @@ class Repository(object):
         repr += " @%s [%i directories] [%i files] "%(self.__path, ndirs, nfiles)
         return repr
 
-    def __sync_files(self, repoPath, dirs):
-        errors  = []
-        synched = []
-        def _walk_dir(relPath, relDirList, relSynchedList):
-            if not os.path.isdir(os.path.join(repoPath, relPath)):
-                errors.append("Repository directory '%s' not found on disk"%relPath)
-            else:
-                for k in relDirList:
-                    if isinstance(k, dict):
-                        if len(k)!=1:
-                            errors.append("Repository directory found in '%s' info dict length is not 1"%relPath)
-                            continue
-                        dn = list(k)[0]
-                        if not isinstance(dn, basestring):
-                            errors.append("Repository directory found in '%s' info dict key is not a string"%relPath)
-                            continue
-                        if not len(dn):
-                            errors.append("Repository directory found in '%s' info dict key is an empty string"%relPath)
-                            continue
-                        if not os.path.isfile(os.path.join(repoPath, relPath, self.__dirInfo)):
-                            errors.append("Repository directory info file '%s' not found on disk"%os.path.join(repoPath, relPath, self.__dirInfo))
-                            continue
-                        rp = os.path.join(repoPath, relPath, dn)
-                        rsd = {dn:[]}
-                        relSynchedList.append(rsd)
-                        _walk_dir(relPath=rp, relDirList=k[dn], relSynchedList=rsd[dn])
-                    elif isinstance(k, basestring):
-                        relFilePath = os.path.join(repoPath, relPath, k)
-                        relInfoPath = os.path.join(repoPath, relPath, self.__fileInfo%k)
-                        if not os.path.isfile(relFilePath):
-                            errors.append("Repository file '%s' not found on disk"%relFilePath)
-                            continue
-                        elif not os.path.isfile(relInfoPath):
-                            errors.append("Repository file info file '%s' not found on disk"%relFilePath)
-                            continue
-                        relSynchedList.append(k)
-                    else:
-                        errors.append("Repository file found in '%s' info dict key is not a string"%relPath)
-                        continue
+    def __sync_files(self, repoPath, tree, verify='full'):
+        # remove from tree directories and files not found on disk. synching
+        # is done in memory only and must not be journaled
+        errors = []
+        if verify == 'lazy':
+            return tree, errors
+        if verify == 'scandir':
+            return self.__sync_files_scandir(repoPath=repoPath, tree=tree)
+        dirInfos, fileInfos = self.__get_metadata_paths()
+        if not os.path.isdir(repoPath):
+            errors.append("Repository directory '%s' not found on disk"%repoPath)
+        def _walk_dir(node):
+            for dn in list(node.directories):
+                rp = os.path.join(node.relativePath, dn)
+                if not os.path.isdir(os.path.join(repoPath, rp)):
+                    errors.append("Repository directory '%s' not found on disk"%rp)
+                    tree.remove_directory(rp, journal=False)
+                elif not (os.path.isfile(os.path.join(repoPath, rp, self.__dirInfo)) if dirInfos is None else rp in dirInfos):
+                    errors.append("Repository directory info file '%s' not found on disk"%os.path.join(repoPath, rp, self.__dirInfo))
+                    tree.remove_directory(rp, journal=False)
+                else:
+                    _walk_dir(node.directories[dn])
+            for k in list(node.files):
+                relFilePath = os.path.join(repoPath, node.relativePath, k)
+                relInfoPath = os.path.join(repoPath, node.relativePath, self.__fileInfo%k)
+                if not os.path.isfile(relFilePath):
+                    errors.append("Repository file '%s' not found on disk"%relFilePath)
+                    tree.remove_file(os.path.join(node.relativePath, k), journal=False)
+                elif not (os.path.isfile(relInfoPath) if fileInfos is None else os.path.join(node.relativePath, k) in fileInfos):
+                    errors.append("Repository file info file '%s' not found on disk"%relFilePath)
+                    tree.remove_file(os.path.join(node.relativePath, k), journal=False)
         # call recursive _walk_dir
-        _walk_dir(relPath='', relDirList=dirs, relSynchedList=synched)
-        return synched, errors
+        _walk_dir(tree.root)
+        return tree, errors
+
+    def __get_metadata_files(self):
+        # metadata database and its sqlite write ahead log and shared memory files
+        return [self.__metadataFile, self.__metadataFile+'-wal', self.__metadataFile+'-shm', self.__metadataFile+'-journal']
+
+    def __get_metadata_paths(self):
+        # get (directories, files) relative paths sets with information in
+        # metadata database or (None, None) for pickle metadata
+        if self.__metadata is None:
+            return None, None
+        with self._tracer.phase('metadata'):
+            return self.__metadata.get_directories(), self.__metadata.get_files()
+
+    def __sync_files_scandir(self, repoPath, tree):
+        # same checks as __sync_files answered by one listing per directory
+        errors  = []
+        pool    = None
+        dirInfos, fileInfos = self.__get_metadata_paths()
+        workers = min(self.VERIFY_SCAN_WORKERS, tree.numberOfDirectories+1)
+        if workers > 1:
+            pool = ThreadPool(processes=workers)
+        try:
+            for node, entries in self.__scan_directories(repoPath=repoPath, node=tree.root, pool=pool):
+                rp = node.relativePath
+                # skip directories of an already removed directory
+                if tree.get_directory(rp) is not node:
+                    continue
+                if entries is None:
+                    errors.append("Repository directory '%s' not found on disk"%(rp or repoPath,))
+                    tree.remove_directory(rp, journal=False)
+                    continue
+                if rp != '' and not (entries.get(self.__dirInfo, None) is False if dirInfos is None else rp in dirInfos):
+                    errors.append("Repository directory info file '%s' not found on disk"%os.path.join(repoPath, rp, self.__dirInfo))
+                    tree.remove_directory(rp, journal=False)
+                    continue
+                for k in list(node.files):
+                    relFilePath = os.path.join(repoPath, rp, k)
+                    if entries.get(k, None) is not False:
+                        errors.append("Repository file '%s' not found on disk"%relFilePath)
+                        tree.remove_file(os.path.join(rp, k), journal=False)
+                    elif not (entries.get(self.__fileInfo%k, None) is False if fileInfos is None else os.path.join(rp, k) in fileInfos):
+                        errors.append("Repository file info file '%s' not found on disk"%relFilePath)
+                        tree.remove_file(os.path.join(rp, k), journal=False)
+        finally:
+            if pool is not None:
+                pool.close()
+                pool.join()
+        return tree, errors
+
+    def __migrate_files_info(self):
+        # record every file class in its info and remove its class and lock
+        # files. Size is set from disk and checksum is unknown. Repository
+        # must be locked and its directory tree loaded
+        errors = []
+        for relativePath in self.__repo['walk_repo'].walk_files(recursive=True):
+            realPath     = os.path.join(self.__path, relativePath)
+            fPath, fName = os.path.split(realPath)
+            infoPath     = os.path.join(fPath, self.__fileInfo%fName)
+            classPath    = os.path.join(fPath, self.__fileClass%fName)
+            lockPath     = os.path.join(fPath, self.__fileLock%fName)
+            try:
+                if os.path.isfile(classPath):
+                    with open(infoPath, 'rb') as fd:
+                        info = pickle.load(fd)
+                    with open(classPath, 'rb') as fd:
+                        data = fd.read()
+                    try:
+                        info['class'] = get_pickled_class_name(data)
+                    except Exception:
+                        info['class'] = None
+                    if 'size' not in info:
+                        info['size']     = os.path.getsize(realPath)
+                        info['checksum'] = None
+                    self.__write_atomic(infoPath, lambda fd:pickle.dump(info,fd, protocol=self._DEFAULT_PICKLE_PROTOCOL), phase='metadata')
+                    os.remove(classPath)
+                if os.path.isfile(lockPath):
+                    os.remove(lockPath)
+            except Exception as err:
+                errors.append("Unable to migrate file '%s' info (%s)"%(relativePath, err))
+        return errors
+
+    def __repair_file(self, relativePath):
+        # with 'lazy' verify, remove from tree a file found missing on disk
+        # and its directory if it's missing too. Repairing is done in memory
+        # only like synching upon loading
+        if self.__verify != 'lazy':
+            return
+        tree    = self.__repo['walk_repo']
+        dirPath = os.path.dirname(relativePath)
+        if dirPath != '' and (not os.path.isdir(os.path.join(self.__path, dirPath)) or self.__read_dirinfo(dirPath) is None):
+            tree.remove_directory(dirPath, journal=False)
+            if self.__fileIndex is not None:
+                self.__fileIndex.remove_directory(dirPath)
+        else:
+            tree.remove_file(relativePath, journal=False)
+            if self.__fileIndex is not None:
+                self.__fileIndex.remove(relativePath)
+        warnings.warn("Repository file '%s' was not found on disk and is removed from repository tree"%(relativePath,))
 
     #def __setstate__(self, state):
     #    self.__dict__ = state
@@ -679,21 +1086,120 @@ class Repository(object):
     def locker(self):
         return self.__locker
 
-    def __save_dirinfo(self, description, dirInfoPath, create=False):
-        # create main directory info file
-        oldInfo = None
-        if description is None and os.path.isfile(dirInfoPath):
-            with open(dirInfoPath, 'rb') as fd:
-                oldInfo = pickle.load(fd)
+    @property
+    def lockerName(self):
+        """The locker backend name."""
+        return self.__lockerName
+
+    def __open_metadata(self, repoPath, metadata):
+        # open repository metadata backend. pickle metadata is stored in
+        # sidecar files and has no store
+        if self.__metadata is not None:
+            self.__metadata.close()
+            self.__metadata = None
+        if metadata == 'sqlite':
+            self.__metadata = SQLiteMetadata(os.path.join(repoPath, self.__metadataFile), protocol=self._DEFAULT_PICKLE_PROTOCOL)
+        self.__metadataName = metadata
+        self.__fileIndex    = None
+
+    def __read_file_info(self, relativePath):
+        # get file info. Raises when not found
+        with self._tracer.phase('metadata'):
+            if self.__metadata is not None:
+                info = self.__metadata.get_file_info(relativePath)
+                assert info is not None, "file '%s' info is not found"%(relativePath,)
+                return info
+            fPath, fName = os.path.split(os.path.join(self.__path, relativePath))
+            with open(os.path.join(fPath, self.__fileInfo%fName), 'rb') as fd:
+                return pickle.load(fd)
+
+    def __write_file_info(self, relativePath, info, durability=None):
+        if self.__metadata is not None:
+            with self._tracer.phase('metadata'):
+                self.__metadata.set_file_info(relativePath, info, durability=self.__get_durability(durability))
+            return
+        fPath, fName = os.path.split(os.path.join(self.__path, relativePath))
+        self.__write_atomic(os.path.join(fPath, self.__fileInfo%fName), lambda fd:pickle.dump(info,fd, protocol=self._DEFAULT_PICKLE_PROTOCOL), durability=durability, phase='metadata')
+        if self.__fileIndex is not None:
+            self.__fileIndex.set(relativePath, info, stamp=self.__get_info_stamp(relativePath))
+
+    def __get_info_stamp(self, relativePath):
+        # pickle metadata file (inode, modification time, size) or None if
+        # not found. Info files are replaced atomically and get a new inode
+        fPath, fName = os.path.split(os.path.join(self.__path, relativePath))
+        try:
+            st = os.stat(os.path.join(fPath, self.__fileInfo%fName))
+        except OSError:
+            return None
+        return (st.st_ino, getattr(st, 'st_mtime_ns', st.st_mtime), st.st_size)
+
+    def __has_file_info(self, relativePath):
+        if self.__metadata is not None:
+            return self.__metadata.has_file_info(relativePath)
+        fPath, fName = os.path.split(os.path.join(self.__path, relativePath))
+        return os.path.isfile(os.path.join(fPath, self.__fileInfo%fName))
+
+    def __remove_file_info(self, relativePath):
+        if self.__metadata is not None:
+            with self._tracer.phase('metadata'):
+                self.__metadata.remove_file_info(relativePath, durability=self.__durability)
+            return
+        fPath, fName = os.path.split(os.path.join(self.__path, relativePath))
+        os.remove(os.path.join(fPath, self.__fileInfo%fName))
+        if self.__fileIndex is not None:
+            self.__fileIndex.remove(relativePath)
+
+    def __move_file_info(self, relativePath, newRelativePath):
+        if self.__metadata is not None:
+            with self._tracer.phase('metadata'):
+                self.__metadata.move_file_info(relativePath, newRelativePath, durability=self.__durability)
+            return
+        fPath, fName   = os.path.split(os.path.join(self.__path, relativePath))
+        nfPath, nfName = os.path.split(os.path.join(self.__path, newRelativePath))
+        replace_file(os.path.join(fPath,self.__fileInfo%fName), os.path.join(nfPath,self.__fileInfo%nfName))
+        if self.__fileIndex is not None:
+            self.__fileIndex.move(relativePath, newRelativePath)
+
+    def __copy_file_info(self, relativePath, newRelativePath):
+        if self.__metadata is not None:
+            with self._tracer.phase('metadata'):
+                self.__metadata.copy_file_info(relativePath, newRelativePath, durability=self.__durability)
+            return
+        fPath, fName   = os.path.split(os.path.join(self.__path, relativePath))
+        nfPath, nfName = os.path.split(os.path.join(self.__path, newRelativePath))
+        self.__write_atomic(os.path.join(nfPath,self.__fileInfo%nfName), lambda path:shutil.copy(os.path.join(fPath,self.__fileInfo%fName), path), openFile=False, phase='metadata')
+        if self.__fileIndex is not None:
+            self.__fileIndex.copy(relativePath, newRelativePath)
+
+    def __read_dirinfo(self, relativePath):
+        # get directory info or None when not found
+        if self.__metadata is not None:
+            with self._tracer.phase('metadata'):
+                return self.__metadata.get_directory_info(relativePath)
+        dirInfoPath = os.path.join(self.__path, relativePath, self.__dirInfo)
+        if not os.path.isfile(dirInfoPath):
+            return None
+        with self._tracer.phase('metadata'), open(dirInfoPath, 'rb') as fd:
+            return pickle.load(fd)
+
+    def __write_dirinfo(self, relativePath, info, durability=None):
+        if self.__metadata is not None:
+            with self._tracer.phase('metadata'):
+                self.__metadata.set_directory_info(relativePath, info, durability=self.__get_durability(durability))
+            return
+        dirInfoPath = os.path.join(self.__path, relativePath, self.__dirInfo)
+        self.__write_atomic(dirInfoPath, lambda fd:pickle.dump(info,fd, protocol=self._DEFAULT_PICKLE_PROTOCOL), durability=durability, phase='metadata')
+
+    def __save_dirinfo(self, description, relativePath, create=False, durability=None):
+        # create or update directory info
+        oldInfo = self.__read_dirinfo(relativePath)
+        if description is None and oldInfo is not None:
             if self.__repo['repository_unique_name'] != oldInfo['repository_unique_name']:
                 description = ''
         if description is None and create:
             description = ''
         if description is not None:
-            if os.path.isfile(dirInfoPath):
-                if oldInfo is None:
-                    with open(dirInfoPath, 'rb') as fd:
-                        oldInfo = pickle.load(fd)
+            if oldInfo is not None:
                 if self.__repo['repository_unique_name'] != oldInfo['repository_unique_name']:
                     createTime = lastUpdateTime = time.time()
                 else:
@@ -705,10 +1211,471 @@ class Repository(object):
                     'create_utctime':createTime,
                     'last_update_utctime':lastUpdateTime,
                     'description':description}
-            with open(dirInfoPath, 'wb') as fd:
-                pickle.dump( info,fd, protocol=self._DEFAULT_PICKLE_PROTOCOL )
-                fd.flush()
+            self.__write_dirinfo(relativePath, info, durability=durability)
+
+    def __get_dump_pull(self, dump, pull):
+        """Get file dump and pull methods. When dump is a registered codec
+        keyword and pull is None or the same codec, (codec, options, None, None)
+        is returned. When dump is 'auto', ('auto', None, None, None) is returned
+        and codec is selected given the dumped value. Otherwise
+        (None, None, dump, pull) code strings are returned"""
+        if dump == 'auto':
+            assert pull is None or pull == 'auto', "pull must be None or 'auto' when dump is 'auto'"
+            return 'auto', None, None, None
+        codec, options = get_keyword_codec(dump if dump is not None else 'pickle', protocol=self._DEFAULT_PICKLE_PROTOCOL)
+        if codec is not None:
+            if pull is None or get_keyword_codec(pull)[0] is codec:
+                return codec, options, None, None
+        if pull is None and dump is not None:
+            if dump.startswith('pickle') or dump.startswith('dill') or dump.startswith('numpy') or dump =='json':
+                pull = dump
+        dump = get_dump_method(dump, protocol=self._DEFAULT_PICKLE_PROTOCOL)
+        pull = get_pull_method(pull)
+        return None, None, dump, pull
+
+    def __dump_value(self, info, savePath, value, codec, options, dump, pull, durability=None):
+        """Dump value to savePath and set dump and pull methods, class, size
+        and checksum in file info. Checksum is None when dumped with a dump
+        code string because the file is not written through pyrep"""
+        info['class'] = None if value is None else get_class_name(value.__class__)
+        info.pop('auto', None)
+        if codec == 'auto':
+            codec, options = get_auto_codec(value, jsonMaxItems=self.AUTO_JSON_MAX_ITEMS)
+            info['auto']   = True
+        if codec is not None:
+            info.pop('dump', None)
+            info.pop('pull', None)
+            info['codec']         = codec.name
+            info['codec_version'] = codec.version
+            def _write(fd):
+                writer = ChecksumWriter(fd)
+                codec.dump(writer, value, **options)
+                info['size']     = writer.size
+                info['checksum'] = writer.checksum
+            self.__write_atomic(savePath, _write, durability=durability, phase='serialize')
+        else:
+            info.pop('codec', None)
+            info.pop('codec_version', None)
+            info['dump'] = dump
+            info['pull'] = pull
+            def _write(path):
+                dumpFunc(path=path, value=value)
+                info['size']     = os.path.getsize(path)
+                info['checksum'] = None
+            with self._tracer.phase('serialize'):
+                dumpFunc = my_exec( dump, name='dump', description='dump')
+                self.__write_atomic(savePath, _write, durability=durability, openFile=False)
+
+    def __pull_value(self, realPath, info, pull, checksum=None):
+        """Pull value from realPath using given pull method or file info.
+        If checksum is given, opened file data is checked against it before
+        decoding and codecs opening the file by path are checked to have
+        opened the same file"""
+        if pull is not None:
+            codec, _ = get_keyword_codec(pull)
+        elif 'codec' in info:
+            codec = get_codec(info['codec'], info.get('codec_version', None))
+            assert codec is not None, "codec '%s' version %s is not registered"%(info['codec'], info.get('codec_version', None))
+        else:
+            codec = None
+            pull  = info['pull']
+        if codec is not None:
+            with open(realPath, 'rb') as fd:
+                if checksum is not None:
+                    assert get_file_checksum(fd) == checksum, "file data checksum is not the recorded '%s'"%(checksum,)
+                    fd.seek(0)
+                value = codec.load(fd)
+                if checksum is not None:
+                    assert os.fstat(fd.fileno()).st_ino == os.stat(realPath).st_ino, "file was replaced while pulled"
+                return value
+        pullFunc = my_exec( get_pull_method(pull), name='pull', description='pull')
+        return pullFunc(path=str(realPath))
+
+    def __add_directory(self, path, description=None, clean=False, ntrials=3, durability=None):
+        """add directory and all missing parent directories to the repository.
+        Repository must be locked and its directory tree loaded"""
+        allowed, error = self.is_name_allowed(path)
+        if not allowed:
+            return error
+        error     = None
+        tree      = self.__repo['walk_repo']
+        dirPath   = self.__path
+        spath     = path.split(os.sep)
+        for idx, name in enumerate(spath):
+            dirLockId = None
+            # create and acquire directory lock
+            if dirPath != self.__path:
+                acquired, dirLockId = self.__acquire_lock(dirPath)
+                if not acquired:
+                    error = "Code %s. Unable to aquire the lock when adding '%s'. All prior relative directories were added. You may try again, to finish adding directory"%(dirLockId,dirPath)
+                    break
+            # add to directory
+            for _trial in range(ntrials):
+                try:
+                    dirPath = os.path.join(dirPath, name)
+                    relPath = os.sep.join(spath[:idx+1])
+                    tracked = tree.is_directory(relPath)
+                    # clean directory
+                    if not tracked and clean and os.path.exists(dirPath):
+                        try:
+                            shutil.rmtree( dirPath, ignore_errors=True )
+                        except Exception as err:
+                            error = "Unable to clean directory '%s' (%s)"%(dirPath, err)
+                            break
+                    # create directory
+                    if not os.path.exists(dirPath):
+                        try:
+                            os.mkdir(dirPath)
+                        except Exception as err:
+                            error = "Unable to create directory '%s' (%s)"%(dirPath, err)
+                            break
+                    # create and dump dirinfo
+                    self.__save_dirinfo(description=[None, description][idx==len(spath)-1],
+                                        relativePath=relPath, create=True, durability=durability)
+                    # update directory tree
+                    if not tracked:
+                        tree.add_directory(relPath)
+                except Exception as err:
+                    error = "Unable to create directory '%s' info file (%s)"%(dirPath, str(err))
+                    self.__lockStats.failed_trial()
+                    if self.DEBUG_PRINT_FAILED_TRIALS: print("Trial %i failed in Repository.%s (%s). Set Repository.DEBUG_PRINT_FAILED_TRIALS to False to mute"%(_trial, inspect.stack()[1][3], str(error)))
+                else:
+                    break
+            if dirLockId is not None:
+                self.__release_lock(dirLockId)
+            # break from main path loop
+            if error is not None:
+                break
+        return error
+
+    def __dump_file(self, value, relativePath, description, codec, options, dump, pull, replace, ntrials, durability=None):
+        """dump file and its info and add it to the directory tree.
+        Repository must be locked and its directory tree loaded"""
+        savePath     = os.path.join(self.__path,relativePath)
+        fPath, fName = os.path.split(savePath)
+        # lock file
+        acquired, fileLockId = self.__acquire_file_lock(savePath)
+        if not acquired:
+            return "Code %s. Unable to aquire the lock when dumping '%s'"%(fileLockId,relativePath)
+        # invalidate cached object
+        self.__uncache(relativePath)
+        # dump file
+        for _trial in range(ntrials):
+            error = None
+            try:
+                isRepoFile, fileOnDisk, infoOnDisk, _ = self.is_repository_file(relativePath)
+                if isRepoFile:
+                    assert replace, "file is a registered repository file. set replace to True to replace"
+                if isRepoFile and fileOnDisk:
+                    info = self.__read_file_info(relativePath)
+                    assert info['repository_unique_name'] == self.__repo['repository_unique_name'], "it seems that file was created by another repository"
+                    info['last_update_utctime'] = time.time()
+                else:
+                    info = {'repository_unique_name':self.__repo['repository_unique_name']}
+                    info['create_utctime'] = info['last_update_utctime'] = time.time()
+                info['description'] = description
+                # dump file
+                self.__dump_value(info=info, savePath=savePath, value=value, codec=codec, options=options, dump=dump, pull=pull, durability=durability)
+                # update info
+                self.__write_file_info(relativePath, info, durability=durability)
+                # add to repo if file is new and not being replaced
+                if not isRepoFile:
+                    self.__repo['walk_repo'].add_file(relativePath)
+            except Exception as err:
+                error = "unable to dump the file (%s)"%(str(err),)
+                try:
+                    if (codec is not None and codec.name == 'pickle') or (codec is None and 'pickle.dump(' in dump):
+                        mi = get_pickling_errors(value)
+                        if mi is not None:
+                            error += '\nmore info: %s'%str(mi)
+                except:
+                    pass
+                self.__lockStats.failed_trial()
+                if self.DEBUG_PRINT_FAILED_TRIALS: print("Trial %i failed in Repository.%s (%s). Set Repository.DEBUG_PRINT_FAILED_TRIALS to False to mute"%(_trial, inspect.stack()[1][3], str(error)))
+            else:
+                error = None
+                break
+        # release lock
+        self.__release_file_lock(fileLockId)
+        return error
+
+    def __pull_file(self, relativePath, pull, ntrials, lock=True):
+        """pull file data. Returns (False, error) when file lock can't be
+        acquired and (True, data) when data is pulled. Raises otherwise"""
+        # check name and path
+        relativePath = self.to_repo_relative_path(path=relativePath, split=False)
+        realPath     = os.path.join(self.__path,relativePath)
+        fPath, fName = os.path.split(realPath)
+        # check whether it's a repository file
+        isRepoFile,fileOnDisk, infoOnDisk, classOnDisk = self.is_repository_file(relativePath)
+        if not isRepoFile:
+            fileOnDisk  = ["",". File itself is found on disk"][fileOnDisk]
+            infoOnDisk  = ["",". %s is found on disk"%self.__fileInfo%fName][infoOnDisk]
+            assert False, "File '%s' is not a repository file%s%s"%(relativePath,fileOnDisk,infoOnDisk)
+        if not fileOnDisk:
+            self.__repair_file(relativePath)
+        assert fileOnDisk, "File '%s' is registered in repository but the file itself was not found on disk"%(relativePath,)
+        if not infoOnDisk:
+            if pull is not None:
+                warnings.warn("'%s' was not found on disk but pull method is given"%(self.__fileInfo%fName))
+            else:
+                raise Exception("File '%s' is registered in repository but the '%s' was not found on disk and pull method is not specified"%(relativePath,(self.__fileInfo%fName)))
+        # get cached object. Cache is cleared when another process changed
+        # the repository since this instance last read or wrote it
+        # Stamp is taken before pulling and object is cached only if file
+        # was not replaced meanwhile
+        cache = self.__objectCache if pull is None else None
+        if cache is not None:
+            fingerprint = self.__get_repository_fingerprint()
+            if fingerprint != cache.fingerprint and fingerprint != self.__repoFingerprint:
+                cache.clear()
+                cache.fingerprint = fingerprint
+            stamp = self.__get_file_stamp(realPath)
+            found, value = cache.get(relativePath, stamp)
+            if found:
+                return True, value
+        # lock file
+        fileLockId = None
+        if lock:
+            acquired, fileLockId = self.__acquire_file_lock(realPath, shared=True)
+            if not acquired:
+                return False, "Code %s. Unable to aquire the lock when pulling '%s'"%(fileLockId,relativePath)
+        # pull file. Without lock, file can be read while a writer replaced
+        # it but not its info yet. File data is checked against the recorded
+        # checksum before decoding and a last trial is made under the shared
+        # lock that writers wait for. Files without checksum are pulled with
+        # the shared lock
+        error = None
+        for _trial in range(ntrials+int(not lock)):
+            if _trial == ntrials and fileLockId is None:
+                acquired, lockId = self.__acquire_file_lock(realPath, shared=True)
+                if not acquired:
+                    error = "%s. Code %s. Unable to aquire the lock when pulling '%s'"%(error, lockId, relativePath)
+                    break
+                fileLockId = lockId
+            error = None
+            try:
+                # get file info when no pull method is given
+                info = None
+                checksum = None
+                if pull is None:
+                    info = self.__read_file_info(relativePath)
+                    if fileLockId is None:
+                        checksum = info.get('checksum', None)
+                        if 'codec' not in info or not str(checksum).startswith('crc32:'):
+                            acquired, lockId = self.__acquire_file_lock(realPath, shared=True)
+                            if not acquired:
+                                error = "Code %s. Unable to aquire the lock when pulling '%s'"%(lockId, relativePath)
+                                break
+                            fileLockId = lockId
+                            checksum   = None
+                            info       = self.__read_file_info(relativePath)
+                # try to pull file
+                with self._tracer.phase('deserialize'):
+                    pulledVal = self.__pull_value(realPath=realPath, info=info, pull=pull, checksum=checksum)
+            except Exception as err:
+                if pull is not None:
+                    m = pull
+                elif info is not None:
+                    m = info.get('codec', info.get('pull', None))
+                else:
+                    m = None
+                error = "Unable to pull data using '%s' from file (%s)"%(m,err)
+                self.__lockStats.failed_trial()
+                if self.DEBUG_PRINT_FAILED_TRIALS: print("Trial %i failed in Repository.%s (%s). Set Repository.DEBUG_PRINT_FAILED_TRIALS to False to mute"%(_trial, inspect.stack()[1][3], str(error)))
+            else:
+                break
+        # cache pulled object
+        if cache is not None and error is None:
+            try:
+                if self.__get_file_stamp(realPath) == stamp:
+                    cache.set(relativePath, stamp, pulledVal, nbytes=stamp[1])
+            except Exception:
+                pass
+        # release lock
+        if fileLockId is not None:
+            self.__release_file_lock(fileLockId)
+        # check and return
+        assert error is None, "After %i trials, %s"%(ntrials, error)
+        return True, pulledVal
+
+
+    def __get_durability(self, durability):
+        # get call durability level given per call durability argument
+        if durability is None:
+            return self.__durability
+        assert durability in ('strict','batch','none'), "durability must be None, 'strict', 'batch' or 'none'"
+        return durability
+
+    def __sync_later(self, path):
+        # register file to be synced to disk by the 'batch' durability flusher
+        if self.__flusher is None:
+            self.__flusher = Flusher(interval=self.DURABILITY_BATCH_INTERVAL/1000.,
+                                     maxOperations=self.DURABILITY_BATCH_SIZE)
+        self.__flusher.add(os.path.abspath(path))
+
+    def __sync(self, fd, durability=None):
+        # flush file written in place and sync it to disk according to durability
+        if durability is None:
+            durability = self.__durability
+        fd.flush()
+        if durability == 'strict':
+            with self._tracer.phase('fsync'):
                 os.fsync(fd.fileno())
+        elif durability == 'batch':
+            self.__sync_later(fd.name)
+
+    def __write_atomic(self, path, write, durability=None, tmpPath=None, openFile=True, phase=None):
+        # write file aside, sync it to disk according to durability and
+        # replace path. Readers see the old or the new file but never a
+        # partially written one. write is called with the aside file object
+        # opened in binary write mode or with its path if openFile is False.
+        # Writing time is traced under phase if given
+        if durability is None:
+            durability = self.__durability
+        if tmpPath is None:
+            tmpPath = os.path.join(os.path.dirname(path), self.__fileTemp%os.path.basename(path))
+        try:
+            with self._tracer.phase(phase):
+                if openFile:
+                    with open(tmpPath, 'wb') as fd:
+                        write(fd)
+                        fd.flush()
+                        if durability == 'strict':
+                            with self._tracer.phase('fsync'):
+                                os.fsync(fd.fileno())
+                else:
+                    write(str(tmpPath))
+                    if durability == 'strict':
+                        with self._tracer.phase('fsync'):
+                            fsync_path(tmpPath)
+                replace_file(tmpPath, path)
+                # replacing is durable once directory is synced
+                if durability == 'strict':
+                    with self._tracer.phase('fsync'):
+                        fsync_directory(os.path.dirname(path))
+        except:
+            try:
+                if os.path.isfile(tmpPath):
+                    os.remove(tmpPath)
+            except:
+                pass
+            raise
+        # replaced file new inode is registered once it's in place
+        if durability == 'batch':
+            self.__sync_later(path)
+
+    def __get_file_stamp(self, realPath):
+        # file (modification time, size, inode) used to validate cached
+        # objects. Replaced files get a new inode
+        st = os.stat(realPath)
+        return (getattr(st, 'st_mtime_ns', st.st_mtime), st.st_size, st.st_ino)
+
+    def __uncache(self, relativePath, directory=False):
+        # invalidate file or directory files cached objects
+        if self.__objectCache is None:
+            return
+        if directory:
+            self.__objectCache.invalidate_directory(relativePath)
+        else:
+            self.__objectCache.invalidate(relativePath)
+
+    def __get_read_slot(self, realPath, index):
+        # file read slot lock path
+        return '%s:pyrepread%i'%(realPath, index)
+
+    def __get_lock_key(self, path):
+        # lock statistics key. Repository relative path or '' for repository
+        if self.__path is not None:
+            rel = os.path.relpath(path, self.__path)
+            if rel == '.':
+                return ''
+            if not rel.startswith(os.pardir):
+                return rel
+        return path
+
+    def __acquire_lock(self, path, key=None):
+        # acquire locker lock and account the time waited for it
+        if key is None:
+            key = self.__get_lock_key(path)
+        tic = time.time()
+        acquired, lockId = self.__locker.acquire_lock(path=path, timeout=self.timeout)
+        wait = time.time()-tic
+        self._tracer.add('lock', wait)
+        if acquired:
+            self.__lockStats.acquired(key, lockId, wait)
+        else:
+            self.__lockStats.failed(key, lockId, wait)
+        return acquired, lockId
+
+    def __release_lock(self, lockId):
+        # release locker lock and account the time it was held
+        released = self.__locker.release_lock(lockId)
+        self.__lockStats.released(lockId)
+        return released
+
+    def __acquire_file_lock(self, realPath, shared=False):
+        """acquire file lock. Shared locks are held by many readers at the same
+        time while exclusive locks are held by a single writer. Returns
+        (acquired, lockId) where lockId is the locker error code when lock
+        is not acquired"""
+        key = self.__get_lock_key(realPath)
+        tic = time.time()
+        acquired, lockId = self.__acquire_locker_file_lock(realPath, shared=shared)
+        wait = time.time()-tic
+        self._tracer.add('lock', wait)
+        if acquired:
+            self.__lockStats.acquired(key, lockId, wait)
+        else:
+            self.__lockStats.failed(key, lockId, wait)
+        return acquired, lockId
+
+    def __acquire_locker_file_lock(self, realPath, shared):
+        # use locker shared locks when supported
+        if getattr(self.__locker, 'sharedLocks', False):
+            acquired, lockId = self.__locker.acquire_lock(path=realPath, timeout=self.timeout, shared=shared)
+            if not acquired:
+                return False, lockId
+            return True, ((lockId,), None)
+        # go through file lock. Readers hold it only until they get a slot
+        acquired, fileLockId = self.__locker.acquire_lock(path=realPath, timeout=self.timeout)
+        if not acquired:
+            return False, fileLockId
+        # exclusive lock waits for readers in progress by holding all slots
+        if not shared:
+            slots = [self.__get_read_slot(realPath, idx) for idx in range(self.LOCK_READ_SLOTS)]
+            acquired, slotsLockId = self.__locker.acquire_lock(path=slots, timeout=self.timeout)
+            if not acquired:
+                self.__locker.release_lock(fileLockId)
+                return False, slotsLockId
+            return True, ((fileLockId, slotsLockId), None)
+        # shared lock picks a slot that is not held in this process
+        try:
+            start = random.randrange(self.LOCK_READ_SLOTS)
+            with _HELD_READ_SLOTS_LOCK:
+                for idx in range(self.LOCK_READ_SLOTS):
+                    slot = self.__get_read_slot(realPath, (start+idx)%self.LOCK_READ_SLOTS)
+                    if slot not in _HELD_READ_SLOTS:
+                        break
+                _HELD_READ_SLOTS.add(slot)
+            acquired, slotLockId = self.__locker.acquire_lock(path=slot, timeout=self.timeout)
+            if not acquired:
+                with _HELD_READ_SLOTS_LOCK:
+                    _HELD_READ_SLOTS.discard(slot)
+                return False, slotLockId
+        finally:
+            self.__locker.release_lock(fileLockId)
+        return True, ((slotLockId,), slot)
+
+    def __release_file_lock(self, lockId):
+        # release lock acquired with __acquire_file_lock
+        lockIds, slot = lockId
+        for lid in lockIds:
+            self.__locker.release_lock(lid)
+        if slot is not None:
+            with _HELD_READ_SLOTS_LOCK:
+                _HELD_READ_SLOTS.discard(slot)
+        self.__lockStats.released(lockId)
 
     def __clean_before_after(self, stateBefore, stateAfter, keepNoneEmptyDirectory=True):
         """clean repository given before and after states"""
@@ -787,57 +1754,149 @@ class Repository(object):
     #    # return
     #    return False, error
 
-    def __get_repository_parent_directory(self, relativePath):
+    def __get_repository_directory(self, relativePath):
         relativePath = self.to_repo_relative_path(path=relativePath, split=False)
-        if relativePath == '':
-            return None
-        parentPath = os.path.dirname(relativePath)
-        return self.__get_repository_directory(relativePath=parentPath)
+        return self.__repo['walk_repo'].get_directory(relativePath)
 
-    def __get_repository_directory(self, relativePath):
-        cDir = self.__repo['walk_repo']
-        splitted = self.to_repo_relative_path(path=relativePath, split=True)
-        if splitted == ['']:
-            return cDir
-        for dirname in splitted:
-            dList = [d for d in cDir if isinstance(d, dict)]
-            if not len(dList):
-                cDir = None
-                break
-            cDict = [d for d in dList if dirname in d]
-            if not len(cDict):
-                cDir = None
-                break
-            cDir = cDict[0][dirname]
-        # return
-        return cDir
+    def __get_repository_pickle_dict(self):
+        # .pyreprepo stores walk_repo as nested list for backward compatibility
+        repo = dict(self.__repo)
+        repo['walk_repo'] = self.__repo['walk_repo'].to_list()
+        return repo
 
-    def __save_repository_pickle_file(self, lockFirst=False, raiseError=True):
+    def __save_repository_pickle_file(self, lockFirst=False, raiseError=True, durability=None):
         # create and acquire lock
         error = None
         if lockFirst:
-            acquired, lockId = self.__locker.acquire_lock(path=self.__path, timeout=self.timeout)
+            acquired, lockId = self.__acquire_lock(self.__path)
             # check if acquired.
             if not acquired:
                 error = "code %s. Unable to aquire the repository lock. You may try again!"%(lockId,)
                 assert not raiseError, Exception(error)
                 return False,error
         try:
+            # files are written aside and replaced so every save changes
+            # their inode and therefore the repository fingerprint
             repoInfoPath = os.path.join(self.__path, self.__repoFile)
-            with open(repoInfoPath, 'wb') as fd:
-                self.__repo["last_update_utctime"] = time.time()
-                pickle.dump( self.__repo,fd, protocol=self._DEFAULT_PICKLE_PROTOCOL )
-                fd.flush()
-                os.fsync(fd.fileno())
+            journalPath  = os.path.join(self.__path, self.__repoJournal)
+            self.__repo["last_update_utctime"] = time.time()
+            self.__repo["journal_id"]          = str(uuid.uuid1())
+            repo = self.__get_repository_pickle_dict()
+            self.__write_atomic(repoInfoPath, lambda fd:pickle.dump(repo,fd, protocol=self._DEFAULT_PICKLE_PROTOCOL),
+                                durability=durability, tmpPath=repoInfoPath+'.tmp', phase='save')
+            # .pyreprepo holds all changes now, start a new journal
+            self.__repo['walk_repo'].pop_journal()
+            header = {'journal_id':self.__repo["journal_id"]}
+            self.__write_atomic(journalPath, lambda fd:pickle.dump(header,fd, protocol=self._DEFAULT_PICKLE_PROTOCOL),
+                                durability=durability, tmpPath=journalPath+'.tmp', phase='save')
+            self.__journalSize     = 0
+            self.__repoFingerprint = self.__get_repository_fingerprint()
         except Exception as err:
+            self.__repoFingerprint = None
             error = "Unable to save repository (%s)"%str(err)
         # release lock
         if lockFirst:
-            self.__locker.release_lock(lockId)
+            self.__release_lock(lockId)
         # return
         assert error is None or not raiseError, error
         return error is None, error
 
+    def __save_repository_journal(self, raiseError=True, durability=None):
+        # must be called with repository lock acquired
+        error      = None
+        operations = self.__repo['walk_repo'].pop_journal()
+        if not len(operations):
+            return True, None
+        journalPath = os.path.join(self.__path, self.__repoJournal)
+        if self.__repo.get('journal_id', None) is None or not os.path.isfile(journalPath) or \
+           self.__journalSize+len(operations) > self.JOURNAL_COMPACT_SIZE:
+            return self.__save_repository_pickle_file(lockFirst=False, raiseError=raiseError, durability=durability)
+        try:
+            with self._tracer.phase('save'), open(journalPath, 'ab') as fd:
+                self.__repo["last_update_utctime"] = time.time()
+                for op in operations:
+                    pickle.dump( (self.__repo["last_update_utctime"],op),fd, protocol=self._DEFAULT_PICKLE_PROTOCOL )
+                self.__sync(fd, durability=durability)
+            self.__journalSize    += len(operations)
+            self.__repoFingerprint = self.__get_repository_fingerprint()
+        except Exception as err:
+            self.__repoFingerprint = None
+            error = "Unable to save repository journal (%s)"%str(err)
+        assert error is None or not raiseError, error
+        return error is None, error
+
+    def __load_repository_journal(self, journalPath, repo):
+        # replay journal operations on repo tree. Journal is only valid when
+        # its header journal_id matches .pyreprepo one. A trailing truncated
+        # record, which can be left by an interrupted append, is ignored.
+        operations = []
+        if repo.get('journal_id', None) is None or not os.path.isfile(journalPath):
+            return 0, []
+        with open(journalPath, 'rb') as fd:
+            try:
+                header = pickle.load(fd)
+            except Exception:
+                return 0, []
+            if not isinstance(header, dict) or header.get('journal_id', None) != repo['journal_id']:
+                return 0, []
+            while True:
+                try:
+                    utctime, op = pickle.load(fd)
+                except Exception:
+                    break
+                operations.append(op)
+                repo['last_update_utctime'] = utctime
+        errors = repo['walk_repo'].apply_journal(operations)
+        return len(operations), errors
+
+    def __get_repository_fingerprint(self, repoPath=None):
+        # .pyreprepo and .pyreprepojournal (inode, size, modification time)
+        if repoPath is None:
+            repoPath = self.__path
+        fingerprint = []
+        for name in (self.__repoFile, self.__repoJournal):
+            try:
+                st = os.stat(os.path.join(repoPath, name))
+            except OSError:
+                fingerprint.append(None)
+            else:
+                fingerprint.append( (st.st_ino, st.st_size, getattr(st, 'st_mtime_ns', st.st_mtime)) )
+        return tuple(fingerprint)
+
+    def __load_repository_walk(self, ntrials=3):
+        # reload repository tree from disk. must be called with repository lock acquired
+        # Reloading is skipped when no other process changed .pyreprepo and
+        # its journal since this instance last read or wrote them, unless the
+        # tree has uncommitted operations left by a failed call.
+        error = None
+        for _trial in range(ntrials):
+            try:
+                fingerprint = self.__get_repository_fingerprint()
+                if fingerprint == self.__repoFingerprint and not self.__repo['walk_repo'].journalLength:
+                    break
+                self.__repoFingerprint = None
+                self.__fileIndex       = None
+                if self.__objectCache is not None:
+                    self.__objectCache.clear()
+                with self._tracer.phase('reload'):
+                    repo, self.__journalSize = self.__load_repository_pickle_file(os.path.join(self.__path, self.__repoFile))
+                self.__repo['walk_repo']  = repo['walk_repo']
+                self.__repo['journal_id'] = repo.get('journal_id', None)
+                self.__repoFingerprint    = fingerprint
+                # metadata backend is converted by another process
+                if repo.get('metadata_id', None) != self.__repo.get('metadata_id', None):
+                    self.__open_metadata(self.__path, repo.get('metadata', 'pickle'))
+                    self.__repo['metadata']    = self.__metadataName
+                    self.__repo['metadata_id'] = repo.get('metadata_id', None)
+            except Exception as err:
+                error = str(err)
+                self.__lockStats.failed_trial()
+                if self.DEBUG_PRINT_FAILED_TRIALS: print("Trial %i failed in Repository.%s (%s). Set Repository.DEBUG_PRINT_FAILED_TRIALS to False to mute"%(_trial, inspect.stack()[1][3], str(error)))
+            else:
+                error = None
+                break
+        return error
+
     def __load_repository_pickle_file(self, repoPath):
         try:
             fd = open(repoPath, 'rb')
@@ -858,10 +1917,16 @@ class Repository(object):
         assert "pyrep_version" in repo, "'pyrep_version' must be a key in pyrep repo dict"
         assert "walk_repo" in repo, "'walk_repo' must be a key in pyrep repo dict"
         assert isinstance(repo['walk_repo'], list), "pyrep info 'walk_repo' key value must be a list"
+        # build tree and replay journal
+        repo['walk_repo'] = DirectoryTree(repo['walk_repo'])
+        journalPath = os.path.join(os.path.dirname(repoPath), self.__repoJournal)
+        journalSize, errors = self.__load_repository_journal(journalPath=journalPath, repo=repo)
+        if len(errors):
+            warnings.warn("\n".join(errors))
         # return
-        return repo
+        return repo, journalSize
 
-    def __load_repository(self, path, verbose=True, safeMode=True):
+    def __load_repository(self, path, verbose=True, safeMode=True, verify='full'):
         # try to open
         if path.strip() in ('','.'):
             path = os.getcwd()
@@ -872,19 +1937,22 @@ class Repository(object):
             raise Exception("No repository found in '%s'"%str(repoPath))
         # update locker serverFile and start
         serverFile    = os.path.join(repoPath, self.__repoLock)
-        self.__locker = FACTORY(key=serverFile, password=self.__password, serverFile=serverFile, autoconnect=False, reconnect=False)
+        self.__locker = get_locker(self.__lockerName, serverFile=serverFile, password=self.__password)
         self.__locker.start()
         # acquire lock
         if safeMode:
-            acquired, lockId = self.__locker.acquire_lock(path=repoPath, timeout=self.timeout)
+            acquired, lockId = self.__acquire_lock(repoPath, key='')
             # check if acquired.
             assert acquired, "code %s. Unable to aquire the lock when calling 'load_repository'"%(lockId,)
         # load repository
         error = None
         try:
-            repo = self.__load_repository_pickle_file( os.path.join(repoPath, self.__repoFile) )
+            fingerprint = self.__get_repository_fingerprint(repoPath)
+            with self._tracer.phase('reload'):
+                repo, journalSize = self.__load_repository_pickle_file( os.path.join(repoPath, self.__repoFile) )
+            self.__open_metadata(repoPath, repo.get('metadata', 'pickle'))
             # get paths dict
-            repoFiles, errors = self.__sync_files(repoPath=repoPath, dirs=repo['walk_repo'])
+            repoFiles, errors = self.__sync_files(repoPath=repoPath, tree=repo['walk_repo'], verify=verify)
             if len(errors) and verbose:
                 warnings.warn("\n".join(errors))
             self.__path = repoPath
@@ -892,12 +1960,26 @@ class Repository(object):
             self.__repo['repository_information'] = repo['repository_information']
             self.__repo['create_utctime']         = repo['create_utctime']
             self.__repo['last_update_utctime']    = repo['last_update_utctime']
+            self.__repo['journal_id']             = repo.get('journal_id', None)
+            self.__repo['file_info_version']      = repo.get('file_info_version', 1)
+            self.__repo['metadata']               = self.__metadataName
+            self.__repo['metadata_id']            = repo.get('metadata_id', None)
             self.__repo['walk_repo']              = repoFiles
+            self.__journalSize                    = journalSize
+            # in memory tree differs from disk when synching dropped entries
+            self.__repoFingerprint                = [None, fingerprint][len(errors)==0]
+            # migrate files information. Migration requires the lock
+            if safeMode and self.__repo['file_info_version'] < self.FILE_INFO_VERSION:
+                errors = self.__migrate_files_info()
+                if len(errors) and verbose:
+                    warnings.warn("\n".join(errors))
+                self.__repo['file_info_version'] = self.FILE_INFO_VERSION
+                self.__save_repository_pickle_file(lockFirst=False, raiseError=True)
         except Exception as err:
             error = str(err)
         # release lock
         if safeMode:
-            self.__locker.release_lock(lockId)
+            self.__release_lock(lockId)
         # check for any error
         assert error is None, error
 
@@ -918,12 +2000,184 @@ class Repository(object):
         return self.__repo['repository_unique_name']
 
     def close(self):
+        self.flush()
+        if self.__flusher is not None:
+            self.__flusher.stop()
+        if self.__metadata is not None:
+            self.__metadata.close()
         if self.__locker is not None:
             self.__locker.stop()
 
+    @property
+    def metadata(self):
+        """Repository metadata backend. One of 'pickle' or 'sqlite'."""
+        return self.__metadataName
+
+    @property
+    def verify(self):
+        """How tracked directories and files are checked on disk upon
+        loading. One of 'full', 'scandir' or 'lazy'."""
+        return self.__verify
+
+    @property
+    def durability(self):
+        """Default durability level. One of 'strict', 'batch' or 'none'."""
+        return self.__durability
+
+    def set_durability(self, durability):
+        """
+        Set default durability level of written files.
+
+        :Parameters:
+            #. durability (string): 'strict' to sync every written file to disk
+               before returning, 'batch' to sync written files together in a
+               background flusher or 'none' to leave syncing to the operating
+               system.
+        """
+        assert durability in ('strict','batch','none'), "durability must be 'strict', 'batch' or 'none'"
+        self.__durability = durability
+
+    @observed
+    def flush(self):
+        """
+        Durability barrier. Sync to disk all files written with 'batch'
+        durability that are not synced yet. With 'sqlite' metadata, the
+        database write ahead log is checkpointed too.
+
+        :Returns:
+            #. nfiles (int): Number of synced files.
+        """
+        if self.__flusher is None and self.__metadata is None:
+            return 0
+        nfiles = 0
+        with self._tracer.phase('fsync'):
+            if self.__flusher is not None:
+                nfiles = self.__flusher.flush()
+            if self.__metadata is not None:
+                self.__metadata.checkpoint()
+        return nfiles
+
+    def set_object_cache(self, maxEntries=None, maxBytes=None):
+        """
+        Enable, resize or disable the in-process cache of pulled objects.
+        When enabled, pull_file returns a file cached object as long as the
+        file modification time, size and inode did not change. Cached objects
+        are invalidated by this instance dump, update, rename and remove
+        methods and cleared when another process changes the repository.
+        Cached objects are returned as is and must not be modified in place.
+
+        :Parameters:
+            #. maxEntries (None, int): Maximum number of cached objects.
+            #. maxBytes (None, int): Maximum sum of cached files size in bytes.
+               If maxEntries and maxBytes are both None, cache is disabled.
+        """
+        if maxEntries is None and maxBytes is None:
+            self.__objectCache = None
+        else:
+            self.__objectCache = ObjectCache(maxEntries=maxEntries, maxBytes=maxBytes)
+
+    def get_object_cache_stats(self):
+        """
+        Get pulled objects cache statistics.
+
+        :Returns:
+            #. stats (None, dict): None if cache is disabled, otherwise a
+               dictionary of 'hits', 'misses', 'evictions', 'invalidations',
+               'entries', 'bytes', 'maxEntries' and 'maxBytes'.
+        """
+        if self.__objectCache is None:
+            return None
+        return self.__objectCache.get_stats()
+
+    def clear_object_cache(self):
+        """Remove all pulled objects from cache."""
+        if self.__objectCache is not None:
+            self.__objectCache.clear()
+
+    def get_lock_stats(self):
+        """
+        Get this instance locks statistics by lock path. Lock paths are
+        repository relative paths of locked directories and files, '' being
+        the repository itself. Wait and hold times are in seconds.
+
+        :Returns:
+            #. stats (dict): Dictionary of statistics by lock path. Each path
+               statistics is a dictionary of:\n
+               'acquired': number of acquired locks.\n
+               'timeouts': number of locks not acquired before timeout.\n
+               'errors': number of locks not acquired for other reasons.\n
+               'failed_trials': number of failed ntrials trials of
+               operations done while holding the lock.\n
+               'wait': time waited to acquire the lock histogram summary.\n
+               'hold': time the lock was held histogram summary.\n
+               Histograms summaries are dictionaries of 'count', 'total',
+               'min', 'max', 'mean', 'p50', 'p95', 'p99' and 'buckets', the
+               list of (upper bound, count) of non empty buckets.
+        """
+        return self.__lockStats.get_stats()
+
+    def reset_lock_stats(self):
+        """Reset this instance locks statistics."""
+        self.__lockStats.reset()
+
+    @property
+    def observer(self):
+        """Public operations observer."""
+        return self._tracer.observer
+
+    def set_observer(self, observer):
+        """
+        Set public operations observer. Observer is called with an event
+        dictionary after every public operation such as dump_file, pull_file
+        or add_directory. Operations called by another operation of the same
+        thread are part of the calling operation event. Events are
+        dictionaries of:\n
+        'operation': the operation method name.\n
+        'path': the operation relative path or None.\n
+        'success': whether operation succeeded.\n
+        'error': the error message or None.\n
+        'start': the operation start time.\n
+        'duration': the operation duration in seconds.\n
+        'phases': the dictionary of durations in seconds by phase among
+        'lock' wait, 'reload' of .pyreprepo, 'serialize' and 'deserialize'
+        including dump and pull code strings execution, 'metadata' files
+        read and write, 'fsync', 'save' of .pyreprepo and its journal, and
+        'other' for the remaining time.\n
+        pyrep.Stats.OperationStats is an observer aggregating events with
+        percentiles per operation.
+
+        :Parameters:
+            #. observer (None, callable): The observer. If None, operations
+               are not traced.
+        """
+        assert observer is None or callable(observer), "observer must be None or callable"
+        self._tracer.observer = observer
+
     def get_stats(self):
         """
-        Get repository descriptive stats
+        Get repository descriptive stats. Numbers of tracked directories and
+        files are maintained upon every change, disk is not accessed. Use
+        verify_stats to count directories and files found on disk.
+
+        :Returns:
+            #. numberOfDirectories (integer): Number of diretories in repository
+            #. numberOfFiles (integer): Number of files in repository
+        """
+        if self.__path is None:
+            return 0,0
+        tree = self.__repo['walk_repo']
+        return tree.numberOfDirectories, tree.numberOfFiles
+
+    def verify_stats(self, pool=None):
+        """
+        Get repository descriptive stats by checking every tracked directory
+        and file on disk. Only directories with their .pyrepdirinfo and
+        files with their .%s_pyrepfileinfo found on disk are counted.
+        Differences with get_stats reveal a repository out of sync with disk.
+
+        :Parameters:
+            #. pool (None, int, object): The pool used to scan directories in
+               parallel as described in iter_repository_state.
 
         :Returns:
             #. numberOfDirectories (integer): Number of diretories in repository
@@ -933,7 +2187,7 @@ class Repository(object):
             return 0,0
         nfiles = 0
         ndirs  = 0
-        for fdict in self.get_repository_state():
+        for fdict in self.iter_repository_state(pool=pool):
             fdname = list(fdict)[0]
             if fdname == '':
                 continue
@@ -955,12 +2209,28 @@ class Repository(object):
         """
         self.__path   = None
         self.__locker = None
+        self.__journalSize     = 0
+        self.__repoFingerprint = None
+        if self.__objectCache is not None:
+            self.__objectCache.clear()
+        # sync files pending from previous repository and stop flusher
+        # thread. It's started again upon next 'batch' write
+        if self.__flusher is not None:
+            self.__flusher.stop()
+        if self.__metadata is not None:
+            self.__metadata.close()
+            self.__metadata = None
+        self.__fileIndex = None
         self.__repo   = {'repository_unique_name': str(uuid.uuid1()),
                          'create_utctime': time.time(),
                          'last_update_utctime': None,
                          'pyrep_version': str(__version__),
                          'repository_information': '',
-                         'walk_repo': []}
+                         'journal_id': None,
+                         'file_info_version': self.FILE_INFO_VERSION,
+                         'metadata': self.__metadataName,
+                         'metadata_id': str(uuid.uuid1()),
+                         'walk_repo': DirectoryTree()}
 
 
     def is_repository(self, path):
@@ -983,7 +2253,8 @@ class Repository(object):
             return False
 
 
-    def load_repository(self, path, verbose=True, ntrials=3, safeMode=True):
+    @observed
+    def load_repository(self, path, verbose=True, ntrials=3, safeMode=True, verify=None):
         """
         Load repository from a directory path and update the current instance.
         First, new repository still will be loaded. If failed, then old
@@ -1004,17 +2275,25 @@ class Repository(object):
             #. safeMode (boolean): loading repository can be done without
                acquiring from multiple processes. Not acquiring the lock
                can be unsafe if another process is altering the repository
+            #. verify (None, string): How tracked directories and files are
+               checked on disk, one of 'full', 'scandir' or 'lazy' as
+               described in Repository. If None, the instance verify is used.
+               Otherwise, it becomes the instance verify.
 
         :Returns:
              #. repository (pyrep.Repository): returns self repository with loaded data.
         """
+        if verify is None:
+            verify = self.__verify
+        assert verify in ('full','scandir','lazy'), "verify must be None, 'full', 'scandir' or 'lazy'"
+        self.__verify = verify
         assert isinstance(safeMode, bool), "safeMode must be boolean"
         assert isinstance(ntrials, int), "ntrials must be integer"
         assert ntrials>0, "ntrials must be >0"
         repo = None
         for _trial in range(ntrials):
             try:
-                self.__load_repository(path=path, verbose=True, safeMode=safeMode)
+                self.__load_repository(path=path, verbose=True, safeMode=safeMode, verify=verify)
             except Exception as err1:
                 error = "Unable to load repository (%s)"%(err1, )
             else:
@@ -1025,6 +2304,7 @@ class Repository(object):
         assert error is None, error
         return repo
 
+    @observed
     def create_repository(self, path, info=None, description=None, replace=True, allowNoneEmpty=True, raiseError=True):
         """
         create a repository in a directory. This method insures the creation of
@@ -1094,9 +2374,10 @@ class Repository(object):
         self.reset()
         self.__path = realPath.rstrip(os.sep)
         self.__repo['repository_information'] = info
+        self.__open_metadata(self.__path, self.__metadataName)
         # set locker
         serverFile    = os.path.join(self.__path, self.__repoLock)
-        self.__locker = FACTORY(key=serverFile, password=self.__password, serverFile=serverFile, autoconnect=False, reconnect=False)
+        self.__locker = get_locker(self.__lockerName, serverFile=serverFile, password=self.__password)
         #self.__locker.debugMode = True
         self.__locker.start()
         # save repository
@@ -1107,13 +2388,15 @@ class Repository(object):
             message.append("Absolute path and directories might be created but no pyrep Repository is created. Previous repository state restored")
             if self.__path is not None:
                 serverFile    = os.path.join(self.__path, self.__repoLock)
-                self.__locker = FACTORY(key=serverFile, password=self.__password, serverFile=serverFile, autoconnect=False, reconnect=False)
+                self.__locker = get_locker(self.__lockerName, serverFile=serverFile, password=self.__password)
                 self.__locker.start()
+                self.__open_metadata(self.__path, self.__repo.get('metadata', 'pickle'))
             return False, '\n'.join(message)
         # return
         return True, '\n'.join(message)
 
-    def remove_repository(self, path=None, password=None, removeEmptyDirs=True):
+    @observed
+    def remove_repository(self, path=None, password=None, removeEmptyDirs=True, pool=None):
         """
         Remove all repository from path along with all repository tracked files.
 
@@ -1124,51 +2407,70 @@ class Repository(object):
                password would be given upon instanciation
             #. removeEmptyDirs (boolean): Whether to remove remaining empty
                directories including repository one.
+            #. pool (None, int, object): The pool used to scan directories in
+               parallel as described in iter_repository_state.
         """
         assert isinstance(removeEmptyDirs, bool), "removeEmptyDirs must be boolean"
         if path is not None:
             if path != self.__path:
-                repo = Repository(password=password)
+                repo = Repository(password=password, locker=self.__lockerName, verify=self.__verify)
                 repo.load_repository(path)
             else:
                 repo = self
         else:
             repo = self
         assert repo.path is not None, "path is not given and repository is not initialized"
-        assert repo.locker.isServer, "It's not safe to remove repository tree from a client"
-        assert not len(repo.locker._clientsLUT), "It's not safe to remove repository tree when other instances are still connected"
-        # remove repo files and directories
-        for fdict in reversed(repo.get_repository_state()):
+        if isinstance(repo.locker, ServerLocker):
+            assert repo.locker.isServer, "It's not safe to remove repository tree from a client"
+            assert not len(repo.locker._clientsLUT), "It's not safe to remove repository tree when other instances are still connected"
+        # remove repo files as they are generated and directories afterwards
+        # from the deepest as they are emptied
+        directories = []
+        for fdict in repo.iter_repository_state(pool=pool):
             relaPath   = list(fdict)[0]
+            info       = fdict[relaPath]
             realPath   = os.path.join(repo.path, relaPath)
             path, name = os.path.split(realPath)
-            if fdict[relaPath]['type'] == 'file':
-                if os.path.isfile(realPath):
+            if info['type'] == 'file':
+                if info['exists']:
                     os.remove(realPath)
-                if os.path.isfile(os.path.join(repo.path,path,self.__fileInfo%name)):
+                if info['pyrepfileinfo'] and repo.metadata == 'pickle':
                     os.remove(os.path.join(repo.path,path,self.__fileInfo%name))
-                if os.path.isfile(os.path.join(repo.path,path,self.__fileLock%name)):
+                if info['pyrepfilelock']:
                     os.remove(os.path.join(repo.path,path,self.__fileLock%name))
-                if os.path.isfile(os.path.join(repo.path,path,self.__fileClass%name)):
+                if info['pyrepfileclass']:
                     os.remove(os.path.join(repo.path,path,self.__fileClass%name))
-            elif fdict[relaPath]['type'] == 'dir':
-                if os.path.isfile(os.path.join(realPath,self.__dirInfo)):
-                    os.remove(os.path.join(realPath,self.__dirInfo))
-                if os.path.isfile(os.path.join(realPath,self.__dirLock)):
-                    os.remove(os.path.join(realPath,self.__dirLock))
-                if not len(os.listdir(realPath)) and removeEmptyDirs:
-                    shutil.rmtree( realPath )
+            elif info['type'] == 'dir' and info['exists']:
+                directories.append(realPath)
+        for realPath in reversed(directories):
+            if os.path.isfile(os.path.join(realPath,self.__dirInfo)):
+                os.remove(os.path.join(realPath,self.__dirInfo))
+            if os.path.isfile(os.path.join(realPath,self.__dirLock)):
+                os.remove(os.path.join(realPath,self.__dirLock))
+            if not len(os.listdir(realPath)) and removeEmptyDirs:
+                shutil.rmtree( realPath )
         # remove repo information file
         if os.path.isfile(os.path.join(repo.path,self.__repoFile)):
             os.remove(os.path.join(repo.path,self.__repoFile))
+        if os.path.isfile(os.path.join(repo.path,self.__repoJournal)):
+            os.remove(os.path.join(repo.path,self.__repoJournal))
         if os.path.isfile(os.path.join(repo.path,self.__repoLock)):
             os.remove(os.path.join(repo.path,self.__repoLock))
+        if os.path.isdir(os.path.join(repo.path,self.__repoLocks)):
+            shutil.rmtree(os.path.join(repo.path,self.__repoLocks))
+        if repo.__metadata is not None:
+            repo.__metadata.close()
+            repo.__metadata = None
+        for name in self.__get_metadata_files():
+            if os.path.isfile(os.path.join(repo.path,name)):
+                os.remove(os.path.join(repo.path,name))
         if not len(os.listdir(repo.path)) and removeEmptyDirs:
             shutil.rmtree( repo.path )
         # close repo
         repo.close()
 
     @path_required
+    @observed
     def save(self, description=None, raiseError=True, ntrials=3):
         """
         Save repository '.pyreprepo' to disk and create (if missing) or
@@ -1199,11 +2501,10 @@ class Repository(object):
         # get description
         if description is not None:
             assert isinstance(description, basestring), "description must be None or a string"
-        dirInfoPath = os.path.join(self.__path, self.__dirInfo)
-        if description is None and not os.path.isfile(dirInfoPath):
+        if description is None and self.__read_dirinfo('') is None:
             description = ''
         # create and acquire lock
-        acquired, lockId = self.__locker.acquire_lock(self.__path, timeout=self.timeout)
+        acquired, lockId = self.__acquire_lock(self.__path)
         # check if acquired.
         if not acquired:
             m = "code %s. Unable to aquire the lock when calling 'save'. You may try again!"%(lockId,)
@@ -1215,30 +2516,124 @@ class Repository(object):
                 # open file
                 repoInfoPath = os.path.join(self.__path, self.__repoFile)
                 error = None
-                self.__save_dirinfo(description=description, dirInfoPath=dirInfoPath)
+                self.__save_dirinfo(description=description, relativePath='')
                 # load and update repository info if existing
                 if os.path.isfile(repoInfoPath):
-                    with open(repoInfoPath, 'rb') as fd:
-                        repo = self.__load_repository_pickle_file(os.path.join(self.__path, self.__repoFile))
-                        self.__repo['walk_repo'] = repo['walk_repo']
-                # create repository
-                with open(repoInfoPath, 'wb') as fd:
-                    self.__repo["last_update_utctime"] = time.time()
-                    pickle.dump( self.__repo,fd, protocol=self._DEFAULT_PICKLE_PROTOCOL )
-                    fd.flush()
-                    os.fsync(fd.fileno())
+                    repo, _ = self.__load_repository_pickle_file(repoInfoPath)
+                    self.__repo['walk_repo'] = repo['walk_repo']
+                # create repository and compact journal
+                _, error = self.__save_repository_pickle_file(lockFirst=False, raiseError=True)
             except Exception as err:
                 error = "Unable to save repository (%s)"%err
+                self.__lockStats.failed_trial()
                 if self.DEBUG_PRINT_FAILED_TRIALS: print("Trial %i failed in Repository.%s (%s). Set Repository.DEBUG_PRINT_FAILED_TRIALS to False to mute"%(_trial, inspect.stack()[1][3], str(error)))
             else:
                 break
         # release lock
-        self.__locker.release_lock(lockId)
+        self.__release_lock(lockId)
         # return
         assert error is None or not raiseError, error
         return error is None, error
 
 
+    @path_required
+    @observed
+    def convert_metadata(self, metadata, raiseError=True, ntrials=3):
+        """
+        Convert repository metadata backend. All files and directories
+        information is written to the new backend, which is recorded in
+        .pyreprepo, and removed from the old one. Converting a 'sqlite'
+        repository to 'pickle' exports it to the default layout of
+        information files. Other instances switch backend upon their next
+        repository loading or change.
+
+        :Parameters:
+            #. metadata (string): The new metadata backend, 'pickle' or
+               'sqlite'. See Repository.
+            #. raiseError (boolean): Whether to raise encountered error instead
+               of returning failure.
+            #. ntrials (int): After aquiring all locks, ntrials is the maximum
+               number of trials allowed before failing.
+
+        :Returns:
+            #. success (bool): Whether converting was successful.
+            #. error (None, string): Fail to convert message in case
+               converting is not successful. If success is True, error will
+               be None.
+        """
+        assert metadata in ('pickle','sqlite'), "metadata must be 'pickle' or 'sqlite'"
+        assert isinstance(raiseError, bool), "raiseError must be boolean"
+        assert isinstance(ntrials, int), "ntrials must be integer"
+        assert ntrials>0, "ntrials must be >0"
+        # lock repository
+        acquired, repoLockId = self.__acquire_lock(self.__path)
+        if not acquired:
+            error = "Code %s. Unable to aquire the repository lock. You may try again!"%(repoLockId,)
+            assert not raiseError, error
+            return False, error
+        error = self.__load_repository_walk(ntrials=ntrials)
+        if error is not None or metadata == self.__metadataName:
+            self.__release_lock(repoLockId)
+            assert error is None or not raiseError, error
+            return error is None, error
+        for _trial in range(ntrials):
+            error = None
+            oldName, oldMetadata = self.__metadataName, self.__metadata
+            oldId = self.__repo.get('metadata_id', None)
+            try:
+                # read all information from old backend
+                tree      = self.__repo['walk_repo']
+                dirInfos  = [(d, self.__read_dirinfo(d)) for d in ['']+list(tree.walk_directories(recursive=True))]
+                fileInfos = []
+                for f in tree.walk_files(recursive=True):
+                    if self.__has_file_info(f):
+                        fileInfos.append( (f, self.__read_file_info(f)) )
+                # write all information to new backend and sync it together
+                self.__metadata  = None
+                self.__fileIndex = None
+                if metadata == 'sqlite':
+                    self.__metadata = SQLiteMetadata(os.path.join(self.__path, self.__metadataFile), protocol=self._DEFAULT_PICKLE_PROTOCOL)
+                self.__metadataName = metadata
+                for d, info in dirInfos:
+                    if info is not None:
+                        self.__write_dirinfo(d, info, durability='batch')
+                for f, info in fileInfos:
+                    self.__write_file_info(f, info, durability='batch')
+                self.flush()
+                # record new backend
+                self.__repo['metadata']    = metadata
+                self.__repo['metadata_id'] = str(uuid.uuid1())
+                self.__save_repository_pickle_file(lockFirst=False, raiseError=True)
+            except Exception as err:
+                error = "Unable to convert metadata to '%s' (%s)"%(metadata, err)
+                if self.__metadata is not None:
+                    self.__metadata.close()
+                self.__metadataName, self.__metadata = oldName, oldMetadata
+                self.__repo['metadata']    = oldName
+                self.__repo['metadata_id'] = oldId
+                self.__lockStats.failed_trial()
+                if self.DEBUG_PRINT_FAILED_TRIALS: print("Trial %i failed in Repository.%s (%s). Set Repository.DEBUG_PRINT_FAILED_TRIALS to False to mute"%(_trial, inspect.stack()[1][3], str(error)))
+                continue
+            # remove old backend information
+            if oldMetadata is not None:
+                oldMetadata.close()
+                for name in self.__get_metadata_files():
+                    if os.path.isfile(os.path.join(self.__path, name)):
+                        os.remove(os.path.join(self.__path, name))
+            else:
+                for d, info in dirInfos:
+                    if info is not None:
+                        os.remove(os.path.join(self.__path, d, self.__dirInfo))
+                for f, _ in fileInfos:
+                    fPath, fName = os.path.split(os.path.join(self.__path, f))
+                    os.remove(os.path.join(fPath, self.__fileInfo%fName))
+            break
+        # release lock
+        self.__release_lock(repoLockId)
+        assert error is None or not raiseError, error
+        return error is None, error
+
+
     def is_name_allowed(self, path):
         """
         Get whether creating a file or a directory from the basenane of the given
@@ -1257,10 +2652,14 @@ class Repository(object):
         if not len(name):
             return False, "empty name is not allowed"
         # exact match
-        for em in [self.__repoLock,self.__repoFile,self.__dirInfo,self.__dirLock]:
+        for em in [self.__repoLock,self.__repoFile,self.__repoJournal,
+                   self.__repoFile+'.tmp',self.__repoJournal+'.tmp',
+                   self.__repoLocks,self.__dirInfo,self.__dirLock]+self.__get_metadata_files():
             if name == em:
                 return False, "name '%s' is reserved for pyrep internal usage"%em
         # pattern match
+        if name.startswith(self.__fileTemp%''):
+            return False, "name prefix '%s' is reserved for pyrep internal usage"%(self.__fileTemp%'',)
         for pm in [self.__fileInfo,self.__fileLock]:#,self.__objectDir]:
             if name == pm or (name.endswith(pm[3:]) and name.startswith('.')):
                 return False, "name pattern '%s' is not allowed as result may be reserved for pyrep internal usage"%pm
@@ -1289,14 +2688,116 @@ class Repository(object):
             return path
 
     @path_required
-    def get_repository_state(self, relaPath=None):
+    def iter_repository_state(self, relaPath=None, pool=None):
+        """
+        Generate repository state items along with useful information. Items
+        are the same and come in the same order as get_repository_state's
+        ones, but they are generated one directory at a time. Every tracked
+        directory is scanned once to answer all existence questions of the
+        directory itself and of its files and information files.
+
+        :Parameters:
+            #. relaPath (None, str): relative directory path from where to
+               start. If None all repository representation is generated.
+            #. pool (None, int, object): The pool used to scan directories in
+               parallel. If None, directories are scanned sequentially. If an
+               integer is given, a pool of as many threads is created and
+               closed when the generator is exhausted or closed. Otherwise
+               it must be a pool implementing map such as
+               multiprocessing.pool.ThreadPool. Scanning is input/output
+               bound and benefits from threads on network and slow disks.
+
+        :Returns:
+            #. state (generator): Generator of dictionaries. Every dictionary
+               has a single key which is the file or the directory relative
+               path and the value is a dictionary of information as
+               described in get_repository_state.
+        """
+        if relaPath is None:
+            node = self.__repo['walk_repo'].root
+        else:
+            assert isinstance(relaPath, basestring), "relaPath must be None or a str"
+            node = self.__get_repository_directory(relaPath)
+        ownPool = False
+        if isinstance(pool, int):
+            assert pool>0, "pool number of threads must be >0"
+            pool    = ThreadPool(processes=pool) if pool>1 else None
+            ownPool = pool is not None
+        assert pool is None or hasattr(pool, 'map'), "pool must be None, an integer or a pool implementing map"
+        def _get_state(node, entries):
+            relaPath = node.relativePath
+            if entries is None:
+                entries = {}
+                exists  = False
+            else:
+                exists  = True
+            hasDirInfo = entries.get(self.__dirInfo, None) is False
+            fileInfos  = None
+            if self.__metadata is not None:
+                hasDirInfo, fileInfos = self.__metadata.list_directory(relaPath)
+            state = [{relaPath:{'type':'dir',
+                                'exists':exists,
+                                'pyrepdirinfo':hasDirInfo}}]
+            for fname in sorted(node.files):
+                if fileInfos is None:
+                    hasFileInfo = entries.get(self.__fileInfo%fname, None) is False
+                else:
+                    hasFileInfo = fname in fileInfos
+                state.append({os.path.join(relaPath,fname):{'type':'file',
+                                                            'exists':entries.get(fname, None) is False,
+                                                            'pyrepfileinfo':hasFileInfo,
+                                                            'pyrepfileclass':entries.get(self.__fileClass%fname, None) is False,
+                                                            'pyrepfilelock':entries.get(self.__fileLock%fname, None) is False}})
+            return state
+        def _generate():
+            if node is None:
+                return
+            try:
+                for n, entries in self.__scan_directories(repoPath=self.__path, node=node, pool=pool):
+                    for item in _get_state(n, entries):
+                        yield item
+            finally:
+                if ownPool:
+                    pool.close()
+                    pool.join()
+        return _generate()
+
+    def __scan_directories(self, repoPath, node, pool=None):
+        # generate (node, scan_directory entries) of node and all its sub
+        # directories in depth first order. With a pool, directories are
+        # scanned by batches to keep memory bounded
+        def _iter_dirs(node):
+            yield node
+            for dirname in sorted(node.directories):
+                for n in _iter_dirs(node.directories[dirname]):
+                    yield n
+        def _scan(node):
+            return node, scan_directory(os.path.join(repoPath,node.relativePath))
+        if pool is None:
+            for n in _iter_dirs(node):
+                yield _scan(n)
+            return
+        nodes = _iter_dirs(node)
+        while True:
+            batch = list(islice(nodes, self.STATE_SCAN_BATCH))
+            if not len(batch):
+                break
+            for scanned in pool.map(_scan, batch):
+                yield scanned
+
+    @path_required
+    def get_repository_state(self, relaPath=None, pool=None):
         """
         Get a list representation of repository state along with useful
-        information. List state is ordered relativeley to directories level
+        information. List state is ordered relativeley to directories level.
+        Use iter_repository_state to walk the state of big repositories
+        without building the list.
 
         :Parameters:
             #. relaPath (None, str): relative directory path from where to
                start. If None all repository representation is returned.
+            #. pool (None, int, object): The pool used to scan directories in
+               parallel as described in iter_repository_state.
 
         :Returns:
             #. state (list): List representation of the repository.
@@ -1307,62 +2808,14 @@ class Repository(object):
                    * 'type': the type of the tracked whether it's file, dir, or objectdir
                    * 'exists': whether file or directory actually exists on disk
                    * 'pyrepfileinfo': In case of a file or an objectdir whether .%s_pyrepfileinfo exists
+                   * 'pyrepfileclass': In case of a file whether .%s_pyrepfileclass exists
+                   * 'pyrepfilelock': In case of a file whether .%s_pyrepfilelock exists
                    * 'pyrepdirinfo': In case of a directory whether .pyrepdirinfo exists
+
+               With 'sqlite' metadata, 'pyrepfileinfo' and 'pyrepdirinfo'
+               tell whether information is found in the metadata database.
         """
-        state = []
-        def _walk_dir(relaPath, dirList):
-            dirDict = {'type':'dir',
-                       'exists':os.path.isdir(os.path.join(self.__path,relaPath)),
-                       'pyrepdirinfo':os.path.isfile(os.path.join(self.__path,relaPath,self.__dirInfo)),
-                      }
-            state.append({relaPath:dirDict})
-            # loop files and dirobjects
-            for fname in sorted([f for f in dirList if isinstance(f, basestring)]):
-                relaFilePath = os.path.join(relaPath,fname)
-                realFilePath = os.path.join(self.__path,relaFilePath)
-                #if os.path.isdir(realFilePath) and df.startswith('.') and df.endswith(self.__objectDir[3:]):
-                #    fileDict = {'type':'objectdir',
-                #                'exists':True,
-                #                'pyrepfileinfo':os.path.isfile(os.path.join(self.__path,relaPath,self.__fileInfo%fname)),
-                #               }
-                #else:
-                #    fileDict = {'type':'file',
-                #                'exists':os.path.isfile(realFilePath),
-                #                'pyrepfileinfo':os.path.isfile(os.path.join(self.__path,relaPath,self.__fileInfo%fname)),
-                #               }
-                fileDict = {'type':'file',
-                            'exists':os.path.isfile(realFilePath),
-                            'pyrepfileinfo':os.path.isfile(os.path.join(self.__path,relaPath,self.__fileInfo%fname)),
-                           }
-                state.append({relaFilePath:fileDict})
-            # loop directories
-            #for ddict in sorted([d for d in dirList if isinstance(d, dict) and len(d)], key=lambda k: list(k)[0]):
-            for ddict in sorted([d for d in dirList if isinstance(d, dict)], key=lambda k: list(k)[0]):
-                dirname = list(ddict)[0]
-                _walk_dir(relaPath=os.path.join(relaPath,dirname), dirList=ddict[dirname])
-        # call recursive _walk_dir
-        if relaPath is None:
-            _walk_dir(relaPath='', dirList=self.__repo['walk_repo'])
-        else:
-            assert isinstance(relaPath, basestring), "relaPath must be None or a str"
-            relaPath = self.to_repo_relative_path(path=relaPath, split=False)
-            spath    = relaPath.split(os.sep)
-            dirList  = self.__repo['walk_repo']
-            while len(spath):
-                dirname = spath.pop(0)
-                dList   = [d for d in dirList if isinstance(d, dict)]
-                if not len(dList):
-                    dirList = None
-                    break
-                cDict = [d for d in dList if dirname in d]
-                if not len(cDict):
-                    dirList = None
-                    break
-                dirList = cDict[0][dirname]
-            if dirList is not None:
-                _walk_dir(relaPath=relaPath, dirList=dirList)
-        # return state list
-        return state
+        return list(self.iter_repository_state(relaPath=relaPath, pool=pool))
 
     def get_repository_directory(self, relativePath):
         """
@@ -1376,7 +2829,8 @@ class Repository(object):
                directory. If directory is not tracked in repository None is
                returned
         """
-        return copy.deepcopy(self.__get_repository_directory(relativePath))
+        relativePath = self.to_repo_relative_path(path=relativePath, split=False)
+        return self.__repo['walk_repo'].to_list(relativePath)
 
     def get_file_info(self, relativePath):
         """
@@ -1388,25 +2842,81 @@ class Repository(object):
 
         :Returns:
             #. info (None, dictionary): The file information dictionary.
-               If None, it means an error has occurred.
+               If None, it means an error has occurred. Information keys are:\n
+               'repository_unique_name', 'create_utctime' and
+               'last_update_utctime'.\n
+               'description': the file description.\n
+               'codec' and 'codec_version', or 'dump' and 'pull' code
+               strings: how the file was dumped.\n
+               'class': the dumped value class 'module.qualname' or None.\n
+               'size': the file size in bytes.\n
+               'checksum': the file 'crc32:%08x' checksum or None when
+               it's unknown.
             #. errorMessage (string): The error message if any error occurred.
         """
         relativePath = self.to_repo_relative_path(path=relativePath, split=False)
-        fileName     = os.path.basename(relativePath)
-        isRepoFile,fileOnDisk, infoOnDisk, classOnDisk = self.is_repository_file(relativePath)
+        # metadata database lookup doesn't need to check the file on disk
+        if self.__metadata is not None and self.__repo['walk_repo'].is_file(relativePath):
+            try:
+                info = self.__metadata.get_file_info(relativePath)
+            except Exception as err:
+                return None, "Unable to read file info from metadata database (%s)"%str(err)
+            if info is not None:
+                return info, ''
+        isRepoFile,fileOnDisk, infoOnDisk, _ = self.is_repository_file(relativePath)
         if not isRepoFile:
             return None, "file is not a registered repository file."
         if not infoOnDisk:
+            if not fileOnDisk:
+                self.__repair_file(relativePath)
             return None, "file is a registered repository file but info file missing"
-        fileInfoPath = os.path.join(self.__path,os.path.dirname(relativePath),self.__fileInfo%fileName)
         try:
-            with open(fileInfoPath, 'rb') as fd:
-                info = pickle.load(fd)
+            info = self.__read_file_info(relativePath)
         except Exception as err:
             return None, "Unable to read file info from disk (%s)"%str(err)
         return info, ''
 
 
+    def get_file_class(self, relativePath, resolve=False):
+        """
+        Get a file dumped value class. Class qualified name is read from
+        file info and its module is imported only when resolve is True.
+        For files dumped by pyrep prior to recording class in file info
+        and not migrated yet, class is read from .%s_pyrepfileclass
+        without importing its module. Use find with klass to walk files
+        of a given class without reading files info one by one.
+
+        :Parameters:
+            #. relativePath (string): The relative to the repository path of
+               the file.
+            #. resolve (boolean): Whether to import the class module and
+               return the class itself.
+
+        :Returns:
+            #. klass (None, string, type): The class 'module.qualname' or
+               the class itself if resolve is True. None if dumped value
+               is None or if an error has occurred.
+            #. errorMessage (string): The error message if any error occurred.
+        """
+        assert isinstance(resolve, bool), "resolve must be boolean"
+        relativePath = self.to_repo_relative_path(path=relativePath, split=False)
+        info, error  = self.get_file_info(relativePath)
+        if info is None:
+            return None, error
+        try:
+            if 'class' in info:
+                name = info['class']
+            else:
+                fPath, fName = os.path.split(os.path.join(self.__path, relativePath))
+                with open(os.path.join(fPath, self.__fileClass%fName), 'rb') as fd:
+                    name = get_pickled_class_name(fd.read())
+            if resolve:
+                return resolve_class_name(name), ''
+        except Exception as err:
+            return None, "Unable to get file class (%s)"%str(err)
+        return name, ''
+
+
     def is_repository_directory(self, relativePath):
         """
         Get whether directory is registered in repository.
@@ -1430,32 +2940,19 @@ class Repository(object):
         :Returns:
             #. isRepoFile (boolean): Whether file is a repository file.
             #. isFileOnDisk (boolean): Whether file is found on disk.
-            #. isFileInfoOnDisk (boolean): Whether file info is found on disk.
+            #. isFileInfoOnDisk (boolean): Whether file info is found on disk
+               or in the metadata database.
             #. isFileClassOnDisk (boolean): Whether file class is found on disk.
+               File class is recorded in file info, therefore this is the
+               same as isFileInfoOnDisk.
         """
         relativePath  = self.to_repo_relative_path(path=relativePath, split=False)
         if relativePath == '':
             return False, False, False, False
-        relaDir, name = os.path.split(relativePath)
         fileOnDisk    = os.path.isfile(os.path.join(self.__path, relativePath))
-        infoOnDisk    = os.path.isfile(os.path.join(self.__path,os.path.dirname(relativePath),self.__fileInfo%name))
-        classOnDisk   = os.path.isfile(os.path.join(self.__path,os.path.dirname(relativePath),self.__fileClass%name))
-        cDir          = self.__repo['walk_repo']
-        if len(relaDir):
-            for dirname in relaDir.split(os.sep):
-                dList = [d for d in cDir if isinstance(d, dict)]
-                if not len(dList):
-                    cDir = None
-                    break
-                cDict = [d for d in dList if dirname in d]
-                if not len(cDict):
-                    cDir = None
-                    break
-                cDir = cDict[0][dirname]
-        if cDir is None:
-            return False, fileOnDisk, infoOnDisk, classOnDisk
-        #if name not in cDir:
-        if str(name) not in [str(i) for i in cDir]:
+        infoOnDisk    = self.__has_file_info(relativePath)
+        classOnDisk   = infoOnDisk
+        if not self.__repo['walk_repo'].is_file(relativePath):
             return False, fileOnDisk, infoOnDisk, classOnDisk
         # this is a repository registered file. check whether all is on disk
         return True, fileOnDisk, infoOnDisk, classOnDisk
@@ -1473,25 +2970,10 @@ class Repository(object):
         assert isinstance(fullPath, bool), "fullPath must be boolean"
         assert isinstance(recursive, bool), "recursive must be boolean"
         relativePath = self.to_repo_relative_path(path=relativePath, split=False)
-        dirList      = self.__get_repository_directory(relativePath=relativePath)
-        assert dirList is not None, "given relative path '%s' is not a repository directory"%relativePath
-        # walk recursive function
-        def _walk(rpath, dlist,recursive):
-            # walk files
-            for fname in dlist:
-                if isinstance(fname, basestring):
-                    if fullPath:
-                        yield os.path.join(self.__path, rpath, fname)
-                    else:
-                        yield os.path.join(rpath, fname)
-            if recursive:
-                for ddict in dlist:
-                    if isinstance(ddict, dict):
-                        dname = list(ddict)[0]
-                        for p in _walk(rpath=os.path.join(rpath,dname), dlist=ddict[dname],recursive=recursive):
-                            yield p
-        # walk all files
-        return _walk(rpath=relativePath, dlist=dirList, recursive=recursive)
+        walker       = self.__repo['walk_repo'].walk_files(relativePath=relativePath, recursive=recursive)
+        if not fullPath:
+            return walker
+        return (os.path.join(self.__path, p) for p in walker)
 
     def walk_files_info(self, relativePath="", fullPath=False, recursive=False):
         """
@@ -1507,14 +2989,22 @@ class Repository(object):
         assert isinstance(fullPath, bool), "fullPath must be boolean"
         assert isinstance(recursive, bool), "recursive must be boolean"
         relativePath = self.to_repo_relative_path(path=relativePath, split=False)
+        # query all walked files information at once from metadata database
+        infos = None
+        if self.__metadata is not None:
+            with self._tracer.phase('metadata'):
+                infos = dict(self.__metadata.walk_files_info(relativePath=relativePath, recursive=recursive))
         for relaPath in self.walk_files_path(relativePath=relativePath, fullPath=False, recursive=recursive):
-            fpath, fname = os.path.split(relaPath)
-            fileInfoPath = os.path.join(self.__path,fpath,self.__fileInfo%fname)
-            if os.path.isfile(fileInfoPath):
-                with open(fileInfoPath, 'rb') as fd:
-                    info = pickle.load(fd)
+            if infos is not None:
+                info = infos.get(relaPath, None)
             else:
-                info = None
+                fpath, fname = os.path.split(relaPath)
+                fileInfoPath = os.path.join(self.__path,fpath,self.__fileInfo%fname)
+                if os.path.isfile(fileInfoPath):
+                    with open(fileInfoPath, 'rb') as fd:
+                        info = pickle.load(fd)
+                else:
+                    info = None
             if fullPath:
                 yield (os.path.join(self.__path, relaPath), info)
             else:
@@ -1533,26 +3023,10 @@ class Repository(object):
         assert isinstance(fullPath, bool), "fullPath must be boolean"
         assert isinstance(recursive, bool), "recursive must be boolean"
         relativePath = self.to_repo_relative_path(path=relativePath, split=False)
-        dirList      = self.__get_repository_directory(relativePath=relativePath)
-        assert dirList is not None, "given relative path '%s' is not a repository directory"%relativePath
-        # walk recursive function
-        def _walk(rpath, dlist,recursive):
-            # walk files
-            for ddict in dlist:
-                if isinstance(ddict, dict):
-                    dname = list(ddict)[0]
-                    if fullPath:
-                        yield os.path.join(self.__path, rpath, dname)
-                    else:
-                        yield os.path.join(rpath, dname)
-            if recursive:
-                for ddict in dlist:
-                    if isinstance(ddict, dict):
-                        dname = list(ddict)[0]
-                        for p in _walk(rpath=os.path.join(rpath,dname), dlist=ddict[dname],recursive=recursive):
-                            yield p
-        # walk all files
-        return _walk(rpath=relativePath, dlist=dirList, recursive=recursive)
+        walker       = self.__repo['walk_repo'].walk_directories(relativePath=relativePath, recursive=recursive)
+        if not fullPath:
+            return walker
+        return (os.path.join(self.__path, p) for p in walker)
 
     def walk_directories_info(self, relativePath="", fullPath=False, recursive=False):
         """
@@ -1568,19 +3042,122 @@ class Repository(object):
         assert isinstance(fullPath, bool), "fullPath must be boolean"
         assert isinstance(recursive, bool), "recursive must be boolean"
         relativePath = self.to_repo_relative_path(path=relativePath, split=False)
+        # query all walked directories information at once from metadata database
+        infos = None
+        if self.__metadata is not None:
+            with self._tracer.phase('metadata'):
+                infos = dict(self.__metadata.walk_directories_info(relativePath=relativePath, recursive=recursive))
         # walk directories
         for dpath in self.walk_directories_path(relativePath=relativePath, fullPath=False, recursive=recursive):
-            dirInfoPath = os.path.join(self.__path,dpath,self.__dirInfo)
-            if os.path.isfile(dirInfoPath):
-                with open(dirInfoPath, 'rb') as fd:
-                    info = pickle.load(fd)
+            if infos is not None:
+                info = infos.get(dpath, None)
             else:
-                info = None
+                dirInfoPath = os.path.join(self.__path,dpath,self.__dirInfo)
+                if os.path.isfile(dirInfoPath):
+                    with open(dirInfoPath, 'rb') as fd:
+                        info = pickle.load(fd)
+                else:
+                    info = None
             if fullPath:
                 yield (os.path.join(self.__path, dpath), info)
             else:
                 yield (dpath, info)
 
+    def __get_file_index(self):
+        # get pickle metadata in memory files index. Index is built upon
+        # first use, maintained by every change of this instance and dropped
+        # when tree is reloaded. Files information updated by other processes
+        # is read again given their metadata file stamp
+        with self._tracer.phase('metadata'):
+            if self.__fileIndex is None:
+                items = []
+                for relaPath in self.walk_files_path(recursive=True):
+                    stamp = self.__get_info_stamp(relaPath)
+                    if stamp is not None:
+                        try:
+                            items.append( (relaPath, self.__read_file_info(relaPath), stamp) )
+                        except Exception:
+                            pass
+                self.__fileIndex = FileIndex(items=items)
+            else:
+                for relaPath, stamp in self.__fileIndex.get_stamps():
+                    newStamp = self.__get_info_stamp(relaPath)
+                    if newStamp == stamp and stamp is not None:
+                        continue
+                    try:
+                        self.__fileIndex.set(relaPath, self.__read_file_info(relaPath), stamp=newStamp)
+                    except Exception:
+                        self.__fileIndex.remove(relaPath)
+        return self.__fileIndex
+
+    @path_required
+    @observed
+    def find(self, pattern=None, regex=None, updated_after=None, updated_before=None,
+                   klass=None, codec=None, description_contains=None, withInfo=False):
+        """
+        Find repository files given their path and information. All given
+        filters must match. With 'sqlite' metadata, find is a query of the
+        metadata database indexes. With 'pickle' metadata, an in memory
+        index of all files information is built upon first call and is
+        maintained by every change of this instance. Every call reloads the
+        repository tree if another process changed it and reads again the
+        information of files updated since, which costs one stat call per
+        file.
+
+        :Parameters:
+            #. pattern (None, string): Unix shell-style wildcards pattern
+               matching the whole file relative path e.g. 'data/*.npy'.
+               '*' matches path separators too.
+            #. regex (None, string): Regular expression searched in file
+               relative path.
+            #. updated_after (None, number): Minimum file last update utc
+               time since epoch as returned by time.time().
+            #. updated_before (None, number): File last update utc time must
+               be strictly lower.
+            #. klass (None, string, type): File dumped value class as a
+               'module.qualname' string or a class.
+            #. codec (None, string): File codec name e.g. 'pickle' or 'numpy'.
+            #. description_contains (None, string): Sub-string of file
+               description.
+            #. withInfo (boolean): Whether to return file information.
+
+        :Returns:
+            #. result (list): List of found files relative paths or, if
+               withInfo is True, list of (relativePath, info) tuples.
+               Files are ordered by path.
+        """
+        assert pattern is None or isinstance(pattern, basestring), "pattern must be None or a string"
+        assert regex is None or isinstance(regex, basestring), "regex must be None or a string"
+        assert updated_after is None or isinstance(updated_after, (int, float)), "updated_after must be None or a number"
+        assert updated_before is None or isinstance(updated_before, (int, float)), "updated_before must be None or a number"
+        if klass is not None and not isinstance(klass, basestring):
+            assert isinstance(klass, type), "klass must be None, a string or a class"
+            klass = get_class_name(klass)
+        assert codec is None or isinstance(codec, basestring), "codec must be None or a string"
+        assert description_contains is None or isinstance(description_contains, basestring), "description_contains must be None or a string"
+        assert isinstance(withInfo, bool), "withInfo must be boolean"
+        kwargs = {'pattern':pattern, 'regex':regex, 'updated_after':updated_after,
+                  'updated_before':updated_before, 'klass':klass, 'codec':codec,
+                  'description_contains':description_contains}
+        # reload tree changed by another process. Metadata backend can be
+        # converted too
+        if self.__metadata is None and (self.__get_repository_fingerprint() != self.__repoFingerprint or self.__repo['walk_repo'].journalLength):
+            acquired, repoLockId = self.__acquire_lock(self.__path)
+            assert acquired, "Code %s. Unable to aquire the repository lock. You may try again!"%(repoLockId,)
+            try:
+                error = self.__load_repository_walk()
+            finally:
+                self.__release_lock(repoLockId)
+            assert error is None, error
+        if self.__metadata is not None:
+            with self._tracer.phase('metadata'):
+                result = self.__metadata.find(**kwargs)
+        else:
+            result = self.__get_file_index().find(**kwargs)
+        if withInfo:
+            return result
+        return [p for p, _ in result]
+
     @path_required
     def create_package(self, path=None, name=None, mode=None):
         """
@@ -1601,6 +3178,9 @@ class Repository(object):
             #. mode (None, string): The writing mode of the tarfile.
                If None, automatically the best compression mode will be chose.
                Available modes are ('w', 'w:', 'w:gz', 'w:bz2')
+
+        With 'sqlite' metadata, files and directories information is
+        exported to the package as pickle metadata files.
         """
         # check mode
         assert mode in (None, 'w', 'w:', 'w:gz', 'w:bz2'), 'unkown archive mode %s'%str(mode)
@@ -1632,20 +3212,39 @@ class Repository(object):
             tarHandler = tarfile.TarFile.open(tarfilePath, mode=mode)
         except Exception as e:
             raise Exception("Unable to create package (%s)"%e)
+        def _add_pickle(value, arcname):
+            data   = pickle.dumps(value, protocol=self._DEFAULT_PICKLE_PROTOCOL)
+            t      = tarfile.TarInfo( arcname )
+            t.size = len(data)
+            t.mtime = time.time()
+            tarHandler.addfile(t, BytesIO(data))
         # walk directory and create empty directories
         for dpath in sorted(list(self.walk_directories_path(recursive=True))):
             t = tarfile.TarInfo( dpath )
             t.type = tarfile.DIRTYPE
             tarHandler.addfile(t)
-            tarHandler.add(os.path.join(self.__path,dpath,self.__dirInfo), arcname=self.__dirInfo)
+            if self.__metadata is not None:
+                _add_pickle(self.__read_dirinfo(dpath), arcname=self.__dirInfo)
+            else:
+                tarHandler.add(os.path.join(self.__path,dpath,self.__dirInfo), arcname=self.__dirInfo)
         # walk files and add to tar
         for fpath in self.walk_files_path(recursive=True):
             relaPath, fname = os.path.split(fpath)
             tarHandler.add(os.path.join(self.__path,fpath), arcname=fname)
-            tarHandler.add(os.path.join(self.__path,relaPath,self.__fileInfo%fname), arcname=self.__fileInfo%fname)
-            tarHandler.add(os.path.join(self.__path,relaPath,self.__fileClass%fname), arcname=self.__fileClass%fname)
+            if self.__metadata is not None:
+                _add_pickle(self.__read_file_info(fpath), arcname=self.__fileInfo%fname)
+            else:
+                tarHandler.add(os.path.join(self.__path,relaPath,self.__fileInfo%fname), arcname=self.__fileInfo%fname)
         # save repository .pyrepinfo
-        tarHandler.add(os.path.join(self.__path,self.__repoFile), arcname=".pyrepinfo")
+        if self.__metadata is not None:
+            repo, _ = self.__load_repository_pickle_file(os.path.join(self.__path, self.__repoFile))
+            repo['walk_repo'] = repo['walk_repo'].to_list()
+            repo['metadata']  = 'pickle'
+            _add_pickle(repo, arcname=".pyrepinfo")
+        else:
+            tarHandler.add(os.path.join(self.__path,self.__repoFile), arcname=".pyrepinfo")
+            if os.path.isfile(os.path.join(self.__path,self.__repoJournal)):
+                tarHandler.add(os.path.join(self.__path,self.__repoJournal), arcname=self.__repoJournal)
         # close tar file
         tarHandler.close()
 
@@ -1747,6 +3346,7 @@ class Repository(object):
 
 
     @path_required
+    @observed
     def add_directory(self, relativePath, description=None, clean=False,
                             raiseError=True, ntrials=3):
         """
@@ -1795,93 +3395,29 @@ class Repository(object):
                 raise Exception(reason)
             return False, reason
         # lock repository
-        acquired, repoLockId = self.__locker.acquire_lock(path=self.__path, timeout=self.timeout)
+        acquired, repoLockId = self.__acquire_lock(self.__path)
         if not acquired:
             m = "code %s. Unable to aquire the lock to add directory. You may try again!"%(repoLockId,)
             if raiseError:
                 raise Exception(m)
             return False,m
         # load repository info
-        for _trial in range(ntrials):
-            try:
-                repo = self.__load_repository_pickle_file(os.path.join(self.__path, self.__repoFile))
-                self.__repo['walk_repo'] = repo['walk_repo']
-            except Exception as err:
-                error = str(err)
-                if self.DEBUG_PRINT_FAILED_TRIALS: print("Trial %i failed in Repository.%s (%s). Set Repository.DEBUG_PRINT_FAILED_TRIALS to False to mute"%(_trial, inspect.stack()[1][3], str(error)))
-            else:
-                error = None
-                break
+        error = self.__load_repository_walk(ntrials=ntrials)
         if error is not None:
-            self.__locker.release_lock(repoLockId)
+            self.__release_lock(repoLockId)
             assert not raiseError, Exception(error)
             return False, error
         # create directories
-        error     = None
-        posList   = self.__repo['walk_repo']
-        dirPath   = self.__path
-        spath     = path.split(os.sep)
-        for idx, name in enumerate(spath):
-            dirLockId = None
-            # create and acquire directory lock
-            if dirPath != self.__path:
-                acquired, dirLockId = self.__locker.acquire_lock(path=dirPath, timeout=self.timeout)
-                if not acquired:
-                    error = "Code %s. Unable to aquire the lock when adding '%s'. All prior relative directories were added. You may try again, to finish adding directory"%(dirLockId,dirPath)
-                    break
-            # add to directory
-            for _trial in range(ntrials):
-                try:
-                    dirPath = os.path.join(dirPath, name)
-                    riPath  = os.path.join(dirPath, self.__dirInfo)
-                    dList   = [d for d in posList if isinstance(d, dict)]
-                    dList   = [d for d in dList if name in d]
-                    # clean directory
-                    if not len(dList) and clean and os.path.exists(dirPath):
-                        try:
-                            shutil.rmtree( dirPath, ignore_errors=True )
-                        except Exception as err:
-                            error = "Unable to clean directory '%s' (%s)"%(dirPath, err)
-                            break
-                    # create directory
-                    if not os.path.exists(dirPath):
-                        try:
-                            os.mkdir(dirPath)
-                        except Exception as err:
-                            error = "Unable to create directory '%s' (%s)"%(dirPath, err)
-                            break
-                    # create and dump dirinfo
-                    self.__save_dirinfo(description=[None, description][idx==len(spath)-1],
-                                        dirInfoPath=riPath, create=True)
-                    # update directory list
-                    if not len(dList):
-                        rsd = {name:[]}
-                        posList.append(rsd)
-                        posList = rsd[name]
-                    else:
-                        assert len(dList) == 1, "Same directory name dict is found twice. This should'n have happened. Report issue"
-                        posList = dList[0][name]
-                except Exception as err:
-                    error = "Unable to create directory '%s' info file (%s)"%(dirPath, str(err))
-                    if self.DEBUG_PRINT_FAILED_TRIALS: print("Trial %i failed in Repository.%s (%s). Set Repository.DEBUG_PRINT_FAILED_TRIALS to False to mute"%(_trial, inspect.stack()[1][3], str(error)))
-                else:
-                    break
-            if dirLockId is not None:
-                self.__locker.release_lock(dirLockId)
-            # break from main path loop
-            if error is not None:
-                break
+        error = self.__add_directory(path=path, description=description, clean=clean, ntrials=ntrials)
         # save __repo
         if error is None:
             try:
-                _, error = self.__save_repository_pickle_file(lockFirst=False, raiseError=False)
+                _, error = self.__save_repository_journal(raiseError=False)
             except Exception as err:
                 error = str(err)
                 pass
-        # release locks
-        if dirLockId is not None:
-            self.__locker.release_lock(dirLockId)
-        self.__locker.release_lock(repoLockId)
+        # release lock
+        self.__release_lock(repoLockId)
         # check and return
         assert error is None or not raiseError, error
         return error is None, error
@@ -1898,9 +3434,13 @@ class Repository(object):
                parent directory. If directory is not tracked in repository
                None is returned
         """
-        return copy.deepcopy(self.__get_repository_parent_directory(relativePath))
+        relativePath = self.to_repo_relative_path(path=relativePath, split=False)
+        if relativePath == '':
+            return None
+        return self.__repo['walk_repo'].to_list(os.path.dirname(relativePath))
 
     @path_required
+    @observed
     def remove_directory(self, relativePath, clean=False, raiseError=True, ntrials=3):
         """
         Remove directory from repository tracking.
@@ -1945,53 +3485,63 @@ class Repository(object):
             assert not raiseError, error
             return False, error
         # get and acquire lock
-        acquired, dirLockId = self.__locker.acquire_lock(path=os.path.join(self.__path,parentPath), timeout=self.timeout)
+        acquired, dirLockId = self.__acquire_lock(os.path.join(self.__path,parentPath))
         if not acquired:
             error = "Code %s. Unable to aquire the lock when removing '%s'. All prior relative directories were added. You may try again, to finish removing directory"%(dirLockId,realPath)
             assert not raiseError, error
             return False, error
         # lock repository
-        acquired, repoLockId = self.__locker.acquire_lock(path=self.__path, timeout=self.timeout)
+        acquired, repoLockId = self.__acquire_lock(self.__path)
         if not acquired:
             m = "code %s. Unable to aquire the repository lock. You may try again!"%(repoLockId,)
             assert raiseError,  Exception(m)
             return False,m
+        # load repository info
+        error = self.__load_repository_walk(ntrials=ntrials)
+        if error is not None:
+            self.__release_lock(dirLockId)
+            self.__release_lock(repoLockId)
+            assert not raiseError, Exception(error)
+            return False, error
+        # invalidate cached objects
+        self.__uncache(relativePath, directory=True)
         # remove directory
         for _trial in range(ntrials):
             error = None
             try:
-                dirList = self.__get_repository_parent_directory(relativePath=relativePath)
-                assert dirList is not None, "Given relative path '%s' is not a repository directory"%(relativePath,)
+                assert self.is_repository_directory(relativePath), "Given relative path '%s' is not a repository directory"%(relativePath,)
                 stateBefore = self.get_repository_state(relaPath=parentPath)
-                _files = [f for f in dirList if isinstance(f, basestring)]
-                _dirs  = [d for d in dirList if isinstance(d, dict)]
-                _dirs  = [d for d in dirList if dirName not in d]
-                _ = [dirList.pop(0) for _ in range(len(dirList))]
-                dirList.extend(_files)
-                dirList.extend(_dirs)
+                self.__repo['walk_repo'].remove_directory(relativePath)
                 if clean:
                     shutil.rmtree(realPath)
                 else:
                     stateAfter = self.get_repository_state(relaPath=parentPath)
                     success, errors = self.__clean_before_after(stateBefore=stateBefore, stateAfter=stateAfter, keepNoneEmptyDirectory=True)
                     assert success, "\n".join(errors)
+                if self.__metadata is not None:
+                    with self._tracer.phase('metadata'):
+                        self.__metadata.remove_directory(relativePath, durability=self.__durability)
+                elif self.__fileIndex is not None:
+                    self.__fileIndex.remove_directory(relativePath)
             except Exception as err:
                 error = str(err)
+                self.__lockStats.failed_trial()
                 if self.DEBUG_PRINT_FAILED_TRIALS: print("Trial %i failed in Repository.%s (%s). Set Repository.DEBUG_PRINT_FAILED_TRIALS to False to mute"%(_trial, inspect.stack()[1][3], str(error)))
             else:
                 break
         # return
         if error is None:
-            _, error = self.__save_repository_pickle_file(lockFirst=False, raiseError=False)
+            _, error = self.__save_repository_journal(raiseError=False)
         # release locks
-        self.__locker.release_lock(dirLockId)
-        self.__locker.release_lock(repoLockId)
+        self.__release_lock(dirLockId)
+        self.__release_lock(repoLockId)
         # check and return
         assert error is None or not raiseError, "Unable to remove directory after %i trials '%s' (%s)"%(relativePath, ntrials, error,)
         return error is None, error
 
 
     @path_required
+    @observed
     def rename_directory(self, relativePath, newName, raiseError=True, ntrials=3):
         """
         Rename a directory in the repository. It insures renaming the directory in the system.
@@ -2032,67 +3582,61 @@ class Repository(object):
             assert not raiseError, error
             return False, error
         # get directory parent list
-        acquired, dirLockId = self.__locker.acquire_lock(os.path.join(self.__path,parentPath), timeout=self.timeout)
+        acquired, dirLockId = self.__acquire_lock(os.path.join(self.__path,parentPath))
         if not acquired:
             error = "Code %s. Unable to aquire repository lock when renaming '%s'. All prior directories were added. You may try again, to finish adding the directory"%(dirLockId,dirPath)
             assert not raiseError, error
             return False, error
         error = None
         # lock repository
-        acquired, repoLockId = self.__locker.acquire_lock(path=self.__path, timeout=self.timeout)
+        acquired, repoLockId = self.__acquire_lock(self.__path)
         if not acquired:
             m = "Code %s. Unable to aquire directory lock when renaming '%s'. All prior directories were added. You may try again, to finish adding the directory"%(repoLockId,dirPath)
             assert raiseError,  Exception(m)
             return False,m
         # load repository info
-        for _trial in range(ntrials):
-            try:
-                repo = self.__load_repository_pickle_file(os.path.join(self.__path, self.__repoFile))
-                self.__repo['walk_repo'] = repo['walk_repo']
-            except Exception as err:
-                error = str(err)
-                if self.DEBUG_PRINT_FAILED_TRIALS: print("Trial %i failed in Repository.%s (%s). Set Repository.DEBUG_PRINT_FAILED_TRIALS to False to mute"%(_trial, inspect.stack()[1][3], str(error)))
-            else:
-                error = None
-                break
+        error = self.__load_repository_walk(ntrials=ntrials)
         if error is not None:
-            self.__locker.release_lock(dirLockId)
-            self.__locker.release_lock(repoLockId)
+            self.__release_lock(dirLockId)
+            self.__release_lock(repoLockId)
             assert not raiseError, Exception(error)
             return False, error
+        # invalidate cached objects
+        self.__uncache(relativePath, directory=True)
         # rename directory
         for _trial in range(ntrials):
             error = None
             try:
-                dirList = self.__get_repository_parent_directory(relativePath=relativePath)
-                assert dirList is not None, "Given relative path '%s' is not a repository directory"%(relativePath,)
-                # change dirName in dirList
-                _dirDict = [nd for nd in dirList  if isinstance(nd,dict)]
-                _dirDict = [nd for nd in _dirDict if dirName in nd]
-                assert len(_dirDict) == 1, "This should not have happened. Directory not found in repository. Please report issue"
+                assert self.is_repository_directory(relativePath), "Given relative path '%s' is not a repository directory"%(relativePath,)
                 # rename directory
                 os.rename(realPath, newRealPath)
-                # update dirList
-                _dirDict[0][newName] = _dirDict[0][dirName]
-                _dirDict[0].pop(dirName)
+                # update directory tree
+                self.__repo['walk_repo'].rename_directory(relativePath, newName)
+                if self.__metadata is not None:
+                    with self._tracer.phase('metadata'):
+                        self.__metadata.move_directory(relativePath, os.path.join(parentPath, newName), durability=self.__durability)
+                elif self.__fileIndex is not None:
+                    self.__fileIndex.move_directory(relativePath, os.path.join(parentPath, newName))
                 # update and dump dirinfo
-                self.__save_dirinfo(description=None, dirInfoPath=parentPath, create=False)
+                self.__save_dirinfo(description=None, relativePath=parentPath, create=False)
             except Exception as err:
                 error = str(err)
+                self.__lockStats.failed_trial()
                 if self.DEBUG_PRINT_FAILED_TRIALS: print("Trial %i failed in Repository.%s (%s). Set Repository.DEBUG_PRINT_FAILED_TRIALS to False to mute"%(_trial, inspect.stack()[1][3], str(error)))
             else:
                 error = None
                 break
         if error is None:
-            _, error = self.__save_repository_pickle_file(lockFirst=False, raiseError=False)
+            _, error = self.__save_repository_journal(raiseError=False)
         # release locks
-        self.__locker.release_lock(dirLockId)
-        self.__locker.release_lock(repoLockId)
+        self.__release_lock(dirLockId)
+        self.__release_lock(repoLockId)
         # check and return
         assert error is None or not raiseError, "Unable to rename directory '%s' to '%s' after %i trials (%s)"%(relativePath, newName, ntrials, error,)
         return error is None, error
 
     @path_required
+    @observed
     def copy_directory(self, relativePath, newRelativePath,
                              overwrite=False, raiseError=True, ntrials=3):
         """
@@ -2169,34 +3713,34 @@ class Repository(object):
             assert not raiseError, reason
             return False, reason
         # lock repository
-        acquired, repoLockId = self.__locker.acquire_lock(path=self.__path, timeout=self.timeout)
+        acquired, repoLockId = self.__acquire_lock(self.__path)
         if not acquired:
             m = "code %s. Unable to aquire the repository lock. You may try again!"%(repoLockId,)
             assert raiseError,  Exception(m)
             return False,m
-        try:
-            repo = self.__load_repository_pickle_file(os.path.join(self.__path, self.__repoFile))
-            self.__repo['walk_repo'] = repo['walk_repo']
-        except Exception as err:
-            self.__locker.release_lock(repoLockId)
-            assert not raiseError, Exception(str(err))
-            return False,m
+        error = self.__load_repository_walk(ntrials=ntrials)
+        if error is not None:
+            self.__release_lock(repoLockId)
+            assert not raiseError, Exception(error)
+            return False,error
         # create locks
-        acquired, dirLockId = self.__locker.acquire_lock(path=parentRealPath, timeout=self.timeout)
+        acquired, dirLockId = self.__acquire_lock(parentRealPath)
         if not acquired:
-            self.__locker.release_lock(repoLockId)
+            self.__release_lock(repoLockId)
             error = "Code %s. Unable to aquire the lock when adding '%s'. All prior directories were added. You may try again, to finish adding directory"%(dirLockId,dirPath)
             assert not raiseError, error
             return False, error
         newDirLockId = None
         if parentRealPath != newParentRealPath:
-            acquired, newDirLockId = self.__locker.acquire_lock(path=newParentRealPath, timeout=self.timeout)
+            acquired, newDirLockId = self.__acquire_lock(newParentRealPath)
             if not acquired:
-                self.__locker.release_lock(dirLockId)
-                self.__locker.release_lock(repoLockId)
+                self.__release_lock(dirLockId)
+                self.__release_lock(repoLockId)
                 error = "Code %s. Unable to aquire the lock when adding '%s'. All prior directories were added. You may try again, to finish adding directory"%(newDirLockId,dirPath)
                 assert not raiseError, error
                 return False, error
+        # invalidate cached objects
+        self.__uncache(newRelativePath, directory=True)
         # get directory parent list
         error = None
         for _trial in range(ntrials):
@@ -2204,52 +3748,46 @@ class Repository(object):
                 # make sure again because sometimes, when multiple processes are working on the same repo things can happen in between
                 assert self.is_repository_directory(relativePath), "Directory '%s' is not anymore a tracked repository directory"%(relativePath)
                 assert not self.is_repository_directory(newRelativePath), "Directory '%s' has become a tracked repository directory"%(relativePath)
-                dirList = self.__get_repository_parent_directory(relativePath=relativePath)
-                assert dirList is not None, "Given relative path '%s' is not a repository directory"%(relativePath,)
-                newDirList = self.__get_repository_parent_directory(relativePath=newRelativePath)
-                assert newDirList is not None, "Given new relative path '%s' parent directory is not a repository directory"%(newRelativePath,)
-                # change dirName in dirList
-                _dirDict = [nd for nd in dirList  if isinstance(nd,dict)]
-                _dirDict = [nd for nd in _dirDict if dirName in nd]
-                assert len(_dirDict) == 1, "This should not have happened. Directory not found in repository. Please report issue"
-                _dirDict = _dirDict[0]
-                _newDirDict = [nd for nd in newDirList  if isinstance(nd,dict)]
-                _newDirDict = [nd for nd in _newDirDict if newDirName in nd]
-                assert len(_newDirDict) == 0, "This should not have happened. New directory is found in repository. Please report issue"
+                assert self.is_repository_directory(newParentRelativePath), "Given new relative path '%s' parent directory is not a repository directory"%(newRelativePath,)
                 # try to copy directory
-                _newDirDict = copy.deepcopy(_dirDict)
-                if dirName != newDirName:
-                    _newDirDict[newDirName] = _newDirDict.pop(dirName)
+                _dirDict = {dirName:self.__repo['walk_repo'].to_list(relativePath)}
                 _ = copy_tree(src=realPath, dst=newRealPath, srcDirDict=_dirDict,
-                              filAttr = [self.__fileInfo,self.__fileClass],
+                              filAttr = [self.__fileInfo],
                               dirAttr = [self.__dirInfo,self.__repoFile])
                 #_ = copy_tree(realPath, newRealPath)
-                # update newDirList
-                newDirList.append(_newDirDict)
+                # update directory tree
+                self.__repo['walk_repo'].copy_directory(relativePath, newRelativePath)
+                if self.__metadata is not None:
+                    with self._tracer.phase('metadata'):
+                        self.__metadata.copy_directory(relativePath, newRelativePath, durability=self.__durability)
+                elif self.__fileIndex is not None:
+                    self.__fileIndex.copy_directory(relativePath, newRelativePath)
                 # update and dump dirinfo
-                self.__save_dirinfo(description=None, dirInfoPath=newParentRelativePath, create=False)
+                self.__save_dirinfo(description=None, relativePath=newParentRelativePath, create=False)
             except Exception as err:
                 error = str(err)
+                self.__lockStats.failed_trial()
                 if self.DEBUG_PRINT_FAILED_TRIALS: print("Trial %i failed in Repository.%s (%s). Set Repository.DEBUG_PRINT_FAILED_TRIALS to False to mute"%(_trial, inspect.stack()[1][3], str(error)))
             else:
                 error = None
                 break
         if error is None:
-            _, error = self.__save_repository_pickle_file(lockFirst=False, raiseError=False)
-        self.__locker.release_lock(dirLockId)
-        self.__locker.release_lock(repoLockId)
+            _, error = self.__save_repository_journal(raiseError=False)
+        self.__release_lock(dirLockId)
+        self.__release_lock(repoLockId)
         if newDirLockId is not None:
-            self.__locker.release_lock(newDirLockId)
+            self.__release_lock(newDirLockId)
         # check and return
         assert error is None or not raiseError, "Unable to copy directory '%s' to '%s' after %i trials (%s)"%(relativePath, newRelativePath, ntrials, error,)
         return error is None, error
 
 
     @path_required
+    @observed
     def dump_file(self, value, relativePath,
                         description=None,
                         dump=None, pull=None,
-                        replace=False, raiseError=True, ntrials=3):
+                        replace=False, raiseError=True, ntrials=3, durability=None):
         """
         Dump a file using its value to the system and creates its
         attribute in the Repository with utc timestamp.
@@ -2263,19 +3801,28 @@ class Repository(object):
             #. dump (None, string): The dumping method.
                If None it will be set automatically to pickle and therefore the
                object must be pickleable. If a string is given, it can be a
-               keyword ('json','pickle','dill') or a string compileable code to
+               registered codec name ('json','pickle','dill','numpy','numpy_mmap',
+               'numpy_text' or any codec registered with
+               pyrep.Codec.register_codec) or a string compileable code to
                dump the data. The string code must include all the necessary
-               imports and a '$FILE_PATH' that replaces the absolute file path
-               when the dumping will be performed.\n
-               e.g. "import numpy as np; np.savetxt(fname='$FILE_PATH', X=value, fmt='%.6e')"
+               imports and define a dump(path, value) function.\n
+               e.g. "import numpy as np; dump=lambda path,value:np.savetxt(fname=path, X=value, fmt='%.6e')"
+               When a codec is used, file info only stores the codec name
+               and version.\n
+               'auto' selects the codec given value type. bytes, bytearray
+               and memoryview are dumped as is with 'bytes' codec and pulled
+               as bytes, strings are dumped utf-8 encoded with 'text', numpy
+               arrays with 'numpy', lists and dictionaries of json types
+               only and of at most AUTO_JSON_MAX_ITEMS items with 'json' and
+               any other value with 'pickle' highest protocol. Selected codec
+               is recorded in file info and 'auto' is selecting again upon
+               updating.
             #. pull (None, string): The pulling method. If None it will be set
-               automatically to pickle and therefore the object must be
-               pickleable. If a string is given, it can be a keyword
-               ('json','pickle','dill') or a string compileable code to pull
-               the data. The string code must include all the necessary imports,
-               a '$FILE_PATH' that replaces the absolute file path when the
-               dumping will be performed and finally a PULLED_DATA variable.\n
-               e.g "import numpy as np; PULLED_DATA=np.loadtxt(fname='$FILE_PATH')"
+               automatically to the same codec as dump or to pickle. If a string
+               is given, it can be a registered codec name or a string
+               compileable code to pull the data. The string code must include
+               all the necessary imports and define a pull(path) function.\n
+               e.g "import numpy as np; pull=lambda path:np.loadtxt(fname=path)"
             #. replace (boolean): Whether to replace any existing file.
             #. raiseError (boolean): Whether to raise encountered error instead
                of returning failure.
@@ -2288,6 +3835,9 @@ class Repository(object):
                likelyhood of failure due to multiple processes same time
                alteration.
 
+            #. durability (None, string): The durability level of this call
+               written files. If None, repository durability is used.
+               See Repository durability.
         :Returns:
             #. success (boolean): Whether renaming the directory was successful.
             #. message (None, string): Some explanatory message or error reason
@@ -2301,131 +3851,164 @@ class Repository(object):
         if description is None:
             description = ''
         assert isinstance(description, basestring), "description must be None or a string"
-        # convert dump and pull methods to strings
-        if pull is None and dump is not None:
-            if dump.startswith('pickle') or dump.startswith('dill') or dump.startswith('numpy') or dump =='json':
-                pull = dump
-        dump = get_dump_method(dump, protocol=self._DEFAULT_PICKLE_PROTOCOL)
-        pull = get_pull_method(pull)
+        durability = self.__get_durability(durability)
+        # get codec or convert dump and pull methods to strings
+        codec, options, dump, pull = self.__get_dump_pull(dump, pull)
         # check name and path
         relativePath = self.to_repo_relative_path(path=relativePath, split=False)
         savePath     = os.path.join(self.__path,relativePath)
-        fPath, fName = os.path.split(savePath)
         # check if name is allowed
         success, reason = self.is_name_allowed(savePath)
-        if not success:
-            assert not raiseError, reason
-            return False, reason
-        # ensure directory added
-        try:
-            success, reason = self.add_directory(fPath, raiseError=False, ntrials=ntrials)
-        except Exception as err:
-            reason  = "Unable to add directory (%s)"%(str(err))
-            success = False
         if not success:
             assert not raiseError, reason
             return False, reason
         # lock repository
-        acquired, repoLockId = self.__locker.acquire_lock(path=self.__path, timeout=self.timeout)
-        if not acquired:
-            m = "code %s. Unable to aquire the repository lock. You may try again!"%(repoLockId,)
-            assert raiseError, Exception(m)
-            return False,m
-        # lock file
-        acquired, fileLockId = self.__locker.acquire_lock(path=savePath, timeout=self.timeout)
+        acquired, repoLockId = self.__acquire_lock(self.__path)
         if not acquired:
-            self.__locker.release_lock(repoLockId)
-            error = "Code %s. Unable to aquire the lock when dumping '%s'"%(fileLockId,relativePath)
+            error = "code %s. Unable to aquire the repository lock. You may try again!"%(repoLockId,)
             assert not raiseError, error
             return False, error
         # load repository info
-        for _trial in range(ntrials):
-            try:
-                repo = self.__load_repository_pickle_file(os.path.join(self.__path, self.__repoFile))
-                self.__repo['walk_repo'] = repo['walk_repo']
-            except Exception as err:
-                error = str(err)
-                if self.DEBUG_PRINT_FAILED_TRIALS: print("Trial %i failed in Repository.%s (%s). Set Repository.DEBUG_PRINT_FAILED_TRIALS to False to mute"%(_trial, inspect.stack()[1][3], str(error)))
-            else:
-                error = None
-                break
-        if error is not None:
-            self.__locker.release_lock(dirLockId)
-            self.__locker.release_lock(fileLockId)
-            assert not raiseError, Exception(error)
-            return False, error
+        error = self.__load_repository_walk(ntrials=ntrials)
+        # ensure directory added
+        dirPath = os.path.dirname(relativePath)
+        if error is None and len(dirPath) and not self.__repo['walk_repo'].is_directory(dirPath):
+            error = self.__add_directory(path=dirPath, ntrials=ntrials, durability=durability)
+            if error is not None:
+                error = "Unable to add directory (%s)"%(error,)
         # dump file
-        for _trial in range(ntrials):
-            error = None
-            try:
-                isRepoFile, fileOnDisk, infoOnDisk, classOnDisk = self.is_repository_file(relativePath)
-                if isRepoFile:
-                    assert replace, "file is a registered repository file. set replace to True to replace"
-                fileInfoPath = os.path.join(self.__path,os.path.dirname(relativePath),self.__fileInfo%fName)
-                if isRepoFile and fileOnDisk:
-                    with open(fileInfoPath, 'rb') as fd:
-                        info = pickle.load(fd)
-                    assert info['repository_unique_name'] == self.__repo['repository_unique_name'], "it seems that file was created by another repository"
-                    info['last_update_utctime'] = time.time()
-                else:
-                    info = {'repository_unique_name':self.__repo['repository_unique_name']}
-                    info['create_utctime'] = info['last_update_utctime'] = time.time()
-                info['dump'] = dump
-                info['pull'] = pull
-                info['description'] = description
-                # get parent directory list if file is new and not being replaced
-                if not isRepoFile:
-                    dirList = self.__get_repository_directory(fPath)
-                # dump file
-                dumpFunc = my_exec( dump, name='dump', description='dump')
-                dumpFunc(path=str(savePath), value=value)
-                # update info
-                with open(fileInfoPath, 'wb') as fd:
-                    pickle.dump( info,fd, protocol=self._DEFAULT_PICKLE_PROTOCOL)
-                    fd.flush()
-                    os.fsync(fd.fileno())
-                # update class file
-                fileClassPath = os.path.join(self.__path,os.path.dirname(relativePath),self.__fileClass%fName)
-                with open(fileClassPath, 'wb') as fd:
-                    if value is None:
-                        klass = None
-                    else:
-                        klass = value.__class__
-                    pickle.dump(klass , fd, protocol=self._DEFAULT_PICKLE_PROTOCOL )
-                    fd.flush()
-                    os.fsync(fd.fileno())
-                # add to repo if file is new and not being replaced
-                if not isRepoFile:
-                    dirList.append(fName)
-            except Exception as err:
-                error = "unable to dump the file (%s)"%(str(err),)
-                try:
-                    if 'pickle.dump(' in dump:
-                        mi = get_pickling_errors(value)
-                        if mi is not None:
-                            error += '\nmore info: %s'%str(mi)
-                except:
-                    pass
-                if self.DEBUG_PRINT_FAILED_TRIALS: print("Trial %i failed in Repository.%s (%s). Set Repository.DEBUG_PRINT_FAILED_TRIALS to False to mute"%(_trial, inspect.stack()[1][3], str(error)))
-            else:
-                error = None
-                break
+        if error is None:
+            error = self.__dump_file(value=value, relativePath=relativePath,
+                                     description=description, codec=codec,
+                                     options=options, dump=dump, pull=pull,
+                                     replace=replace, ntrials=ntrials,
+                                     durability=durability)
         # save repository
         if error is None:
-            _, error = self.__save_repository_pickle_file(lockFirst=False, raiseError=False)
-        # release locks
-        self.__locker.release_lock(fileLockId)
-        self.__locker.release_lock(repoLockId)
+            _, error = self.__save_repository_journal(raiseError=False, durability=durability)
+        # release lock
+        self.__release_lock(repoLockId)
         # check and return
         assert not raiseError or error is None, "unable to dump file '%s' after %i trials (%s)"%(relativePath, ntrials, error,)
-        return success, error
+        return error is None, error
 
     def dump(self, *args, **kwargs):
         """Alias to dump_file"""
         return self.dump_file(*args, **kwargs)
 
+    @path_required
+    @observed
+    def dump_files(self, items, raiseError=True, ntrials=3, durability=None):
+        """
+        Dump many files at once. Unlike calling dump_file in a loop, the
+        repository is locked once, all missing directories are created in a
+        single pass and the repository is saved once after all files are dumped.
+
+        :Parameters:
+            #. items (list): List of (value, relativePath, options) items.
+               options is None or a dictionary of dump_file 'description',
+               'dump', 'pull' and 'replace' keyword arguments.
+            #. raiseError (boolean): Whether to raise an error after all items
+               are processed if any of them failed instead of returning
+               failures.
+            #. ntrials (int): After aquiring all locks, ntrials is the maximum
+               number of trials allowed before failing.
+               In rare cases, when multiple processes
+               are accessing the same repository components, different processes
+               can alter repository components between successive lock releases
+               of some other process. Bigger number of trials lowers the
+               likelyhood of failure due to multiple processes same time
+               alteration.
+
+            #. durability (None, string): The durability level of this call
+               written files. If None, repository durability is used.
+               See Repository durability.
+        :Returns:
+            #. results (list): List of (success, message) tuples in items order.
+        """
+        assert isinstance(raiseError, bool), "raiseError must be boolean"
+        assert isinstance(ntrials, int), "ntrials must be integer"
+        assert ntrials>0, "ntrials must be >0"
+        durability = self.__get_durability(durability)
+        items   = list(items)
+        results = [None]*len(items)
+        # check items
+        todo = []
+        for idx, item in enumerate(items):
+            try:
+                assert isinstance(item, (list,tuple)) and len(item) in (2,3), "item must be a (value, relativePath, options) tuple"
+                value, relativePath = item[0], item[1]
+                options = item[2] if len(item) == 3 else None
+                if options is None:
+                    options = {}
+                assert isinstance(options, dict), "options must be None or a dictionary"
+                unknown = [k for k in options if k not in ('description','dump','pull','replace')]
+                assert not len(unknown), "unknown options %s"%(str(unknown),)
+                description = options.get('description', None)
+                if description is None:
+                    description = ''
+                assert isinstance(description, basestring), "description must be None or a string"
+                replace = options.get('replace', False)
+                assert isinstance(replace, bool), "replace must be boolean"
+                codec, opts, dump, pull = self.__get_dump_pull(options.get('dump', None), options.get('pull', None))
+                relativePath = self.to_repo_relative_path(path=relativePath, split=False)
+                allowed, reason = self.is_name_allowed(relativePath)
+                assert allowed, reason
+            except Exception as err:
+                results[idx] = (False, str(err))
+            else:
+                todo.append( (idx, value, relativePath, description, codec, opts, dump, pull, replace) )
+        # lock repository
+        if len(todo):
+            acquired, repoLockId = self.__acquire_lock(self.__path)
+            if not acquired:
+                error = "code %s. Unable to aquire the repository lock. You may try again!"%(repoLockId,)
+                for t in todo:
+                    results[t[0]] = (False, error)
+                todo = []
+        if len(todo):
+            # load repository info
+            error = self.__load_repository_walk(ntrials=ntrials)
+            if error is not None:
+                for t in todo:
+                    results[t[0]] = (False, error)
+            else:
+                # create all missing directories
+                tree      = self.__repo['walk_repo']
+                dirErrors = {}
+                for t in todo:
+                    dirPath = os.path.dirname(t[2])
+                    if not len(dirPath) or dirPath in dirErrors or tree.is_directory(dirPath):
+                        continue
+                    dirErrors[dirPath] = self.__add_directory(path=dirPath, ntrials=ntrials, durability=durability)
+                # dump files
+                for idx, value, relativePath, description, codec, opts, dump, pull, replace in todo:
+                    error = dirErrors.get(os.path.dirname(relativePath), None)
+                    if error is not None:
+                        error = "Unable to add directory (%s)"%(error,)
+                    else:
+                        error = self.__dump_file(value=value, relativePath=relativePath,
+                                                 description=description, codec=codec,
+                                                 options=opts, dump=dump, pull=pull,
+                                                 replace=replace, ntrials=ntrials,
+                                                 durability=durability)
+                    results[idx] = (error is None, error)
+                # save repository once
+                _, error = self.__save_repository_journal(raiseError=False, durability=durability)
+                if error is not None:
+                    for t in todo:
+                        if results[t[0]][0]:
+                            results[t[0]] = (False, "unable to save repository (%s)"%(error,))
+            # release lock
+            self.__release_lock(repoLockId)
+        # check and return
+        failed = [items[i][1] if isinstance(items[i], (list,tuple)) and len(items[i])>1 else i for i, r in enumerate(results) if not r[0]]
+        assert not raiseError or not len(failed), "unable to dump %i files out of %i (%s)"%(len(failed), len(items), ', '.join([str(f) for f in failed]),)
+        return results
+
 
     @path_required
+    @observed
     def copy_file(self, relativePath, newRelativePath,
                         force=False, raiseError=True, ntrials=3):
         """
@@ -2467,12 +4050,6 @@ class Repository(object):
         newRelativePath = self.to_repo_relative_path(path=newRelativePath, split=False)
         newRealPath     = os.path.join(self.__path,newRelativePath)
         nfPath, nfName  = os.path.split(newRealPath)
-        # lock old file
-        acquired, fileLockId = self.__locker.acquire_lock(path=realPath, timeout=self.timeout)
-        if not acquired:
-            error = "Code %s. Unable to aquire the lock for old file '%s'"%(fileLockId,relativePath)
-            assert not raiseError, error
-            return False, error
         # add new file diretory
         try:
             success, reason = self.add_directory(nfPath, raiseError=False, ntrials=ntrials)
@@ -2480,65 +4057,83 @@ class Repository(object):
             reason  = "Unable to add directory (%s)"%(str(err))
             success = False
         if not success:
-            self.__locker.release_lock(fileLockId)
             assert not raiseError, reason
             return False, reason
+        # lock repository
+        acquired, repoLockId = self.__acquire_lock(self.__path)
+        if not acquired:
+            error = "Code %s. Unable to aquire the repository lock. You may try again!"%(repoLockId,)
+            assert not raiseError, error
+            return False, error
+        # lock old file
+        acquired, fileLockId = self.__acquire_file_lock(realPath, shared=True)
+        if not acquired:
+            self.__release_lock(repoLockId)
+            error = "Code %s. Unable to aquire the lock for old file '%s'"%(fileLockId,relativePath)
+            assert not raiseError, error
+            return False, error
         # create new file lock
-        acquired, newFileLockId = self.__locker.acquire_lock(path=newRealPath, timeout=self.timeout)
+        acquired, newFileLockId = self.__acquire_file_lock(newRealPath)
         if not acquired:
-            self.__locker.release_lock(fileLlockId)
+            self.__release_file_lock(fileLockId)
+            self.__release_lock(repoLockId)
             error = "Code %s. Unable to aquire the lock for new file path '%s'"%(newFileLockId,newRelativePath)
             assert not raiseError, error
             return False, error
+        # load repository info
+        error = self.__load_repository_walk(ntrials=ntrials)
+        if error is not None:
+            self.__release_file_lock(fileLockId)
+            self.__release_file_lock(newFileLockId)
+            self.__release_lock(repoLockId)
+            assert not raiseError, error
+            return False, error
+        # invalidate cached objects
+        self.__uncache(newRelativePath)
         # copy file
         for _trial in range(ntrials):
             copied = False
             error  = None
             try:
                 # check whether it's a repository file
-                isRepoFile,fileOnDisk, infoOnDisk, classOnDisk = self.is_repository_file(relativePath)
+                isRepoFile,fileOnDisk, infoOnDisk, _ = self.is_repository_file(relativePath)
                 assert isRepoFile,  "file '%s' is not a repository file"%(relativePath,)
                 assert fileOnDisk,  "file '%s' is found on disk"%(relativePath,)
                 assert infoOnDisk,  "%s is found on disk"%self.__fileInfo%fName
-                assert classOnDisk, "%s is found on disk"%self.__fileClass%fName
                 # get new file path
-                nisRepoFile,nfileOnDisk,ninfoOnDisk,nclassOnDisk = self.is_repository_file(newRelativePath)
+                nisRepoFile = self.__repo['walk_repo'].is_file(newRelativePath)
                 assert not nisRepoFile or force, "New file path is a registered repository file, set force to True to proceed regardless"
-                # get parent directories list
-                nDirList = self.__get_repository_directory(nfPath)
-                # remove new file and all repository files from disk
-                if os.path.isfile(newRealPath):
-                    os.remove(newRealPath)
-                if os.path.isfile(os.path.join(nfPath,self.__fileInfo%nfName)):
-                    os.remove(os.path.join(nfPath,self.__fileInfo%nfName))
-                if os.path.isfile(os.path.join(nfPath,self.__fileClass%nfName)):
-                    os.remove(os.path.join(nfPath,self.__fileClass%nfName))
-                # move old file to new path
-                shutil.copy(realPath, newRealPath)
-                shutil.copy(os.path.join(fPath,self.__fileInfo%fName),  os.path.join(nfPath,self.__fileInfo%nfName))
-                shutil.copy(os.path.join(fPath,self.__fileClass%fName), os.path.join(nfPath,self.__fileClass%nfName))
-                # update new list
-                if nfName not in nDirList:
-                    nDirList.append(nfName)
+                # copy old file to new path, existing new path files are replaced
+                self.__write_atomic(newRealPath, lambda path:shutil.copy(realPath, path), openFile=False)
+                self.__copy_file_info(relativePath, newRelativePath)
+                # update directory tree
+                self.__repo['walk_repo'].add_file(newRelativePath)
             except Exception as err:
                 copied = False
                 error = str(err)
+                self.__lockStats.failed_trial()
                 if self.DEBUG_PRINT_FAILED_TRIALS: print("Trial %i failed in Repository.%s (%s). Set Repository.DEBUG_PRINT_FAILED_TRIALS to False to mute"%(_trial, inspect.stack()[1][3], str(error)))
             else:
                 error = None
                 copied = True
                 break
+        # save repository
+        if copied:
+            copied, error = self.__save_repository_journal(raiseError=False)
         # release locks
-        self.__locker.release_lock(fileLockId)
-        self.__locker.release_lock(newFileLockId)
+        self.__release_file_lock(fileLockId)
+        self.__release_file_lock(newFileLockId)
+        self.__release_lock(repoLockId)
         # check and return
         assert copied or not raiseError, "Unable to copy file '%s' to '%s' after %i trials (%s)"%(relativePath, newRelativePath, ntrials, error,)
-        return copied, '\n'.join(message)
+        return copied, error
 
 
     @path_required
+    @observed
     def update_file(self, value, relativePath, description=False,
-                          dump=False, pull=False, raiseError=True, ntrials=3):
+                          dump=False, pull=False, raiseError=True, ntrials=3,
+                          durability=None):
         """
         Update the value of a file that is already in the Repository.\n
         If file is not registered in repository, and error will be thrown.\n
@@ -2554,10 +4149,11 @@ class Repository(object):
             #. description (False, string): Any random description about the file.
                If False is given, the description info won't be updated,
                otherwise it will be update to what description argument value is.
-            #. dump (False, string): The new dump method. If False is given,
-               the old one will be used.
-            #. pull (False, string): The new pull method. If False is given,
-               the old one will be used.
+            #. dump (False, None, string): The new dump method or codec name.
+               If False is given, the old one will be used. Codec of files
+               dumped with 'auto' is selected again given the new value.
+            #. pull (False, None, string): The new pull method or codec name.
+               If False is given, the old one will be used.
             #. raiseError (boolean): Whether to raise encountered error instead
                of returning failure.
             #. ntrials (int): After aquiring all locks, ntrials is the maximum
@@ -2569,6 +4165,9 @@ class Repository(object):
                likelyhood of failure due to multiple processes same time
                alteration.
 
+            #. durability (None, string): The durability level of this call
+               written files. If None, repository durability is used.
+               See Repository durability.
        :Returns:
            #. success (boolean): Whether renaming the directory was successful.
            #. message (None, string): Some explanatory message or error reason
@@ -2581,23 +4180,26 @@ class Repository(object):
         assert pull is False or pull is None or isinstance(pull, basestring), "pull must be False, None or a string"
         assert isinstance(ntrials, int), "ntrials must be integer"
         assert ntrials>0, "ntrials must be >0"
+        durability = self.__get_durability(durability)
         # get name and path
         relativePath = self.to_repo_relative_path(path=relativePath, split=False)
         savePath     = os.path.join(self.__path,relativePath)
         fPath, fName = os.path.split(savePath)
         # get locker
-        acquired, fileLockId = self.__locker.acquire_lock(path=savePath, timeout=self.timeout)
+        acquired, fileLockId = self.__acquire_file_lock(savePath)
         if not acquired:
             error = "Code %s. Unable to aquire the lock to update '%s'"%(fileLockId,relativePath)
             assert not raiseError, error
             return False, error
+        # invalidate cached objects
+        self.__uncache(relativePath)
         # update file
         for _trial in range(ntrials):
             message = []
             updated = False
             try:
                 # check file in repository
-                isRepoFile, fileOnDisk, infoOnDisk, classOnDisk = self.is_repository_file(relativePath)
+                isRepoFile, fileOnDisk, infoOnDisk, _ = self.is_repository_file(relativePath)
                 assert isRepoFile, "file '%s' is not registered in repository, no update can be performed."%(relativePath,)
                 # get file info
                 if not fileOnDisk:
@@ -2608,69 +4210,47 @@ class Repository(object):
                     info['repository_unique_name'] = self.__repo['repository_unique_name']
                     info['create_utctime'] = info['last_update_utctime'] = time.time()
                 else:
-                    with open(os.path.join(fPath,self.__fileInfo%fName), 'rb') as fd:
-                        info = pickle.load(fd)
-                        info['last_update_utctime'] = time.time()
+                    info = self.__read_file_info(relativePath)
+                    info['last_update_utctime'] = time.time()
                 if not fileOnDisk:
                     message.append("file %s is registered in repository but it was found on disk prior to updating"%relativePath)
                 if not infoOnDisk:
                     message.append("%s is not found on disk prior to updating"%self.__fileInfo%fName)
-                if not classOnDisk:
-                    message.append("%s is not found on disk prior to updating"%self.__fileClass%fName)
-                # get dump and pull
-                if (description is False) or (dump is False) or (pull is False):
-                    if description is False:
-                        description = info['description']
-                    elif description is None:
-                        description = ''
-                    if dump is False:
-                        dump = info['dump']
-                    elif dump is None:
-                        dump = get_dump_method(dump, protocol=self._DEFAULT_PICKLE_PROTOCOL)
-                    if pull is False:
-                        pull = info['pull']
-                    elif pull is None:
-                        pull = get_pull_method(pull)
-                # update dump, pull and description
-                info['dump'] = dump
-                info['pull'] = pull
+                # get description, dump and pull
+                if description is False:
+                    description = info['description']
+                elif description is None:
+                    description = ''
+                _dump, _pull = dump, pull
+                if _dump is False and info.get('auto', False):
+                    _dump = 'auto'
+                elif _dump is False:
+                    _dump = info['codec'] if 'codec' in info else info['dump']
+                if _pull is False:
+                    _pull = None if 'codec' in info else info['pull']
+                codec, options, _dump, _pull = self.__get_dump_pull(_dump, _pull)
+                # update description and dump file
                 info['description'] = description
-                # dump file
-                dumpFunc = my_exec( dump, name='dump', description='update')
-                dumpFunc(path=str(savePath), value=value)
-                # remove file if exists
-                _path = os.path.join(fPath,self.__fileInfo%fName)
+                self.__dump_value(info=info, savePath=savePath, value=value, codec=codec, options=options, dump=_dump, pull=_pull, durability=durability)
                 # update info
-                with open(_path, 'wb') as fd:
-                    pickle.dump( info,fd, protocol=self._DEFAULT_PICKLE_PROTOCOL )
-                    fd.flush()
-                    os.fsync(fd.fileno())
-                # update class file
-                fileClassPath = os.path.join(self.__path,os.path.dirname(relativePath),self.__fileClass%fName)
-                with open(fileClassPath, 'wb') as fd:
-                    if value is None:
-                        klass = None
-                    else:
-                        klass = value.__class__
-                    pickle.dump(klass , fd, protocol=self._DEFAULT_PICKLE_PROTOCOL )
-                    fd.flush()
-                    os.fsync(fd.fileno())
+                self.__write_file_info(relativePath, info, durability=durability)
             except Exception as err:
                 message.append(str(err))
                 updated = False
                 try:
-                    if 'pickle.dump(' in dump:
+                    if (codec is not None and codec.name == 'pickle') or (codec is None and 'pickle.dump(' in _dump):
                         mi = get_pickling_errors(value)
                         if mi is not None:
                             message.append('more info: %s'%str(mi))
                 except:
                     pass
+                self.__lockStats.failed_trial()
                 if self.DEBUG_PRINT_FAILED_TRIALS: print("Trial %i failed in Repository.%s (%s). Set Repository.DEBUG_PRINT_FAILED_TRIALS to False to mute"%(_trial, inspect.stack()[1][3], '\n'.join(message)))
             else:
                 updated = True
                 break
         # release lock
-        self.__locker.release_lock(fileLockId)
+        self.__release_file_lock(fileLockId)
         # check and return
         assert updated or not raiseError, "Unable to update file '%s' (%s)"%(relativePath, '\n'.join(message),)
         return updated, '\n'.join(message)
@@ -2681,7 +4261,8 @@ class Repository(object):
 
 
     @path_required
-    def pull_file(self, relativePath, pull=None, update=True, ntrials=3):
+    @observed
+    def pull_file(self, relativePath, pull=None, update=True, ntrials=3, lock=True):
         """
         Pull a file's data from the Repository.
 
@@ -2689,11 +4270,13 @@ class Repository(object):
             #. relativePath (string): The relative to the repository path from
                where to pull the file.
             #. pull (None, string): The pulling method.
-               If None, the pull method saved in the file info will be used.
-               If a string is given, the string should include all the necessary
-               imports, a '$FILE_PATH' that replaces the absolute file path when
-               the dumping will be performed and finally a PULLED_DATA variable.
-               e.g "import numpy as np; PULLED_DATA=np.loadtxt(fname='$FILE_PATH')"
+               If None, the codec or the pull method saved in the file info
+               will be used. If a string is given, it can be a registered codec
+               name or a string compileable code that includes all the necessary
+               imports and defines a pull(path) function.
+               e.g "import numpy as np; pull=lambda path:np.loadtxt(fname=path)"
+               'numpy_mmap' can be used with files dumped with 'numpy' to pull
+               a read-only numpy.memmap instead of loading the whole array.
             #. update (boolean): If pull is not None, Whether to update the pull
                method stored in the file info by the given pull method.
             #. ntrials (int): After aquiring all locks, ntrials is the maximum
@@ -2705,67 +4288,165 @@ class Repository(object):
                likelyhood of failure due to multiple processes same time
                alteration.
 
+            #. lock (boolean): Whether to acquire the file lock while pulling.
+               Files are written aside and atomically replaced, therefore
+               pulling without locking never reads a partially written file.
+               A file pulled without locking while being updated is either
+               its old or its new version. File data is read once to be
+               checked against its recorded checksum before being decoded,
+               therefore data and info written by different dumps are never
+               decoded together. When all ntrials fail, the file is pulled
+               once more with the shared lock that writers hold while
+               replacing file and info. Files without recorded checksum,
+               e.g. dumped with a dump code string, are always pulled with
+               the shared lock.
         :Returns:
             #. data (object): The pulled data from the file.
         """
         assert isinstance(ntrials, int), "ntrials must be integer"
         assert ntrials>0, "ntrials must be >0"
+        acquired, pulledVal = self.__pull_file(relativePath=relativePath, pull=pull, ntrials=ntrials, lock=lock)
+        if not acquired:
+            return False, pulledVal
+        return pulledVal
+
+    def pull(self, *args, **kwargs):
+        """Alias to pull_file"""
+        return self.pull_file(*args, **kwargs)
+
+    @path_required
+    @observed
+    def pull_files(self, relativePaths, pull=None, max_workers=None, ntrials=3, lock=True):
+        """
+        Pull many files' data from the Repository concurrently. Files locking,
+        information reading and data loading are run in a pool of threads,
+        which is efficient when pulling is input/output bound.
+
+        :Parameters:
+            #. relativePaths (list): List of relative to the repository paths
+               from where to pull the files.
+            #. pull (None, string): The pulling method used for all files.
+               If None, the codec or the pull method saved in every file info
+               will be used.
+            #. max_workers (None, int): Maximum number of threads. If None,
+               it is set to min(32, number of cpus + 4).
+            #. ntrials (int): After aquiring all locks, ntrials is the maximum
+               number of trials allowed before failing.
+               In rare cases, when multiple processes
+               are accessing the same repository components, different processes
+               can alter repository components between successive lock releases
+               of some other process. Bigger number of trials lowers the
+               likelyhood of failure due to multiple processes same time
+               alteration.
+
+            #. lock (boolean): Whether to acquire the file lock while pulling.
+               Files are written aside and atomically replaced, therefore
+               pulling without locking never reads a partially written file.
+               A file pulled without locking while being updated is either
+               its old or its new version. File data is read once to be
+               checked against its recorded checksum before being decoded,
+               therefore data and info written by different dumps are never
+               decoded together. When all ntrials fail, the file is pulled
+               once more with the shared lock that writers hold while
+               replacing file and info. Files without recorded checksum,
+               e.g. dumped with a dump code string, are always pulled with
+               the shared lock.
+        :Returns:
+            #. results (list): List of (success, data) tuples in relativePaths
+               order. When pulling a file fails, success is False and data is
+               the error message.
+        """
+        assert isinstance(ntrials, int), "ntrials must be integer"
+        assert ntrials>0, "ntrials must be >0"
+        if max_workers is None:
+            try:
+                max_workers = min(32, cpu_count()+4)
+            except NotImplementedError:
+                max_workers = 4
+        assert isinstance(max_workers, int), "max_workers must be None or an integer"
+        assert max_workers>0, "max_workers must be >0"
+        relativePaths = list(relativePaths)
+        def _pull(relativePath):
+            try:
+                return self.__pull_file(relativePath=relativePath, pull=pull, ntrials=ntrials, lock=lock)
+            except Exception as err:
+                return False, str(err)
+        # pull sequentially when no concurrency is possible
+        max_workers = min(max_workers, len(relativePaths))
+        if max_workers <= 1:
+            return [_pull(p) for p in relativePaths]
+        # pull in threads pool
+        pool = ThreadPool(processes=max_workers)
+        try:
+            results = pool.map(_pull, relativePaths)
+        finally:
+            pool.close()
+            pool.join()
+        return results
+
+
+    @path_required
+    @observed
+    def pull_slice(self, relativePath, index, ntrials=3):
+        """
+        Pull a slice of a numpy array file dumped with 'numpy' or 'numpy_mmap'
+        without loading the whole array. Only the bytes spanning the rows
+        selected by index first axis item are read from disk.
+
+        :Parameters:
+            #. relativePath (string): The relative to the repository path from
+               where to pull the file.
+            #. index (int, slice, tuple): Basic numpy index such as 5,
+               slice(-10, None) or (slice(0,100), 2).
+            #. ntrials (int): After aquiring all locks, ntrials is the maximum
+               number of trials allowed before failing.
+               In rare cases, when multiple processes
+               are accessing the same repository components, different processes
+               can alter repository components between successive lock releases
+               of some other process. Bigger number of trials lowers the
+               likelyhood of failure due to multiple processes same time
+               alteration.
+
+        :Returns:
+            #. data (numpy.ndarray): The sliced array.
+        """
+        assert isinstance(ntrials, int), "ntrials must be integer"
+        assert ntrials>0, "ntrials must be >0"
         # check name and path
         relativePath = self.to_repo_relative_path(path=relativePath, split=False)
         realPath     = os.path.join(self.__path,relativePath)
-        fPath, fName = os.path.split(realPath)
-        # check whether it's a repository file
-        isRepoFile,fileOnDisk, infoOnDisk, classOnDisk = self.is_repository_file(relativePath)
-        if not isRepoFile:
-            fileOnDisk  = ["",". File itself is found on disk"][fileOnDisk]
-            infoOnDisk  = ["",". %s is found on disk"%self.__fileInfo%fName][infoOnDisk]
-            classOnDisk = ["",". %s is found on disk"%self.__fileClass%fName][classOnDisk]
-            assert False, "File '%s' is not a repository file%s%s%s"%(relativePath,fileOnDisk,infoOnDisk,classOnDisk)
+        isRepoFile,fileOnDisk, _, _ = self.is_repository_file(relativePath)
+        assert isRepoFile, "File '%s' is not a repository file"%(relativePath,)
+        if not fileOnDisk:
+            self.__repair_file(relativePath)
         assert fileOnDisk, "File '%s' is registered in repository but the file itself was not found on disk"%(relativePath,)
-        if not infoOnDisk:
-            if pull is not None:
-                warnings.warn("'%s' was not found on disk but pull method is given"%(self.__fileInfo%fName))
-            else:
-                raise Exception("File '%s' is registered in repository but the '%s' was not found on disk and pull method is not specified"%(relativePath,(self.__fileInfo%fName)))
-        # lock repository
-        acquired, fileLockId = self.__locker.acquire_lock(path=realPath, timeout=self.timeout)
-        if not acquired:
-            error = "Code %s. Unable to aquire the lock when pulling '%s'"%(fileLockId,relativePath)
-            return False, error
-        # pull file
+        # lock file
+        acquired, fileLockId = self.__acquire_file_lock(realPath, shared=True)
+        assert acquired, "Code %s. Unable to aquire the lock when pulling '%s'"%(fileLockId,relativePath)
+        # pull slice
         for _trial in range(ntrials):
             error = None
             try:
-                # get pull method
-                if pull is not None:
-                    pull = get_pull_method(pull)
-                else:
-                    with open(os.path.join(fPath,self.__fileInfo%fName), 'rb') as fd:
-                        info = pickle.load(fd)
-                    pull = info['pull']
-                # try to pull file
-                pullFunc  = my_exec( pull, name='pull', description='pull')
-                pulledVal = pullFunc(path=str(realPath))
+                with self._tracer.phase('deserialize'), open(realPath, 'rb') as fd:
+                    data = load_npy_slice(fd, index)
+            except (IndexError, TypeError):
+                self.__release_file_lock(fileLockId)
+                raise
             except Exception as err:
-                #LF.release_lock()
-                self.__locker.release_lock(fileLockId)
-                m = str(pull).replace("$FILE_PATH", str(realPath) )
-                error = "Unable to pull data using '%s' from file (%s)"%(m,err)
+                error = "Unable to pull slice from file (%s)"%(err,)
+                self.__lockStats.failed_trial()
                 if self.DEBUG_PRINT_FAILED_TRIALS: print("Trial %i failed in Repository.%s (%s). Set Repository.DEBUG_PRINT_FAILED_TRIALS to False to mute"%(_trial, inspect.stack()[1][3], str(error)))
             else:
                 break
         # release lock
-        self.__locker.release_lock(fileLockId)
+        self.__release_file_lock(fileLockId)
         # check and return
         assert error is None, "After %i trials, %s"%(ntrials, error)
-        return pulledVal
-
-    def pull(self, *args, **kwargs):
-        """Alias to pull_file"""
-        return self.pull_file(*args, **kwargs)
+        return data
 
 
     @path_required
+    @observed
     def rename_file(self, relativePath, newRelativePath,
                           force=False, raiseError=True, ntrials=3):
         """
@@ -2807,87 +4488,88 @@ class Repository(object):
         newRelativePath = self.to_repo_relative_path(path=newRelativePath, split=False)
         newRealPath     = os.path.join(self.__path,newRelativePath)
         nfPath, nfName  = os.path.split(newRealPath)
-        # lock old file
-        acquired, fileLockId = self.__locker.acquire_lock(path=realPath, timeout=self.timeout)
-        if not acquired:
-            error = "Code %s. Unable to aquire the lock for old file '%s'"%(fileLockId,relativePath)
-            assert not raiseError, error
-            return False, error
-        # add directory
+        # add new file diretory
         try:
             success, reason = self.add_directory(nfPath, raiseError=False, ntrials=ntrials)
         except Exception as err:
             reason  = "Unable to add directory (%s)"%(str(err))
             success = False
         if not success:
-            #LO.release_lock()
-            self.__locker.release_lock(fileLockId)
             assert not raiseError, reason
             return False, reason
+        # lock repository
+        acquired, repoLockId = self.__acquire_lock(self.__path)
+        if not acquired:
+            error = "Code %s. Unable to aquire the repository lock. You may try again!"%(repoLockId,)
+            assert not raiseError, error
+            return False, error
+        # lock old file
+        acquired, fileLockId = self.__acquire_file_lock(realPath)
+        if not acquired:
+            self.__release_lock(repoLockId)
+            error = "Code %s. Unable to aquire the lock for old file '%s'"%(fileLockId,relativePath)
+            assert not raiseError, error
+            return False, error
         # create new file lock
-        acquired, newFileLockId = self.__locker.acquire_lock(path=newRealPath, timeout=self.timeout)
+        acquired, newFileLockId = self.__acquire_file_lock(newRealPath)
         if not acquired:
-            #LO.release_lock()
-            self.__locker.release_lock(fileLockId)
+            self.__release_file_lock(fileLockId)
+            self.__release_lock(repoLockId)
             error = "Code %s. Unable to aquire the lock for new file path '%s'"%(newFileLockId,newRelativePath)
             assert not raiseError, error
             return False, error
+        # load repository info
+        error = self.__load_repository_walk(ntrials=ntrials)
+        if error is not None:
+            self.__release_file_lock(fileLockId)
+            self.__release_file_lock(newFileLockId)
+            self.__release_lock(repoLockId)
+            assert not raiseError, error
+            return False, error
+        # invalidate cached objects
+        self.__uncache(relativePath)
+        self.__uncache(newRelativePath)
         # rename file
         for _trial in range(ntrials):
             renamed = False
             error   = None
             try:
                 # check whether it's a repository file
-                isRepoFile,fileOnDisk, infoOnDisk, classOnDisk = self.is_repository_file(relativePath)
+                isRepoFile,fileOnDisk, infoOnDisk, _ = self.is_repository_file(relativePath)
                 assert isRepoFile,  "file '%s' is not a repository file"%(relativePath,)
                 assert fileOnDisk,  "file '%s' is found on disk"%(relativePath,)
                 assert infoOnDisk,  "%s is found on disk"%self.__fileInfo%fName
-                assert classOnDisk, "%s is found on disk"%self.__fileClass%fName
                 # get new file path
-                nisRepoFile,nfileOnDisk,ninfoOnDisk,nclassOnDisk = self.is_repository_file(newRelativePath)
+                nisRepoFile = self.__repo['walk_repo'].is_file(newRelativePath)
                 assert not nisRepoFile or force, "New file path is a registered repository file, set force to True to proceed regardless"
-                # get parent directories list
-                oDirList = self.__get_repository_directory(fPath)
-                nDirList = self.__get_repository_directory(nfPath)
-                # remove new file and all repository files from disk
-                if os.path.isfile(newRealPath):
-                    os.remove(newRealPath)
-                if os.path.isfile(os.path.join(nfPath,self.__fileInfo%nfName)):
-                    os.remove(os.path.join(nfPath,self.__fileInfo%nfName))
-                if os.path.isfile(os.path.join(nfPath,self.__fileClass%nfName)):
-                    os.remove(os.path.join(nfPath,self.__fileClass%nfName))
-                # move old file to new path
-                os.rename(realPath, newRealPath)
-                os.rename(os.path.join(fPath,self.__fileInfo%fName), os.path.join(nfPath,self.__fileInfo%nfName))
-                os.rename(os.path.join(fPath,self.__fileClass%fName), os.path.join(nfPath,self.__fileClass%nfName))
-                # update list
-                findex = oDirList.index(fName)
-                oDirList.pop(findex)
-                # update new list
-                if nfName not in nDirList:
-                    nDirList.append(nfName)
+                # move old file and info to new path, replacing existing ones
+                replace_file(realPath, newRealPath)
+                self.__move_file_info(relativePath, newRelativePath)
+                # update directory tree
+                self.__repo['walk_repo'].remove_file(relativePath)
+                self.__repo['walk_repo'].add_file(newRelativePath)
             except Exception as err:
                 renamed = False
                 error = str(err)
+                self.__lockStats.failed_trial()
                 if self.DEBUG_PRINT_FAILED_TRIALS: print("Trial %i failed in Repository.%s (%s). Set Repository.DEBUG_PRINT_FAILED_TRIALS to False to mute"%(_trial, inspect.stack()[1][3], str(error)))
             else:
                 renamed = True
                 break
+        # save repository
+        if renamed:
+            renamed, error = self.__save_repository_journal(raiseError=False)
         # release locks
-        self.__locker.release_lock(fileLockId)
-        self.__locker.release_lock(newFileLockId)
-        # always clean old file lock
-        try:
-            if os.path.isfile(os.path.join(fPath,self.__fileLock%fName)):
-                os.remove(os.path.join(fPath,self.__fileLock%fName))
-        except:
-            pass
+        self.__release_file_lock(fileLockId)
+        self.__release_file_lock(newFileLockId)
+        self.__release_lock(repoLockId)
         # check and return
         assert renamed or not raiseError, "Unable to rename file '%s' to '%s' after %i trials (%s)"%(relativePath, newRelativePath, ntrials, error,)
         return renamed, error
 
 
     @path_required
+    @observed
     def remove_file(self, relativePath, removeFromSystem=False,
                           raiseError=True, ntrials=3):
         """
@@ -2918,51 +4600,62 @@ class Repository(object):
         realPath     = os.path.join(self.__path,relativePath)
         fPath, fName = os.path.split(realPath)
         # lock repository
-        acquired, fileLockId = self.__locker.acquire_lock(path=realPath, timeout=self.timeout)
+        acquired, repoLockId = self.__acquire_lock(self.__path)
+        if not acquired:
+            error = "Code %s. Unable to aquire the repository lock. You may try again!"%(repoLockId,)
+            assert not raiseError, error
+            return False, error
+        # lock file
+        acquired, fileLockId = self.__acquire_file_lock(realPath)
         if not acquired:
+            self.__release_lock(repoLockId)
             error = "Code %s. Unable to aquire the lock when removing '%s'"%(fileLockId,relativePath)
             assert not raiseError, error
             return False, error
+        # load repository info
+        error = self.__load_repository_walk(ntrials=ntrials)
+        if error is not None:
+            self.__release_file_lock(fileLockId)
+            self.__release_lock(repoLockId)
+            assert not raiseError, error
+            return False, error
+        # invalidate cached objects
+        self.__uncache(relativePath)
         # remove file
         for _trial in range(ntrials):
             removed = False
             message = []
             try:
                 # check whether it's a repository file
-                isRepoFile,fileOnDisk, infoOnDisk, classOnDisk = self.is_repository_file(relativePath)
+                isRepoFile,fileOnDisk, infoOnDisk, _ = self.is_repository_file(relativePath)
                 if not isRepoFile:
                     message("File '%s' is not a repository file"%(relativePath,))
                     if fileOnDisk:
                         message.append("File itself is found on disk")
                     if infoOnDisk:
                         message.append("%s is found on disk"%self.__fileInfo%fName)
-                    if classOnDisk:
-                        message.append("%s is found on disk"%self.__fileClass%fName)
                 else:
-                    dirList = self.__get_repository_directory(fPath)
-                    findex  = dirList.index(fName)
-                    dirList.pop(findex)
-                    if os.path.isfile(realPath):
+                    self.__repo['walk_repo'].remove_file(relativePath)
+                    if fileOnDisk:
                         os.remove(realPath)
-                    if os.path.isfile(os.path.join(fPath,self.__fileInfo%fName)):
-                        os.remove(os.path.join(fPath,self.__fileInfo%fName))
-                    if os.path.isfile(os.path.join(fPath,self.__fileClass%fName)):
-                        os.remove(os.path.join(fPath,self.__fileClass%fName))
+                    if infoOnDisk:
+                        self.__remove_file_info(relativePath)
             except Exception as err:
                 removed = False
                 message.append(str(err))
+                self.__lockStats.failed_trial()
                 if self.DEBUG_PRINT_FAILED_TRIALS: print("Trial %i failed in Repository.%s (%s). Set Repository.DEBUG_PRINT_FAILED_TRIALS to False to mute"%(_trial, inspect.stack()[1][3], '\n'.join(message)))
             else:
                 removed = True
                 break
+        # save repository
+        if removed:
+            removed, error = self.__save_repository_journal(raiseError=False)
+            if not removed:
+                message.append(error)
         # release lock
-        self.__locker.release_lock(fileLockId)
-        # always clean
-        try:
-            if os.path.isfile(os.path.join(fPath,self.__fileLock%fName)):
-                os.remove(os.path.join(fPath,self.__fileLock%fName))
-        except:
-            pass
+        self.__release_file_lock(fileLockId)
+        self.__release_lock(repoLockId)
         # check and return
         assert removed or not raiseError, "Unable to remove file '%s' after %i trials (%s)"%(relativePath, ntrials, '\n'.join(message),)
         return removed, '\n'.join(message)
@@ -0,0 +1,466 @@
+"""
+Stats module provides the timing statistics collected by a Repository.
+Durations are accumulated in histograms of logarithmic buckets, therefore
+memory usage doesn't grow with the number of timed calls and percentiles
+are estimated within 19% of the exact value.
+"""
+# standard distribution imports
+import math, time, threading
+from collections import OrderedDict
+
+
+class Histogram(object):
+    """
+    Durations histogram with logarithmic buckets. Every doubling of
+    duration is split in BUCKETS_PER_OCTAVE buckets, bucket i upper bound
+    is MIN_DURATION*2**(i/BUCKETS_PER_OCTAVE). First bucket counts all
+    durations smaller than MIN_DURATION and last bucket is not bounded.
+    """
+    # smallest bucket upper bound in seconds
+    MIN_DURATION       = 1e-6
+    # number of buckets per doubling of duration
+    BUCKETS_PER_OCTAVE = 4
+    # number of buckets. Last bounded bucket upper bound is about 4.5 minutes
+    NBUCKETS           = 113
+
+    def __init__(self):
+        self.__counts = [0]*self.NBUCKETS
+        self.__count  = 0
+        self.__total  = 0.0
+        self.__min    = None
+        self.__max    = None
+
+    @property
+    def count(self):
+        """Number of added durations."""
+        return self.__count
+
+    @property
+    def total(self):
+        """Sum of added durations in seconds."""
+        return self.__total
+
+    def get_bucket_upper_bound(self, index):
+        """Get bucket upper bound in seconds. Last bucket is not bounded."""
+        if index >= self.NBUCKETS-1:
+            return float('inf')
+        return self.MIN_DURATION*2**(float(index)/self.BUCKETS_PER_OCTAVE)
+
+    def add(self, duration):
+        """Add a duration in seconds."""
+        if duration <= self.MIN_DURATION:
+            index = 0
+        else:
+            index = min(self.NBUCKETS-1, int(math.ceil(self.BUCKETS_PER_OCTAVE*math.log(duration/self.MIN_DURATION, 2)-1e-9)))
+        self.__counts[index] += 1
+        self.__count += 1
+        self.__total += duration
+        if self.__min is None or duration < self.__min:
+            self.__min = duration
+        if self.__max is None or duration > self.__max:
+            self.__max = duration
+
+    def merge(self, other):
+        """Add all durations of another histogram."""
+        for idx, cnt in enumerate(other._Histogram__counts):
+            self.__counts[idx] += cnt
+        self.__count += other.count
+        self.__total += other.total
+        for d in (other._Histogram__min, other._Histogram__max):
+            if d is None:
+                continue
+            if self.__min is None or d < self.__min:
+                self.__min = d
+            if self.__max is None or d > self.__max:
+                self.__max = d
+
+    def get_percentile(self, percent):
+        """
+        Get estimated percentile.
+
+        :Parameters:
+            #. percent (number): The percentile between 0 and 100.
+
+        :Returns:
+            #. duration (None, float): The upper bound of the bucket of the
+               percentile, clipped to the maximum added duration. None if
+               no duration was added.
+        """
+        if not self.__count:
+            return None
+        rank = max(1, int(math.ceil(self.__count*percent/100.)))
+        seen = 0
+        for idx, cnt in enumerate(self.__counts):
+            seen += cnt
+            if seen >= rank:
+                return min(self.get_bucket_upper_bound(idx), self.__max)
+        return self.__max
+
+    def to_dict(self):
+        """
+        Get histogram summary.
+
+        :Returns:
+            #. summary (dict): Dictionary of 'count', 'total', 'min', 'max',
+               'mean', 'p50', 'p95', 'p99' in seconds and 'buckets', the list
+               of (upper bound, count) of non empty buckets.
+        """
+        return {'count'  :self.__count,
+                'total'  :self.__total,
+                'min'    :self.__min,
+                'max'    :self.__max,
+                'mean'   :self.__total/self.__count if self.__count else None,
+                'p50'    :self.get_percentile(50),
+                'p95'    :self.get_percentile(95),
+                'p99'    :self.get_percentile(99),
+                'buckets':[(self.get_bucket_upper_bound(idx), cnt) for idx, cnt in enumerate(self.__counts) if cnt]}
+
+
+class LockStats(object):
+    """
+    Thread safe locks statistics by lock path. For every lock path, the
+    time waited to acquire the lock and the time it was held are accumulated
+    in histograms, along with the number of acquired locks, timeouts,
+    failures and failed trials of operations done while holding the lock.
+
+    :Parameters:
+        #. maxPaths (int): Maximum number of lock paths with their own
+           statistics. Least recently used paths statistics are merged
+           into OTHERS_PATH ones.
+    """
+    # lock path under which evicted paths statistics are merged
+    OTHERS_PATH = '<others>'
+
+    def __init__(self, maxPaths=10000):
+        assert isinstance(maxPaths, int), "maxPaths must be an integer"
+        assert maxPaths>0, "maxPaths must be >0"
+        self.__maxPaths = maxPaths
+        self.__lock     = threading.Lock()
+        self.__paths    = OrderedDict()
+        self.__others   = None
+        # acquired locks (path, acquire time) by lock id
+        self.__held     = {}
+        # threads held locks paths stack
+        self.__local    = threading.local()
+
+    def __getstate__(self):
+        return {'maxPaths':self.__maxPaths}
+
+    def __setstate__(self, state):
+        self.__init__(maxPaths=state['maxPaths'])
+
+    def __new_stats(self):
+        return {'acquired':0, 'timeouts':0, 'errors':0, 'failed_trials':0,
+                'wait':Histogram(), 'hold':Histogram()}
+
+    def __get_stats(self, path):
+        # must be called with lock acquired
+        stats = self.__paths.pop(path, None)
+        if stats is None:
+            stats = self.__new_stats()
+        self.__paths[path] = stats
+        while len(self.__paths) > self.__maxPaths:
+            _, old = self.__paths.popitem(last=False)
+            if self.__others is None:
+                self.__others = self.__new_stats()
+            for k in ('acquired','timeouts','errors','failed_trials'):
+                self.__others[k] += old[k]
+            self.__others['wait'].merge(old['wait'])
+            self.__others['hold'].merge(old['hold'])
+        return stats
+
+    def __get_stack(self):
+        stack = getattr(self.__local, 'stack', None)
+        if stack is None:
+            stack = self.__local.stack = []
+        return stack
+
+    def acquired(self, path, lockId, wait):
+        """
+        Register an acquired lock.
+
+        :Parameters:
+            #. path (string): The lock path.
+            #. lockId (object): The lock unique id.
+            #. wait (float): The time in seconds waited to acquire the lock.
+        """
+        with self.__lock:
+            stats = self.__get_stats(path)
+            stats['acquired'] += 1
+            stats['wait'].add(wait)
+            self.__held[lockId] = (path, time.time())
+        self.__get_stack().append(path)
+
+    def failed(self, path, code, wait):
+        """
+        Register a lock that couldn't be acquired.
+
+        :Parameters:
+            #. path (string): The lock path.
+            #. code (object): The locker failure code. 0 means timeout.
+            #. wait (float): The time in seconds waited before failing.
+        """
+        with self.__lock:
+            stats = self.__get_stats(path)
+            if code == 0:
+                stats['timeouts'] += 1
+            else:
+                stats['errors'] += 1
+            stats['wait'].add(wait)
+
+    def released(self, lockId):
+        """
+        Register a released lock.
+
+        :Parameters:
+            #. lockId (object): The lock unique id as given to acquired.
+        """
+        with self.__lock:
+            held = self.__held.pop(lockId, None)
+            if held is None:
+                return
+            path, tic = held
+            self.__get_stats(path)['hold'].add(time.time()-tic)
+        stack = self.__get_stack()
+        if path in stack:
+            del stack[len(stack)-1-stack[::-1].index(path)]
+
+    def failed_trial(self):
+        """Register a failed trial of an operation. It's accounted to the
+        last lock path acquired by the calling thread and still held."""
+        stack = self.__get_stack()
+        if not len(stack):
+            return
+        with self.__lock:
+            self.__get_stats(stack[-1])['failed_trials'] += 1
+
+    def reset(self):
+        """Reset statistics of all paths. Held locks remain accounted."""
+        with self.__lock:
+            self.__paths.clear()
+            self.__others = None
+
+    def get_stats(self):
+        """
+        Get locks statistics.
+
+        :Returns:
+            #. stats (dict): Dictionary of statistics by lock path. Each
+               path statistics is a dictionary of 'acquired', 'timeouts',
+               'errors', 'failed_trials', and 'wait' and 'hold' histograms
+               summaries as returned by Histogram.to_dict.
+        """
+        with self.__lock:
+            items = list(self.__paths.items())
+            if self.__others is not None:
+                items.append((self.OTHERS_PATH, self.__others))
+            stats = {}
+            for path, pstats in items:
+                stats[path] = dict(pstats)
+                stats[path]['wait'] = pstats['wait'].to_dict()
+                stats[path]['hold'] = pstats['hold'].to_dict()
+        return stats
+
+
+class _NullPhase(object):
+    def __enter__(self):
+        return self
+    def __exit__(self, *args):
+        return False
+
+_NULL_PHASE = _NullPhase()
+
+
+class _Phase(object):
+    def __init__(self, record, name):
+        self.__record = record
+        self.__name   = name
+    def __enter__(self):
+        self.__record['stack'].append([self.__name, time.time(), 0.0])
+        return self
+    def __exit__(self, *args):
+        name, tic, children = self.__record['stack'].pop()
+        elapsed = time.time()-tic
+        phases  = self.__record['phases']
+        phases[name] = phases.get(name, 0.0) + elapsed - children
+        if len(self.__record['stack']):
+            self.__record['stack'][-1][2] += elapsed
+        return False
+
+
+class OperationTracer(object):
+    """
+    Per thread operations tracer. An operation is started and stopped by the
+    thread running it and the time spent in named phases in between is
+    accumulated. Phases can be nested, a phase time excludes the time spent
+    in its nested phases. Phases are not timed when no operation is started
+    by the calling thread, and operations started while another one is
+    running in the same thread are part of the running one.
+
+    :Parameters:
+        #. observer (None, callable): Called with every stopped operation
+           event. Operations are traced only when observer is not None.
+    """
+    # phase of operation time spent out of any phase
+    OTHER_PHASE = 'other'
+
+    def __init__(self, observer=None):
+        assert observer is None or callable(observer), "observer must be None or callable"
+        self.observer = observer
+        self.__local  = threading.local()
+
+    def __getstate__(self):
+        return {}
+
+    def __setstate__(self, state):
+        self.__init__()
+
+    def start(self, operation, path=None):
+        """
+        Start tracing an operation.
+
+        :Parameters:
+            #. operation (string): The operation name.
+            #. path (None, string): The operation relative path.
+
+        :Returns:
+            #. started (boolean): False if an operation is already started
+               by the calling thread.
+        """
+        if getattr(self.__local, 'record', None) is not None:
+            return False
+        self.__local.record = {'operation':operation, 'path':path, 'start':time.time(), 'phases':{}, 'stack':[]}
+        return True
+
+    def phase(self, name):
+        """Get context manager timing a phase of the calling thread
+        operation. If name is None, no phase is timed."""
+        record = getattr(self.__local, 'record', None)
+        if record is None or name is None:
+            return _NULL_PHASE
+        return _Phase(record, name)
+
+    def add(self, name, duration):
+        """Add duration in seconds to a phase of the calling thread
+        operation."""
+        record = getattr(self.__local, 'record', None)
+        if record is None:
+            return
+        record['phases'][name] = record['phases'].get(name, 0.0) + duration
+        if len(record['stack']):
+            record['stack'][-1][2] += duration
+
+    def stop(self, success=True, error=None):
+        """
+        Stop calling thread operation and call observer with its event.
+
+        :Parameters:
+            #. success (boolean): Whether operation succeeded.
+            #. error (None, string): The operation error message.
+
+        :Returns:
+            #. event (dict): Dictionary of 'operation', 'path', 'success',
+               'error', 'start' time, 'duration' in seconds and 'phases',
+               the dictionary of durations in seconds by phase name.
+        """
+        record = self.__local.record
+        self.__local.record = None
+        duration = time.time()-record['start']
+        phases   = record['phases']
+        phases[self.OTHER_PHASE] = max(0.0, duration-sum(phases.values()))
+        event = {'operation':record['operation'], 'path':record['path'],
+                 'success':success, 'error':error, 'start':record['start'],
+                 'duration':duration, 'phases':phases}
+        observer = self.observer
+        if observer is not None:
+            observer(event)
+        return event
+
+
+class OperationStats(object):
+    """
+    Thread safe operations events aggregator. An instance is callable and
+    can be given as a Repository observer. Operations durations and every
+    phase durations are accumulated by operation name in histograms.
+
+    .. code-block:: python
+
+        from pyrep import Repository
+        from pyrep.Stats import OperationStats
+
+        STATS = OperationStats()
+        REP   = Repository(PATH, observer=STATS)
+        ...
+        print(STATS.report())
+    """
+    def __init__(self):
+        self.__lock       = threading.Lock()
+        self.__operations = {}
+
+    def __getstate__(self):
+        return {}
+
+    def __setstate__(self, state):
+        self.__init__()
+
+    def __call__(self, event):
+        with self.__lock:
+            stats = self.__operations.get(event['operation'], None)
+            if stats is None:
+                stats = self.__operations[event['operation']] = {'count':0, 'errors':0, 'duration':Histogram(), 'phases':{}}
+            stats['count'] += 1
+            if not event['success']:
+                stats['errors'] += 1
+            stats['duration'].add(event['duration'])
+            for name, duration in event['phases'].items():
+                hist = stats['phases'].get(name, None)
+                if hist is None:
+                    hist = stats['phases'][name] = Histogram()
+                hist.add(duration)
+
+    def __str__(self):
+        return self.report()
+
+    def reset(self):
+        """Reset all operations statistics."""
+        with self.__lock:
+            self.__operations.clear()
+
+    def get_stats(self):
+        """
+        Get operations statistics.
+
+        :Returns:
+            #. stats (dict): Dictionary of statistics by operation name.
+               Each operation statistics is a dictionary of 'count',
+               'errors', 'duration' histogram summary and 'phases',
+               the dictionary of histograms summaries by phase name.
+               Histograms summaries are returned by Histogram.to_dict.
+        """
+        with self.__lock:
+            stats = {}
+            for operation, ostats in self.__operations.items():
+                stats[operation] = {'count'   :ostats['count'],
+                                    'errors'  :ostats['errors'],
+                                    'duration':ostats['duration'].to_dict(),
+                                    'phases'  :dict([(n, h.to_dict()) for n, h in ostats['phases'].items()])}
+        return stats
+
+    def report(self):
+        """
+        Get operations statistics report. Durations are in milliseconds and
+        phases are given by their share of the operations total time.
+
+        :Returns:
+            #. report (string): The report.
+        """
+        stats = self.get_stats()
+        lines = ["%-18s %8s %7s %10s %10s %10s  %s"%('operation','count','errors','p50 (ms)','p95 (ms)','p99 (ms)','phases')]
+        for operation in sorted(stats):
+            ostats = stats[operation]
+            total  = ostats['duration']['total'] or 1
+            phases = sorted(ostats['phases'].items(), key=lambda item:-item[1]['total'])
+            phases = ' '.join(["%s %.0f%%"%(n, 100.*s['total']/total) for n, s in phases if s['total']>0])
+            lines.append("%-18s %8i %7i %10.3f %10.3f %10.3f  %s"%(operation, ostats['count'], ostats['errors'],
+                         1000*ostats['duration']['p50'], 1000*ostats['duration']['p95'], 1000*ostats['duration']['p99'], phases))
+        return '\n'.join(lines)
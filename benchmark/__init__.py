@@ -0,0 +1,460 @@
+"""
+pyrep benchmark measures dump_file, update_file and pull_file throughput and
+latency percentiles and emits JSON results that can be compared between
+releases. Run it as a module:
+
+.. code-block:: console
+
+    python -m pyrep.benchmark --output results.json
+    python -m pyrep.benchmark --scenarios codecs --sizes 1KB,1MB,100MB,1GB
+    python -m pyrep.benchmark --scenarios repository_size --repository-sizes 1000,100000,1000000
+    python -m pyrep.benchmark --scenarios processes --processes 1,2,4,8,16
+    python -m pyrep.benchmark --scenarios auto --values bytes,ndarray --sizes 1MB,100MB
+
+Scenarios are:
+
+    #. codecs: every built-in codec for every value size.
+    #. repository_size: operations latency and repository opening time with
+       every verify mode for repositories of a given number of tracked files.
+    #. depth: operations latency for files at a given directory depth.
+    #. processes: aggregated throughput and latency of concurrent processes
+       each working on its own files of the same repository.
+    #. auto: 'auto' dump keyword against the default pickle dump for every
+       value type and size, with the selected codec and the file size.
+
+Every measure runs the given number of operations, fewer for values bigger
+than 8MB. Latencies are in seconds, throughputs in operations and megabytes
+per second.
+"""
+# standard distribution imports
+from __future__ import print_function
+import os, sys, json, math, time, shutil, random, platform, tempfile, argparse, subprocess, importlib
+
+# pyrep imports
+from ..__pkginfo__ import __version__
+from ..Repository import Repository
+from ..Codec import get_codec
+
+# high resolution timer
+_timer = getattr(time, 'perf_counter', time.time)
+
+# all built-in codecs as dump keywords
+CODECS    = ['pickle', 'dill', 'json', 'numpy', 'numpy_mmap', 'numpy_text']
+SCENARIOS = ['codecs', 'repository_size', 'depth', 'processes', 'auto']
+# value types of auto scenario
+VALUES    = ['bytes', 'text', 'ndarray', 'dict', 'list', 'object']
+# load_repository verify modes
+VERIFY    = ['full', 'scandir', 'lazy']
+# total bytes dumped per measure above which the number of operations is reduced
+MEASURE_BYTES = 8*1024**2
+
+_UNITS = {'B':1, 'KB':1024, 'MB':1024**2, 'GB':1024**3}
+
+
+def parse_size(size):
+    """Parse size string such as '1KB', '10MB' or '1GB' into bytes."""
+    size = size.strip().upper()
+    for unit in sorted(_UNITS, key=len, reverse=True):
+        if size.endswith(unit):
+            return int(float(size[:-len(unit)])*_UNITS[unit])
+    return int(size)
+
+def format_size(nbytes):
+    """Format size in bytes to the biggest fitting unit."""
+    for unit in ('GB','MB','KB'):
+        if nbytes >= _UNITS[unit] and not nbytes%_UNITS[unit]:
+            return '%i%s'%(nbytes//_UNITS[unit], unit)
+    return '%iB'%nbytes
+
+def get_percentile(sortedValues, percent):
+    """Get nearest rank percentile of sorted values."""
+    if not len(sortedValues):
+        return None
+    rank = max(1, int(math.ceil(len(sortedValues)*percent/100.)))
+    return sortedValues[min(rank, len(sortedValues))-1]
+
+def summarize(latencies, nbytes=None, wallTime=None):
+    """
+    Summarize operations latencies.
+
+    :Parameters:
+        #. latencies (list): Operations latencies in seconds.
+        #. nbytes (None, int): Bytes processed per operation.
+        #. wallTime (None, float): Time in seconds the operations took. If
+           None, latencies sum is used.
+
+    :Returns:
+        #. summary (dict): Dictionary of 'count', 'total', 'mean', 'min',
+           'p50', 'p95', 'p99', 'max', 'ops_per_second' and, if nbytes is
+           given, 'mb_per_second'.
+    """
+    values = sorted(latencies)
+    total  = float(sum(values))
+    if wallTime is None:
+        wallTime = total
+    summary = {'count':len(values), 'total':total,
+               'mean' :total/len(values) if len(values) else None,
+               'min'  :values[0] if len(values) else None,
+               'p50'  :get_percentile(values, 50),
+               'p95'  :get_percentile(values, 95),
+               'p99'  :get_percentile(values, 99),
+               'max'  :values[-1] if len(values) else None,
+               'ops_per_second':len(values)/wallTime if wallTime>0 else None}
+    if nbytes is not None:
+        summary['mb_per_second'] = len(values)*nbytes/float(1024**2)/wallTime if wallTime>0 else None
+    return summary
+
+def make_value(codec, size):
+    """
+    Create a value that dumps to about size bytes with codec.
+
+    :Parameters:
+        #. codec (string): The dump keyword.
+        #. size (int): The value approximate dumped size in bytes.
+
+    :Returns:
+        #. value (object): numpy array for numpy codecs, list of floats for
+           json, pickle and dill.
+    """
+    if codec.startswith('numpy'):
+        import numpy
+        if codec == 'numpy_text':
+            # '%.6e' formatted floats take 13 bytes
+            return numpy.random.random(max(1, size//13))
+        return numpy.random.random(max(1, size//8))
+    if codec == 'json':
+        return [random.random() for _ in range(max(1, size//20))]
+    # pickled floats take 9 bytes
+    return [random.random() for _ in range(max(1, size//9))]
+
+def make_typed_value(kind, size):
+    """
+    Create a value of a given type of about size bytes.
+
+    :Parameters:
+        #. kind (string): One of VALUES. 'dict' is a small dictionary of at
+           most 100 floats whatever the size, 'list' a list of floats and
+           'object' a set of integers.
+        #. size (int): The value approximate size in bytes.
+
+    :Returns:
+        #. value (object): The value.
+    """
+    if kind == 'bytes':
+        return os.urandom(size)
+    if kind == 'text':
+        return u''.join([random.choice(u'abcdefghij ') for _ in range(min(size, 1024))])*max(1, size//1024)
+    if kind == 'ndarray':
+        import numpy
+        return numpy.random.random(max(1, size//8))
+    if kind == 'dict':
+        return dict([(u'k%i'%idx, random.random()) for idx in range(max(1, min(100, size//20)))])
+    if kind == 'list':
+        return [random.random() for _ in range(max(1, size//9))]
+    if kind == 'object':
+        return set(range(max(1, size//5)))
+    raise Exception("unknown value type '%s'"%kind)
+
+def get_operations_number(operations, size):
+    """Get number of operations for a measure given value size."""
+    return max(3, min(operations, MEASURE_BYTES//max(1,size)))
+
+def check_codec(codec):
+    """Get the reason why codec can't be benchmarked or None."""
+    if get_codec(codec) is None:
+        return "codec '%s' is not registered"%codec
+    try:
+        if codec.startswith('numpy'):
+            importlib.import_module('numpy')
+        elif codec == 'dill':
+            importlib.import_module('dill')
+    except ImportError as err:
+        return str(err)
+    return None
+
+def measure_operations(repo, relativePaths, value, dump=None, nbytes=None, pull=True):
+    """
+    Measure dump_file, update_file and pull_file on relative paths.
+
+    :Returns:
+        #. operations (dict): Summary of every operation latencies.
+    """
+    latencies = {'dump_file':[], 'update_file':[], 'pull_file':[]}
+    for relativePath in relativePaths:
+        tic = _timer()
+        repo.dump_file(value, relativePath=relativePath, dump=dump, replace=True)
+        latencies['dump_file'].append(_timer()-tic)
+    for relativePath in relativePaths:
+        tic = _timer()
+        repo.update_file(value, relativePath=relativePath)
+        latencies['update_file'].append(_timer()-tic)
+    if pull:
+        for relativePath in relativePaths:
+            tic = _timer()
+            repo.pull_file(relativePath=relativePath)
+            latencies['pull_file'].append(_timer()-tic)
+    repo.flush()
+    return dict([(k, summarize(v, nbytes=nbytes)) for k, v in latencies.items() if len(v)])
+
+
+class Benchmark(object):
+    """
+    Benchmark runner.
+
+    :Parameters:
+        #. path (string): Parent directory where benchmark repositories
+           are created and removed.
+        #. operations (int): Number of operations per measure.
+        #. locker (string): Repositories locker backend.
+        #. durability (string): Repositories durability level.
+        #. verbose (boolean): Whether to print progress to stderr.
+    """
+    def __init__(self, path=None, operations=100, locker='server', durability='strict', verbose=True):
+        if path is None:
+            path = tempfile.gettempdir()
+        assert os.path.isdir(path), "path '%s' is not a directory"%path
+        assert isinstance(operations, int) and operations>0, "operations must be a positive integer"
+        self.path       = path
+        self.operations = operations
+        self.locker     = locker
+        self.durability = durability
+        self.verbose    = verbose
+
+    def log(self, message):
+        if self.verbose:
+            print(message, file=sys.stderr)
+            sys.stderr.flush()
+
+    def new_repository(self, name):
+        """Create an empty benchmark repository."""
+        path = os.path.join(self.path, 'pyrepBenchmark_%s'%name)
+        if os.path.isdir(path):
+            shutil.rmtree(path)
+        repo = Repository(locker=self.locker, durability=self.durability)
+        success, message = repo.create_repository(path)
+        assert success, message
+        return repo
+
+    def remove_repository(self, repo):
+        path = repo.path
+        repo.remove_repository(removeEmptyDirs=True)
+        if os.path.isdir(path):
+            shutil.rmtree(path)
+
+    def populate(self, repo, nfiles, chunk=1000):
+        """Track nfiles small files in directories of at most chunk files."""
+        for start in range(0, nfiles, chunk):
+            items = [(idx, 'populated/d%06i/f%i'%(start//chunk, idx), None) for idx in range(start, min(start+chunk, nfiles))]
+            repo.dump_files(items)
+
+    def run_codecs(self, codecs, sizes):
+        """Benchmark every codec for every value size."""
+        results = []
+        for codec in codecs:
+            reason = check_codec(codec)
+            if reason is not None:
+                self.log("codec %s skipped (%s)"%(codec, reason))
+                results.append({'codec':codec, 'skipped':reason})
+                continue
+            for size in sizes:
+                self.log("codec %s size %s"%(codec, format_size(size)))
+                repo  = self.new_repository('codecs')
+                value = make_value(codec, size)
+                paths = ['f%i'%idx for idx in range(get_operations_number(self.operations, size))]
+                ops   = measure_operations(repo, paths, value, dump=codec, nbytes=size)
+                results.append({'codec':codec, 'size':size, 'file_size':os.path.getsize(os.path.join(repo.path, paths[0])), 'operations':ops})
+                self.remove_repository(repo)
+        return results
+
+    def run_auto(self, values, sizes):
+        """Benchmark 'auto' dump keyword against default dump for every
+        value type and size."""
+        results = []
+        for kind in values:
+            if kind == 'ndarray':
+                reason = check_codec('numpy')
+                if reason is not None:
+                    self.log("value %s skipped (%s)"%(kind, reason))
+                    results.append({'value':kind, 'skipped':reason})
+                    continue
+            for size in sizes:
+                value = make_typed_value(kind, size)
+                for dump in (None, 'auto'):
+                    name = 'default' if dump is None else dump
+                    self.log("value %s size %s dump %s"%(kind, format_size(size), name))
+                    repo  = self.new_repository('auto')
+                    paths = ['f%i'%idx for idx in range(get_operations_number(self.operations, size))]
+                    ops   = measure_operations(repo, paths, value, dump=dump, nbytes=size)
+                    info, _ = repo.get_file_info(paths[0])
+                    results.append({'value':kind, 'size':size, 'dump':name, 'codec':info.get('codec', None),
+                                    'file_size':os.path.getsize(os.path.join(repo.path, paths[0])), 'operations':ops})
+                    self.remove_repository(repo)
+        return results
+
+    def run_repository_size(self, repositorySizes, size=1024):
+        """Benchmark operations and opening time of populated repositories."""
+        results = []
+        value   = make_value('pickle', size)
+        for nfiles in repositorySizes:
+            self.log("repository size %i"%nfiles)
+            repo = self.new_repository('size')
+            tic  = _timer()
+            self.populate(repo, nfiles)
+            populateTime = _timer()-tic
+            openTimes = {}
+            for verify in VERIFY:
+                tic = _timer()
+                Repository(locker=self.locker).load_repository(repo.path, verify=verify)
+                openTimes[verify] = _timer()-tic
+            tic  = _timer()
+            stats = repo.get_stats()
+            statsTime = _timer()-tic
+            paths = ['bench/f%i'%idx for idx in range(self.operations)]
+            ops   = measure_operations(repo, paths, value, nbytes=size)
+            results.append({'files':nfiles, 'size':size, 'populate_time':populateTime,
+                            'open_time':openTimes['full'], 'open_times':openTimes, 'get_stats_time':statsTime,
+                            'stats':stats, 'operations':ops})
+            self.remove_repository(repo)
+        return results
+
+    def run_depth(self, depths, size=1024):
+        """Benchmark operations on files at given directory depths."""
+        results = []
+        value   = make_value('pickle', size)
+        for depth in depths:
+            self.log("depth %i"%depth)
+            repo  = self.new_repository('depth')
+            dirs  = os.sep.join(['d%i'%idx for idx in range(depth)])
+            paths = [os.path.join(dirs, 'f%i'%idx) for idx in range(self.operations)]
+            ops   = measure_operations(repo, paths, value, nbytes=size)
+            results.append({'depth':depth, 'size':size, 'operations':ops})
+            self.remove_repository(repo)
+        return results
+
+    def run_processes(self, processes, size=1024):
+        """Benchmark concurrent processes working on the same repository."""
+        results = []
+        if self.locker == 'thread':
+            self.log("processes skipped ('thread' locker can't synchronize processes)")
+            return [{'skipped':"'thread' locker can't synchronize processes"}]
+        for nprocs in processes:
+            self.log("processes %i"%nprocs)
+            # this process creates the repository and serves its locks
+            repo  = self.new_repository('processes')
+            start = time.time()+1+0.1*nprocs
+            procs = []
+            for idx in range(nprocs):
+                config = {'path':repo.path, 'worker':idx, 'start':start, 'operations':self.operations,
+                          'size':size, 'locker':self.locker, 'durability':self.durability}
+                args   = [sys.executable, '-m', 'pyrep.benchmark', '--worker', json.dumps(config)]
+                procs.append(subprocess.Popen(args, stdout=subprocess.PIPE))
+            outputs = [json.loads(p.communicate()[0].decode('utf-8').strip().split('\n')[-1]) for p in procs]
+            wallTime = max([o['end'] for o in outputs])-start
+            ops = {}
+            for name in outputs[0]['latencies']:
+                latencies = [l for o in outputs for l in o['latencies'][name]]
+                ops[name] = summarize(latencies, nbytes=size, wallTime=wallTime)
+            results.append({'processes':nprocs, 'size':size, 'wall_time':wallTime, 'operations':ops})
+            self.remove_repository(repo)
+        return results
+
+    def run(self, scenarios=None, codecs=None, sizes=None, repositorySizes=None, depths=None, processes=None, values=None):
+        """
+        Run benchmark scenarios.
+
+        :Returns:
+            #. results (dict): JSON serializable results with 'pyrep_version',
+               'python', 'platform', 'time', 'config' and 'results', the
+               dictionary of results list by scenario.
+        """
+        if scenarios is None:       scenarios = SCENARIOS
+        if codecs is None:          codecs = CODECS
+        if sizes is None:           sizes = [1024, 1024**2]
+        if repositorySizes is None: repositorySizes = [1000, 10000]
+        if depths is None:          depths = [1, 4, 16]
+        if processes is None:       processes = [1, 2, 4]
+        if values is None:          values = VALUES
+        for s in scenarios:
+            assert s in SCENARIOS, "unknown scenario '%s'"%s
+        results = {}
+        if 'codecs' in scenarios:
+            results['codecs'] = self.run_codecs(codecs, sizes)
+        if 'repository_size' in scenarios:
+            results['repository_size'] = self.run_repository_size(repositorySizes)
+        if 'depth' in scenarios:
+            results['depth'] = self.run_depth(depths)
+        if 'processes' in scenarios:
+            results['processes'] = self.run_processes(processes)
+        if 'auto' in scenarios:
+            results['auto'] = self.run_auto(values, sizes)
+        return {'pyrep_version':__version__,
+                'python'       :platform.python_version(),
+                'platform'     :platform.platform(),
+                'time'         :time.time(),
+                'config'       :{'path':self.path, 'operations':self.operations, 'locker':self.locker,
+                                 'durability':self.durability, 'scenarios':scenarios, 'codecs':codecs,
+                                 'sizes':sizes, 'repository_sizes':repositorySizes, 'depths':depths,
+                                 'processes':processes, 'values':values},
+                'results'      :results}
+
+
+def run_worker(config):
+    """Processes scenario worker. Prints its latencies as JSON."""
+    repo  = Repository(locker=config['locker'], durability=config['durability']).load_repository(config['path'])
+    value = make_value('pickle', config['size'])
+    paths = ['w%i/f%i'%(config['worker'], idx) for idx in range(config['operations'])]
+    while time.time() < config['start']:
+        time.sleep(0.001)
+    latencies = {'dump_file':[], 'update_file':[], 'pull_file':[]}
+    for relativePath in paths:
+        tic = _timer()
+        repo.dump_file(value, relativePath=relativePath, replace=True)
+        latencies['dump_file'].append(_timer()-tic)
+    for relativePath in paths:
+        tic = _timer()
+        repo.update_file(value, relativePath=relativePath)
+        latencies['update_file'].append(_timer()-tic)
+    for relativePath in paths:
+        tic = _timer()
+        repo.pull_file(relativePath=relativePath)
+        latencies['pull_file'].append(_timer()-tic)
+    repo.flush()
+    print(json.dumps({'latencies':latencies, 'end':time.time()}))
+
+
+def main(argv=None):
+    """Benchmark command line entry point."""
+    _list = lambda s:[i for i in s.split(',') if len(i)]
+    parser = argparse.ArgumentParser(prog='python -m pyrep.benchmark', description="pyrep dump, update and pull benchmark")
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS), help="comma separated scenarios among %s"%', '.join(SCENARIOS))
+    parser.add_argument('--codecs', default=','.join(CODECS), help="comma separated dump keywords")
+    parser.add_argument('--sizes', default='1KB,1MB', help="comma separated value sizes such as 1KB,1MB,1GB")
+    parser.add_argument('--repository-sizes', default='1000,10000', help="comma separated numbers of tracked files")
+    parser.add_argument('--depths', default='1,4,16', help="comma separated directory depths")
+    parser.add_argument('--processes', default='1,2,4', help="comma separated numbers of concurrent processes")
+    parser.add_argument('--values', default=','.join(VALUES), help="comma separated auto scenario value types")
+    parser.add_argument('--operations', default=100, type=int, help="number of operations per measure")
+    parser.add_argument('--path', default=None, help="parent directory of benchmark repositories")
+    parser.add_argument('--locker', default='server', help="repositories locker backend")
+    parser.add_argument('--durability', default='strict', help="repositories durability level")
+    parser.add_argument('--output', default=None, help="JSON results file path. Printed if not given")
+    parser.add_argument('--quiet', action='store_true', help="don't print progress")
+    parser.add_argument('--worker', default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+    if args.worker is not None:
+        return run_worker(json.loads(args.worker))
+    bench   = Benchmark(path=args.path, operations=args.operations, locker=args.locker,
+                        durability=args.durability, verbose=not args.quiet)
+    results = bench.run(scenarios       = _list(args.scenarios),
+                        codecs          = _list(args.codecs),
+                        sizes           = [parse_size(s) for s in _list(args.sizes)],
+                        repositorySizes = [int(s) for s in _list(args.repository_sizes)],
+                        depths          = [int(s) for s in _list(args.depths)],
+                        processes       = [int(s) for s in _list(args.processes)],
+                        values          = _list(args.values))
+    text = json.dumps(results, indent=2, sort_keys=True)
+    if args.output is None:
+        print(text)
+    else:
+        with open(args.output, 'w') as fd:
+            fd.write(text)
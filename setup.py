@@ -85,7 +85,7 @@ with open(infoPath) as fd:
 
 # create meta data
 metadata = dict(name             = PACKAGE_NAME,
-                packages         = [PACKAGE_NAME],
+                packages         = [PACKAGE_NAME, PACKAGE_NAME+'.benchmark'],
                 package_dir      = {PACKAGE_NAME: '.'},
                 version          = PACKAGE_INFO['__version__'] ,
                 author           = "Bachir AOUN",
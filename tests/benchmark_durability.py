@@ -0,0 +1,41 @@
+# standard distribution imports
+from __future__ import print_function
+import sys, os, time, shutil, tempfile
+
+# import Repository
+from pyrep import Repository
+
+# number of dumped files per durability level
+NFILES = 500
+if len(sys.argv)>1:
+    NFILES = int(sys.argv[1])
+
+# repository parent directory. Pass a path on the disk to benchmark
+PARENT = tempfile.gettempdir()
+if len(sys.argv)>2:
+    PARENT = sys.argv[2]
+
+value = "This is a string data to pickle and store in the repository"
+
+print("durability   dump_file (files/s)   dump_files (files/s)   flush (s)")
+for durability in ('strict', 'batch', 'none'):
+    PATH = os.path.join(PARENT, 'pyrepTest_durability_%s'%durability)
+    if os.path.isdir(PATH):
+        shutil.rmtree(PATH)
+    REP = Repository(durability=durability)
+    REP.create_repository(PATH)
+    # dump files one by one
+    tic = time.time()
+    for idx in range(NFILES):
+        REP.dump_file(value, relativePath='single/file_%i'%idx, replace=True)
+    tac = time.time()
+    REP.flush()
+    flushTime = time.time()-tac
+    singleRate = NFILES/(time.time()-tic)
+    # dump files at once
+    tic = time.time()
+    REP.dump_files([(value, 'batched/file_%i'%idx, None) for idx in range(NFILES)])
+    REP.flush()
+    batchRate = NFILES/(time.time()-tic)
+    print("%-12s %-21.1f %-22.1f %.4f"%(durability, singleRate, batchRate, flushTime))
+    REP.remove_repository(removeEmptyDirs=True)
@@ -0,0 +1,56 @@
+"""
+Stress pulling without locking while another thread replaces the file with
+values of the same size dumped with different codecs. Every pulled value
+must be one of the written values. e.g. 'python lock_free_pull.py' or
+'python lock_free_pull.py 5000 thread'
+"""
+# standard distribution imports
+from __future__ import print_function
+import sys, os, shutil, tempfile, threading
+
+# import Repository
+from pyrep import Repository
+
+# number of pulls and locker
+NPULLS = 5000
+if len(sys.argv)>1:
+    NPULLS = int(sys.argv[1])
+LOCKER = 'thread'
+if len(sys.argv)>2:
+    LOCKER = sys.argv[2]
+
+# same size values selecting 'bytes' and 'text' codecs with 'auto' dump
+VALUES = [b'abcd', u'WXYZ']
+
+PATH = os.path.join(tempfile.gettempdir(), 'pyrepTest_lock_free_pull')
+if os.path.isdir(PATH):
+    shutil.rmtree(PATH)
+REP = Repository(locker=LOCKER, durability='none')
+REP.create_repository(PATH)
+REP.dump_file(VALUES[0], relativePath='f', dump='auto')
+
+def write(stop):
+    idx = 0
+    while not stop.is_set():
+        idx += 1
+        REP.update_file(VALUES[idx%2], relativePath='f', dump='auto')
+
+for lock in (True, False):
+    stop   = threading.Event()
+    writer = threading.Thread(target=write, args=(stop,))
+    writer.start()
+    pulled = {}
+    try:
+        for _ in range(NPULLS):
+            value = REP.pull_file('f', lock=lock)
+            key   = (type(value).__name__, value)
+            pulled[key] = pulled.get(key, 0)+1
+    finally:
+        stop.set()
+        writer.join()
+    unwritten = dict([(k, n) for k, n in pulled.items() if k[1] not in VALUES or type(k[1]) is not type(VALUES[VALUES.index(k[1])])])
+    print("lock=%-5s pulled %s"%(lock, pulled))
+    assert not len(unwritten), "pulled values never written %s"%(unwritten,)
+
+REP.remove_repository(removeEmptyDirs=True)
+print("all pulled values were written")
@@ -1,6 +1,17 @@
+"""
+Run this script in many terminals at the same time to stress the repository
+with concurrent processes doing random modes. e.g. 'python multi_processes.py'
+or 'python multi_processes.py update_string_pickled pull_string_pickled'
+
+Read throughput scaling with the number of reader processes is benchmarked
+with 'python multi_processes.py read_scaling [MAX_PROCESSES] [DURATION]'.
+Readers hold shared file locks and pull the same file concurrently. Results
+are compared to readers limited to a single read slot, which is equivalent
+to every reader holding an exclusive lock.
+"""
 # standard distribution imports
 from __future__ import print_function
-import sys, os, time, datetime, random
+import sys, os, time, datetime, random, warnings, shutil, tempfile, subprocess
 
 # numpy imports
 import numpy as np
@@ -12,9 +23,51 @@ from pyrep import Repository
 IGNORE_DIR_NOT_REP = True
 
 SLEEP = 0.001
-MODES = ["save_repository","load_repository", "update_string_pickled", "dump_string_pickled"]
+MODES = ["save_repository","load_repository", "update_string_pickled", "dump_string_pickled", "pull_string_pickled"]
 FORCE_MODE = None
 
+# read scaling benchmark reader process. Pulls file from start time
+# until duration is elapsed and prints the number of pulls
+if len(sys.argv)>1 and sys.argv[1] == 'read_worker':
+    path, slots, start, duration = sys.argv[2], int(sys.argv[3]), float(sys.argv[4]), float(sys.argv[5])
+    Repository.LOCK_READ_SLOTS = slots
+    REP = Repository().load_repository(path)
+    while time.time() < start:
+        time.sleep(0.001)
+    count = 0
+    while time.time() < start+duration:
+        REP.pull_file(relativePath='array.pickled')
+        count += 1
+    print(count)
+    exit()
+
+# read scaling benchmark
+if len(sys.argv)>1 and sys.argv[1] == 'read_scaling':
+    MAX_PROCESSES = int(sys.argv[2]) if len(sys.argv)>2 else 8
+    DURATION      = float(sys.argv[3]) if len(sys.argv)>3 else 3
+    PATH = os.path.join(tempfile.gettempdir(), 'pyrepTest_read_scaling')
+    if os.path.isdir(PATH):
+        shutil.rmtree(PATH)
+    # this process creates the repository and serves its locks
+    REP = Repository()
+    REP.create_repository(PATH)
+    REP.dump_file(np.random.random(100000), relativePath='array.pickled', replace=True)
+    nprocs = [1]
+    while nprocs[-1]*2 <= MAX_PROCESSES:
+        nprocs.append(nprocs[-1]*2)
+    print("processes   shared (pulls/s)   exclusive (pulls/s)")
+    for n in nprocs:
+        rates = []
+        for slots in (Repository.LOCK_READ_SLOTS, 1):
+            start = time.time()+2
+            args  = [sys.executable, os.path.abspath(__file__), 'read_worker', PATH, str(slots), repr(start), repr(DURATION)]
+            procs = [subprocess.Popen(args, stdout=subprocess.PIPE) for _ in range(n)]
+            count = sum([int(p.communicate()[0].decode().strip().split()[-1]) for p in procs])
+            rates.append(count/DURATION)
+        print("%-11i %-18.1f %.1f"%(n, rates[0], rates[1]))
+    REP.remove_repository(removeEmptyDirs=True)
+    exit()
+
 if len(sys.argv)>1:
     for m in sys.argv[1:]:
         assert m in MODES, "given mode '%s' is not in modes"%(m,)
@@ -83,5 +136,7 @@ while True:
     elif mode == "dump_string_pickled":
         value = "This is a string data to pickle and store in the repository"
         REP.dump_file(value, relativePath='string_pickled', dump=None, pull=None, replace=True)
+    elif mode == "pull_string_pickled":
+        REP.pull_file(relativePath='string_pickled')
     #print(str(datetime.datetime.now()), rep.len)
     print(time.time()-tic, mode)
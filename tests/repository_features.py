@@ -0,0 +1,192 @@
+"""
+Check repository features end to end. Every check prints its name when it
+passes and the script stops at the first failing assertion.
+e.g. 'python repository_features.py'
+"""
+# standard distribution imports
+from __future__ import print_function
+import sys, os, shutil, tempfile, pickle, zlib
+
+# numpy imports
+import numpy as np
+
+# import Repository
+from pyrep import Repository
+
+PARENT = tempfile.mkdtemp(prefix='pyrepTest_features_')
+
+def new_repository(name, **kwargs):
+    path = os.path.join(PARENT, name)
+    rep  = Repository(locker='thread', durability='none', **kwargs)
+    success, message = rep.create_repository(path)
+    assert success, message
+    return rep, path
+
+def load_repository(path):
+    return Repository(locker='thread', durability='none').load_repository(path)
+
+
+def check_copy_into_sub_directory():
+    REP, _ = new_repository('copy')
+    REP.add_directory('top/a/b')
+    for relativePath in ('top/a/f1', 'top/a/b/f2', 'top/f3'):
+        REP.dump_file(relativePath, relativePath=relativePath)
+    success, message = REP.copy_directory(relativePath='top/a', newRelativePath='top/a/b/c')
+    assert success, message
+    assert REP.pull_file('top/a/b/c/f1') == 'top/a/f1'
+    assert REP.pull_file('top/a/b/c/b/f2') == 'top/a/b/f2'
+    assert not REP.is_repository_directory('top/a/b/c/b/c')
+    files = sorted(REP.walk_files_path(recursive=True))
+    assert files == sorted(load_repository(REP.path).walk_files_path(recursive=True)), files
+    assert len(files) == 5, files
+
+def check_journal():
+    REP, path = new_repository('journal')
+    repoFile, journalFile = os.path.join(path, '.pyreprepo'), os.path.join(path, '.pyreprepojournal')
+    size = os.path.getsize(repoFile)
+    for idx in range(5):
+        REP.dump_file(idx, relativePath='j/f%i'%idx)
+    # operations are appended to the journal and replayed upon loading
+    assert os.path.getsize(repoFile) == size
+    assert sorted(load_repository(path).walk_files_path('j')) == ['j/f%i'%idx for idx in range(5)]
+    # journal is compacted into .pyreprepo
+    compactSize = Repository.JOURNAL_COMPACT_SIZE
+    Repository.JOURNAL_COMPACT_SIZE = 3
+    try:
+        for idx in range(5, 8):
+            REP.dump_file(idx, relativePath='j/f%i'%idx)
+    finally:
+        Repository.JOURNAL_COMPACT_SIZE = compactSize
+    assert os.path.getsize(repoFile) > size
+    REP.dump_file(8, relativePath='j/f8')
+    # truncated trailing record is ignored
+    with open(journalFile, 'ab') as fd:
+        fd.write(b'\x80\x02(truncated')
+    LOADED = load_repository(path)
+    assert LOADED.pull_file('j/f8') == 8
+    assert sorted(LOADED.walk_files_path('j')) == sorted(['j/f%i'%idx for idx in range(9)])
+
+def check_find():
+    for metadata in ('pickle', 'sqlite'):
+        A, path = new_repository('find_%s'%metadata, metadata=metadata)
+        A.dump_file(1, relativePath='x/f1', description='first')
+        A.dump_file(2, relativePath='x/f2')
+        A.dump_file(np.arange(3), relativePath='y/a.npy', dump='numpy')
+        assert A.find() == ['x/f1', 'x/f2', 'y/a.npy']
+        assert A.find(klass=int) == ['x/f1', 'x/f2']
+        assert A.find(codec='numpy') == ['y/a.npy']
+        assert A.find(pattern='x/*', description_contains='fir') == ['x/f1']
+        assert A.find(regex=r'f\d$', updated_after=A.get_file_info('x/f2')[0]['last_update_utctime']) == ['x/f2']
+        # changes of another instance are found
+        B = load_repository(path)
+        B.update_file('string', relativePath='x/f1')
+        B.dump_file(3, relativePath='y/f3')
+        B.remove_file('x/f2')
+        assert A.find() == ['x/f1', 'y/a.npy', 'y/f3']
+        assert A.find(klass=int) == ['y/f3']
+        assert A.find(klass=str) == ['x/f1']
+
+def check_convert_metadata():
+    REP, path = new_repository('convert')
+    REP.add_directory('d', description='directory')
+    REP.dump_file({'a':1}, relativePath='d/f', description='file')
+    for metadata in ('sqlite', 'pickle', 'sqlite'):
+        success, message = REP.convert_metadata(metadata)
+        assert success, message
+        assert REP.metadata == metadata
+        assert os.path.isfile(os.path.join(path, '.pyrepmetadata')) == (metadata == 'sqlite')
+        assert os.path.isfile(os.path.join(path, 'd', '.f_pyrepfileinfo')) == (metadata == 'pickle')
+        LOADED = load_repository(path)
+        assert LOADED.metadata == metadata
+        assert LOADED.pull_file('d/f') == {'a':1}
+        assert LOADED.get_file_info('d/f')[0]['description'] == 'file'
+        assert dict(LOADED.walk_directories_info(recursive=True))['d']['description'] == 'directory'
+
+def check_file_info_migration():
+    REP, path = new_repository('migration')
+    REP.dump_file({'a':1}, relativePath='d/x')
+    REP.dump_file(None, relativePath='d/y')
+    REP.close()
+    # rewrite files information as version 1 sidecar files
+    for name, klass in (('x', dict), ('y', None)):
+        infoPath = os.path.join(path, 'd', '.%s_pyrepfileinfo'%name)
+        with open(infoPath, 'rb') as fd:
+            info = pickle.load(fd)
+        for key in ('class', 'size', 'checksum'):
+            info.pop(key)
+        with open(infoPath, 'wb') as fd:
+            pickle.dump(info, fd, protocol=2)
+        with open(os.path.join(path, 'd', '.%s_pyrepfileclass'%name), 'wb') as fd:
+            pickle.dump(klass, fd, protocol=2)
+        open(os.path.join(path, 'd', '.%s_pyrepfilelock'%name), 'wb').close()
+    with open(os.path.join(path, '.pyreprepo'), 'rb') as fd:
+        repo = pickle.load(fd)
+    repo.pop('file_info_version')
+    with open(os.path.join(path, '.pyreprepo'), 'wb') as fd:
+        pickle.dump(repo, fd, protocol=2)
+    # loading migrates sidecar files into one information record
+    LOADED = load_repository(path)
+    assert sorted(os.listdir(os.path.join(path, 'd'))) == ['.pyrepdirinfo', '.x_pyrepfileinfo', '.y_pyrepfileinfo', 'x', 'y']
+    info = LOADED.get_file_info('d/x')[0]
+    with open(os.path.join(path, 'd', 'x'), 'rb') as fd:
+        data = fd.read()
+    # checksum of files written by former versions is unknown
+    assert info['class'].endswith('.dict') and info['size'] == len(data) and info['checksum'] is None
+    assert LOADED.get_file_info('d/y')[0]['class'] is None
+    assert LOADED.pull_file('d/x') == {'a':1}
+    assert LOADED.pull_file('d/x', lock=False) == {'a':1}
+    # updated files get their checksum
+    LOADED.update_file({'b':2}, relativePath='d/x')
+    with open(os.path.join(path, 'd', 'x'), 'rb') as fd:
+        data = fd.read()
+    assert LOADED.get_file_info('d/x')[0]['checksum'] == 'crc32:%08x'%(zlib.crc32(data) & 0xffffffff)
+
+def check_pull_slice():
+    REP, _ = new_repository('slice')
+    A = np.arange(5*4*3).reshape(5,4,3)
+    F = np.asfortranarray(A)
+    REP.dump_file(A, relativePath='a.npy', dump='numpy')
+    REP.dump_file(F, relativePath='f.npy', dump='numpy')
+    for index in (0, -1, slice(1,3), slice(None,None,-1), (slice(1,4), 2), (2, slice(None), 1), Ellipsis, (Ellipsis, 1)):
+        for relativePath, X in (('a.npy', A), ('f.npy', F)):
+            value = REP.pull_slice(relativePath, index)
+            assert np.array_equal(value, X[index]) and value.shape == X[index].shape, (relativePath, index)
+    try:
+        REP.pull_slice('a.npy', 5)
+    except IndexError:
+        pass
+    else:
+        raise AssertionError("out of bounds index must raise IndexError")
+
+class Text(str):
+    """str subclass pickled by 'auto' dump"""
+
+def check_auto_codec():
+    REP, _ = new_repository('auto')
+    values = [(b'bytes', 'bytes'), (u'text', 'text'), (np.arange(4.), 'numpy'),
+              ({'a':[1, 2.5, None, True]}, 'json'), (list(range(2000)), 'pickle'),
+              (set([1, 2]), 'pickle'), (Text('subclass'), 'pickle')]
+    for idx, (value, codec) in enumerate(values):
+        relativePath = 'f%i'%idx
+        REP.dump_file(value, relativePath=relativePath, dump='auto')
+        info   = REP.get_file_info(relativePath)[0]
+        pulled = REP.pull_file(relativePath)
+        assert info['codec'] == codec, (value, info['codec'])
+        assert type(pulled) is type(value), (value, pulled)
+        assert np.array_equal(pulled, value) if codec == 'numpy' else pulled == value
+    # codec is selected again when updated
+    REP.update_file(u'text', relativePath='f0')
+    assert REP.get_file_info('f0')[0]['codec'] == 'text' and REP.pull_file('f0') == u'text'
+
+CHECKS = [check_copy_into_sub_directory, check_journal, check_find, check_convert_metadata,
+          check_file_info_migration, check_pull_slice, check_auto_codec]
+
+if __name__ == '__main__':
+    try:
+        for check in CHECKS:
+            if len(sys.argv)>1 and check.__name__ not in sys.argv[1:]:
+                continue
+            check()
+            print("%s passed"%(check.__name__,))
+    finally:
+        shutil.rmtree(PARENT, ignore_errors=True)